@@ -7,7 +7,87 @@ interface BackendGenerateRequest {
   framework?: string
 }
 
-async function callBackendGeneration(prompt: string, framework: string, authToken?: string): Promise<any> {
+const JOB_POLL_INTERVAL_MS = 2000
+const JOB_MAX_WAIT_MS = 10 * 60 * 1000
+
+// Stop a job nobody will read, so it doesn't keep spending LLM tokens
+async function cancelBackendJob(backendUrl: string, jobId: string, headers: Record<string, string>) {
+  try {
+    await fetch(`${backendUrl}/api/jobs/${jobId}`, {
+      method: 'DELETE',
+      headers,
+      signal: AbortSignal.timeout(5000)
+    })
+  } catch (error) {
+    console.log(`Could not cancel generation job ${jobId}:`, error)
+  }
+}
+
+async function pollBackendJob(
+  backendUrl: string,
+  jobId: string,
+  headers: Record<string, string>,
+  signal?: AbortSignal
+): Promise<any> {
+  const deadline = Date.now() + JOB_MAX_WAIT_MS
+
+  try {
+    while (Date.now() < deadline) {
+      signal?.throwIfAborted()
+      const response = await fetch(`${backendUrl}/api/jobs/${jobId}`, {
+        headers,
+        signal: AbortSignal.timeout(10000)
+      })
+
+      if (!response.ok) {
+        throw new Error(`Job status request failed: ${response.status}`)
+      }
+
+      const job = await response.json()
+      if (job.status === 'succeeded' || job.status === 'failed' || job.status === 'cancelled') {
+        return job
+      }
+
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS))
+    }
+  } catch (error) {
+    await cancelBackendJob(backendUrl, jobId, headers)
+    throw error
+  }
+
+  await cancelBackendJob(backendUrl, jobId, headers)
+  throw new Error(`Generation job ${jobId} did not finish in time`)
+}
+
+// Job responses only carry a manifest of the generated files; fetch their contents
+async function fetchJobFiles(
+  backendUrl: string,
+  jobId: string,
+  manifest: { path: string }[],
+  headers: Record<string, string>
+): Promise<Record<string, string>> {
+  const entries = await Promise.all(
+    manifest.map(async ({ path }) => {
+      const encodedPath = path.split('/').map(encodeURIComponent).join('/')
+      const response = await fetch(`${backendUrl}/api/jobs/${jobId}/files/${encodedPath}`, {
+        headers,
+        signal: AbortSignal.timeout(10000)
+      })
+      if (!response.ok) {
+        throw new Error(`File request failed for ${path}: ${response.status}`)
+      }
+      return [path, await response.text()] as const
+    })
+  )
+  return Object.fromEntries(entries)
+}
+
+async function callBackendGeneration(
+  prompt: string,
+  framework: string,
+  authToken?: string,
+  signal?: AbortSignal
+): Promise<any> {
   const backendUrl = process.env.NEXT_PUBLIC_BACKEND_URL || 'http://localhost:8000'
   
   const headers: Record<string, string> = {
@@ -19,10 +99,12 @@ async function callBackendGeneration(prompt: string, framework: string, authToke
     headers.Authorization = `Bearer ${authToken}`
   }
   
-  // Try the full LangGraph agent first (requires authentication)
+  // Try the full LangGraph agent first (requires authentication). Generation
+  // runs as a background job on the backend, so we poll for the result instead
+  // of holding a single request open for the whole coder loop.
   if (authToken) {
     try {
-      const response = await fetch(`${backendUrl}/api/generate`, {
+      const response = await fetch(`${backendUrl}/api/jobs`, {
         method: 'POST',
         headers,
         body: JSON.stringify({
@@ -30,16 +112,17 @@ async function callBackendGeneration(prompt: string, framework: string, authToke
           framework: framework.toLowerCase().replace(/\s+/g, '-'),
           project_type: 'web'
         } as BackendGenerateRequest),
-        // Add timeout for the full agent
-        signal: AbortSignal.timeout(30000) // 30 second timeout for full generation
+        signal: AbortSignal.timeout(10000)
       })
 
       if (response.ok) {
-        const data = await response.json()
-        if (data.success && data.files) {
+        const job = await response.json()
+        const data = await pollBackendJob(backendUrl, job.id, headers, signal)
+        if (data.status === 'succeeded' && data.files) {
           // Convert backend files response to frontend format
-          const mainFile = data.files['index.html'] || Object.values(data.files)[0] || ''
-          return { text: mainFile, fromBackend: true, allFiles: data.files, source: 'backend-full' }
+          const files = await fetchJobFiles(backendUrl, job.id, data.files, headers)
+          const mainFile = files['index.html'] || Object.values(files)[0] || ''
+          return { text: mainFile, fromBackend: true, allFiles: files, source: 'backend-full' }
         }
       } else if (response.status === 401) {
         console.log('Authentication required for full generation, trying simple generation')
@@ -96,7 +179,8 @@ export async function POST(request: NextRequest) {
     }
 
     // All code generation now happens via the backend
-    const backendResult = await callBackendGeneration(prompt, framework, authToken)
+    // The request's signal aborts when the browser goes away, cancelling the backend job
+    const backendResult = await callBackendGeneration(prompt, framework, authToken, request.signal)
     
     return NextResponse.json({
       code: backendResult.text,
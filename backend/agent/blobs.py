@@ -0,0 +1,127 @@
+import os
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import pathlib
+import threading
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+class BlobStore:
+    """Content-addressed store for generated files.
+
+    Every distinct file content is stored once, as ``objects/<sha256[:2]>/<sha256>``,
+    and workspace files are hard links to their blob, so identical files across
+    jobs share one copy on disk and snapshotting a workspace only creates links.
+    The link count of a blob is its reference count: once no workspace links to
+    a blob any more, ``collect_garbage`` deletes it. Blobs younger than
+    ``gc_grace_seconds`` are kept so a blob is never collected between being
+    stored and being linked into a workspace.
+    """
+
+    def __init__(self):
+        workspaces_root = pathlib.Path(
+            os.getenv("WORKSPACES_ROOT", pathlib.Path.cwd() / "workspaces")
+        )
+        self.root = pathlib.Path(os.getenv("BLOB_STORE_ROOT", workspaces_root / ".blobs"))
+        self.gc_grace_seconds = float(os.getenv("BLOB_GC_GRACE_SECONDS", "300"))
+        self.gc_interval_seconds = float(os.getenv("BLOB_GC_INTERVAL_SECONDS", "60"))
+
+        self.writes = 0
+        self.dedup_hits = 0
+        self.copies = 0  # writes that fell back to a plain copy (no hard links)
+        self.collected = 0
+
+        self._last_gc = 0.0
+        self._lock = threading.Lock()
+
+    def _blob_path(self, digest: str) -> pathlib.Path:
+        return self.root / "objects" / digest[:2] / digest
+
+    def _put(self, data: bytes) -> pathlib.Path:
+        digest = hashlib.sha256(data).hexdigest()
+        blob = self._blob_path(digest)
+        if blob.exists():
+            self.dedup_hits += 1
+            # Refresh the grace period so a concurrent collection keeps it
+            os.utime(blob)
+            return blob
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp = blob.with_name(f".{digest}.{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, blob)
+        return blob
+
+    def _link(self, source: pathlib.Path, target: pathlib.Path):
+        """Atomically point ``target`` at ``source``'s content, never writing through an existing link"""
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            os.link(source, tmp)
+        except OSError:
+            # Different filesystem or no hard link support: keep working without dedup
+            self.copies += 1
+            shutil.copyfile(source, tmp)
+        # rename() is a no-op when both names are links to the same file
+        # (the target already holds this content), which would leave tmp behind
+        os.replace(tmp, target)
+        if tmp.exists():
+            tmp.unlink()
+
+    def write(self, target: pathlib.Path, data: bytes) -> str:
+        """Store ``data`` and make ``target`` a link to its blob; returns the sha256"""
+        with self._lock:
+            blob = self._put(data)
+            self._link(blob, target)
+            self.writes += 1
+        return blob.name
+
+    def snapshot(self, source: pathlib.Path, target: pathlib.Path):
+        """Recreate the directory ``source`` at ``target`` by linking every file"""
+        for file in source.glob("**/*"):
+            if file.is_file():
+                self._link(file, target / file.relative_to(source))
+        target.mkdir(parents=True, exist_ok=True)
+
+    def collect_garbage(self) -> int:
+        """Delete blobs no workspace links to any more; returns the count"""
+        objects = self.root / "objects"
+        if not objects.is_dir():
+            return 0
+        cutoff = time.time() - self.gc_grace_seconds
+        removed = 0
+        with self._lock:
+            for blob in objects.glob("*/*"):
+                try:
+                    stat = blob.stat()
+                    if stat.st_nlink <= 1 and stat.st_mtime < cutoff:
+                        blob.unlink()
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+            self.collected += removed
+            self._last_gc = time.time()
+        if removed:
+            logger.info(f"Collected {removed} unreferenced blobs from {self.root}")
+        return removed
+
+    def maybe_collect_garbage(self) -> int:
+        """Run collect_garbage at most once every gc_interval_seconds"""
+        if time.time() - self._last_gc < self.gc_interval_seconds:
+            return 0
+        return self.collect_garbage()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "writes": self.writes,
+            "dedup_hits": self.dedup_hits,
+            "copies": self.copies,
+            "collected": self.collected,
+        }
+
+
+blob_store = BlobStore()
@@ -0,0 +1,182 @@
+import os
+import re
+import pathlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Rough token estimate used for budgeting; close enough for code and prose
+CHARS_PER_TOKEN = 4
+MAX_SYMBOLS = 12
+
+SYMBOL_PATTERNS = {
+    ".js": [
+        r"^\s*(?:export\s+)?(?:async\s+)?function\s*\*?\s*(\w+\s*\([^)]*\))",
+        r"^\s*(?:export\s+)?class\s+(\w+)",
+        r"^\s*(?:export\s+)?(?:const|let|var)\s+(\w+)\s*=\s*(?:async\s*)?(?:\([^)]*\)|\w+)\s*=>",
+        r"^\s*export\s+(?:default\s+)?(?:const|let|var)\s+(\w+)",
+    ],
+    ".py": [
+        r"^\s*(?:async\s+)?def\s+(\w+\s*\([^)]*\))",
+        r"^\s*class\s+(\w+)",
+    ],
+    ".css": [
+        r"^\s*([^{}@/\s][^{}]*?)\s*\{",
+        r"^\s*(--[\w-]+)\s*:",
+    ],
+    ".html": [
+        r"\bid=[\"']([\w-]+)[\"']",
+        r"<(?:script|link)\b[^>]*(?:src|href)=[\"']([^\"']+)[\"']",
+    ],
+}
+SYMBOL_PATTERNS.update({
+    ".jsx": SYMBOL_PATTERNS[".js"],
+    ".ts": SYMBOL_PATTERNS[".js"],
+    ".tsx": SYMBOL_PATTERNS[".js"],
+    ".mjs": SYMBOL_PATTERNS[".js"],
+    ".scss": SYMBOL_PATTERNS[".css"],
+    ".htm": SYMBOL_PATTERNS[".html"],
+})
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def extract_symbols(path: str, text: str) -> List[str]:
+    """Pulls exported names, signatures, selectors and ids out of a source file."""
+    patterns = SYMBOL_PATTERNS.get(pathlib.Path(path).suffix.lower(), [])
+    symbols: List[str] = []
+    for pattern in patterns:
+        for match in re.finditer(pattern, text, re.MULTILINE):
+            symbol = " ".join(match.group(1).split())
+            if symbol not in symbols:
+                symbols.append(symbol)
+    return symbols
+
+
+def summarize(path: str, text: str) -> str:
+    symbols = extract_symbols(path, text)
+    line = f"- {path} ({len(text.encode('utf-8'))} bytes, {text.count(chr(10)) + 1} lines)"
+    if symbols:
+        shown = ", ".join(symbols[:MAX_SYMBOLS])
+        more = f", +{len(symbols) - MAX_SYMBOLS} more" if len(symbols) > MAX_SYMBOLS else ""
+        line += f": {shown}{more}"
+    return line
+
+
+class ContextIndex:
+    """Per-workspace index of file summaries, refreshed when a file's inode, mtime or size changes."""
+
+    def __init__(self, root: pathlib.Path):
+        self.root = root.resolve()
+        self._summaries: Dict[str, Tuple[Tuple[int, float, int], str]] = {}
+        self._lock = threading.Lock()
+
+    def _read(self, path: str) -> Optional[str]:
+        try:
+            return (self.root / path).read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def _relative(self, path: str) -> str:
+        resolved = (self.root / path).resolve()
+        try:
+            return resolved.relative_to(self.root).as_posix()
+        except ValueError:
+            return path
+
+    def summaries(self) -> Dict[str, str]:
+        """Summaries of every file in the workspace, keyed by relative path"""
+        current = {}
+        for file in sorted(self.root.glob("**/*")):
+            try:
+                stat = file.stat()
+            except FileNotFoundError:
+                # Replaced while scanning (files are swapped in by rename)
+                continue
+            if file.is_file():
+                current[file.relative_to(self.root).as_posix()] = (stat.st_ino, stat.st_mtime, stat.st_size)
+
+        with self._lock:
+            for path in list(self._summaries):
+                if path not in current:
+                    del self._summaries[path]
+            for path, version in current.items():
+                cached = self._summaries.get(path)
+                if cached is None or cached[0] != version:
+                    text = self._read(path)
+                    summary = summarize(path, text) if text is not None else f"- {path} ({version[2]} bytes, binary)"
+                    self._summaries[path] = (version, summary)
+            return {path: entry[1] for path, entry in self._summaries.items()}
+
+    def build_step_context(self, filepath: str, dependencies: Iterable[str], budget_tokens: int) -> str:
+        """Assembles a step's prompt context within ``budget_tokens``.
+
+        The target file and the step's declared dependencies are included in
+        full while they fit; every other file (and any dependency that does
+        not fit) is represented by its one-line summary.
+        """
+        summaries = self.summaries()
+        filepath = self._relative(filepath)
+        remaining = budget_tokens
+        sections: List[str] = []
+
+        existing = self._read(filepath) if filepath in summaries else None
+        if existing is None:
+            sections.append("Existing content:\n(new file)")
+        elif estimate_tokens(existing) <= remaining:
+            sections.append(f"Existing content:\n{existing}")
+            remaining -= estimate_tokens(existing)
+        else:
+            sections.append(
+                "Existing content: too large to include, use read_file if you need it.\n"
+                + summaries[filepath]
+            )
+
+        full_text = {filepath}
+        dependency_sections = []
+        for dependency in map(self._relative, dependencies):
+            if dependency in full_text or dependency not in summaries:
+                continue
+            text = self._read(dependency)
+            if text is None or estimate_tokens(text) > remaining:
+                continue
+            dependency_sections.append(f"--- {dependency} ---\n{text}")
+            full_text.add(dependency)
+            remaining -= estimate_tokens(text)
+        if dependency_sections:
+            sections.append("Dependencies:\n" + "\n".join(dependency_sections))
+
+        # full_text may hold a new target file, which has no summary
+        others = [path for path in summaries if path not in full_text]
+        other_lines = []
+        for path in others:
+            summary = summaries[path]
+            if estimate_tokens(summary) > remaining:
+                other_lines.append(f"- ... {len(others) - len(other_lines)} more files")
+                break
+            other_lines.append(summary)
+            remaining -= estimate_tokens(summary)
+        if other_lines:
+            sections.append("Other project files:\n" + "\n".join(other_lines))
+
+        return "\n\n".join(sections)
+
+
+_indexes: "OrderedDict[str, ContextIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+MAX_INDEXES = int(os.getenv("CONTEXT_INDEX_MAX_WORKSPACES", "64"))
+
+
+def context_index_for(root: pathlib.Path) -> ContextIndex:
+    """Returns the (shared) context index of a workspace."""
+    key = str(root.resolve())
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = ContextIndex(root)
+        _indexes.move_to_end(key)
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+        return index
@@ -1,35 +1,57 @@
 import os
+import sqlite3
+import logging
+import pathlib
+import functools
+import threading
 from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ContextThreadPoolExecutor, merge_configs
 from langchain.globals import set_verbose, set_debug
-from langchain_groq.chat_models import ChatGroq
+from langgraph.checkpoint.sqlite import SqliteSaver
 from langgraph.constants import END
 from langgraph.graph import StateGraph
 from langgraph.prebuilt import create_react_agent
 
 from agent.prompts import *
-from agent.states import Plan, TaskPlan, CoderState
-from agent.tools import write_file, read_file, get_current_directory, list_files
+from agent.llm_cache import llm_cache
+from agent.plan_cache import plan_cache
+from agent.llm_router import LLMRouter
+from agent.metrics import TOOL_BYTES_WRITTEN, record_llm_usage, timed_node
+from agent.states import Plan, TaskPlan, ImplementationTask, CoderState, GraphState
+from agent.context import context_index_for
+from agent.scaffold import escapes_workspace, normalize_path, skeletons
+from agent.blobs import blob_store
+from agent.tools import emit_progress, write_file, edit_file, read_file, workspace_root, safe_path_for_project
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Configure LangChain based on environment
 debug_mode = os.getenv("BACKEND_DEBUG", "true").lower() == "true"
 set_debug(debug_mode)
 set_verbose(debug_mode)
 
-# Initialize LLM with API key from environment
-groq_api_key = os.getenv("GROQ_API_KEY")
-if not groq_api_key:
-    raise ValueError("GROQ_API_KEY environment variable is required")
-
-# Use the specified gpt-oss-120b model
-llm = ChatGroq(
-    model="openai/gpt-oss-120b",  # Using the requested GPT OSS 120B model
-    api_key=groq_api_key,
-    temperature=0.1,
-    max_tokens=4000,  # Increase token limit for better code generation
-    timeout=60  # Set timeout for long requests
+# The chat model is created on first use (see get_llm), so importing this
+# module neither needs GROQ_API_KEY nor builds a client
+llm = None
+_llm_lock = threading.Lock()
+
+# Maximum number of independent implementation steps coded at the same time
+coder_max_parallel = int(os.getenv("CODER_MAX_PARALLEL", "4"))
+
+# Approximate tokens of file context given to each coder step
+coder_context_tokens = int(os.getenv("CODER_CONTEXT_TOKENS", "6000"))
+
+# Write skeletons of the planned HTML/CSS/JS files while the architect runs
+speculative_scaffold = os.getenv("SPECULATIVE_SCAFFOLD", "false").lower() == "true"
+
+# SQLite file holding per-job graph checkpoints, so failed runs can be resumed
+checkpoint_path = pathlib.Path(
+    os.getenv("CHECKPOINT_PATH", pathlib.Path.cwd() / ".cache" / "checkpoints.sqlite3")
 )
 
 
@@ -38,7 +60,22 @@ def planner_prompt(user_prompt: str) -> str:
 
 
 def architect_prompt(plan: str) -> str:
-    return f"Create a task plan from the following plan: {plan}"
+    return (
+        f"Create a task plan from the following plan: {plan}\n"
+        "For each step, set depends_on to the indices of the earlier steps it "
+        "needs (e.g. the HTML that a stylesheet targets). Leave it empty for "
+        "steps that can be implemented independently, so they can run in parallel."
+    )
+
+
+def editor_prompt(edit_request: str, file_summaries: str) -> str:
+    return (
+        f"Create a task plan that applies the following change request to an existing project: {edit_request}\n"
+        f"Project files:\n{file_summaries}\n"
+        "Only include steps for the files that must change (or must be created) to satisfy "
+        "the request, and describe each change precisely. Do not rewrite unaffected files. "
+        "Set depends_on to the indices of earlier steps a step needs, as in a regular task plan."
+    )
 
 
 def coder_system_prompt() -> str:
@@ -63,81 +100,358 @@ When generating code:
 6. Add meaningful comments where necessary
 7. Follow current web development best practices
 
-Use the provided tools to read existing files and write new code files as needed."""
-
-
+You are given the file you are working on, the full text of the files it depends on, and one-line summaries of the other project files. Only call read_file when a summary is not enough. To change an existing file, prefer edit_file(path, old_text, new_text) with a short snippet that occurs exactly once; use write_file with the complete content for new files or full rewrites."""
+
+
+# Tools take the job workspace from the run config, so one agent serves every job.
+# Directory listings are not needed: the step context already summarizes every file.
+coder_tools = [read_file, write_file, edit_file]
+
+
+def get_llm():
+    """Returns the chat model, creating the Groq clients on first use."""
+    global llm
+    with _llm_lock:
+        if llm is None:
+            groq_api_key = os.getenv("GROQ_API_KEY")
+            if not groq_api_key:
+                raise ValueError("GROQ_API_KEY environment variable is required")
+
+            from langchain_groq.chat_models import ChatGroq
+
+            # Use the specified gpt-oss-120b model
+            primary = ChatGroq(
+                model="openai/gpt-oss-120b",  # Using the requested GPT OSS 120B model
+                api_key=groq_api_key,
+                temperature=0.1,
+                max_tokens=4000,  # Increase token limit for better code generation
+                timeout=60,  # Upper bound per request; the router enforces per-node deadlines
+                max_retries=0  # The router retries; SDK retries would overrun its deadlines
+            )
+            # Smaller, faster model for hedges and retries of cheap nodes such as the planner
+            fallback_model = os.getenv("LLM_FALLBACK_MODEL")
+            fallback = ChatGroq(
+                model=fallback_model,
+                api_key=groq_api_key,
+                temperature=0.1,
+                max_tokens=4000,
+                timeout=60,
+                max_retries=0
+            ) if fallback_model else None
+            llm = LLMRouter.from_env(primary, fallback)
+        return llm
+
+
+class CancellationHandler(BaseCallbackHandler):
+    """Stops a run at its next LLM or tool call once its cancel token is set.
+
+    Passed in the run's callbacks, so every nested call (including the
+    coder's ReAct agent and parallel coder steps) checks the token.
+    """
+
+    raise_error = True
+
+    def __init__(self, cancel):
+        self.cancel = cancel
+
+    def on_chat_model_start(self, *args, **kwargs):
+        self.cancel.check()
+
+    def on_llm_start(self, *args, **kwargs):
+        self.cancel.check()
+
+    def on_tool_start(self, *args, **kwargs):
+        self.cancel.check()
+
+
+@functools.lru_cache(maxsize=None)
+def structured_llm(schema):
+    """Returns the shared structured-output runnable for a schema."""
+    # include_raw keeps the AIMessage so token usage can be recorded
+    return get_llm().with_structured_output(schema, include_raw=True)
+
+
+@functools.lru_cache(maxsize=None)
+def coder_react_agent():
+    """Returns the shared compiled ReAct coder agent."""
+    # Each step's tool loop is short-lived; only the outer graph is checkpointed
+    return create_react_agent(get_llm(), coder_tools, checkpointer=False)
+
+
+def use_llm(model, fallback=None):
+    """Swaps the chat model used by every node (e.g. a fake in benchmarks)."""
+    global llm
+    # Route it like the real model so deadlines, retries and hedging apply too
+    llm = model if isinstance(model, LLMRouter) else LLMRouter.from_env(model, fallback)
+    structured_llm.cache_clear()
+    coder_react_agent.cache_clear()
+
+
+def invoke_structured(schema, prompt: str, node: str):
+    """Calls the LLM for a structured response, served from llm_cache when possible."""
+    model = get_llm()
+    key = llm_cache.key(
+        getattr(model, "model_name", type(model).__name__),
+        getattr(model, "temperature", None),
+        schema,
+        prompt,
+    )
+    cached = llm_cache.get(key, schema)
+    if cached is not None:
+        return cached
+
+    result = structured_llm(schema).invoke(prompt)
+    record_llm_usage(node, [result["raw"]])
+    if result.get("parsing_error") is not None:
+        raise result["parsing_error"]
+
+    resp = result["parsed"]
+    if resp is not None:
+        llm_cache.put(key, resp)
+    return resp
+
+
+def drop_files_outside_workspace(plan: Plan) -> Plan:
+    """Removes planned files whose paths leave the workspace (e.g. "../x.js")."""
+    for file in plan.files:
+        if escapes_workspace(file.path):
+            logger.warning(f"Dropping planned file outside the workspace: {file.path}")
+    plan.files = [file for file in plan.files if not escapes_workspace(file.path)]
+    return plan
+
+
+def drop_steps_outside_workspace(task_plan: TaskPlan) -> TaskPlan:
+    """Removes implementation steps whose files leave the workspace.
+
+    The remaining steps' depends_on indices are renumbered to match.
+    """
+    steps = task_plan.implementation_steps
+    kept = {}
+    for idx, step in enumerate(steps):
+        if escapes_workspace(step.filepath):
+            logger.warning(f"Dropping implementation step outside the workspace: {step.filepath}")
+        else:
+            kept[idx] = len(kept)
+    if len(kept) < len(steps):
+        for idx in kept:
+            steps[idx].depends_on = [kept[dep] for dep in steps[idx].depends_on if dep in kept]
+        task_plan.implementation_steps = [steps[idx] for idx in kept]
+    return task_plan
+
+
+@timed_node("planner")
 def planner_agent(state: dict) -> dict:
     """Converts user prompt into a structured Plan."""
     user_prompt = state["user_prompt"]
-    resp = llm.with_structured_output(Plan).invoke(
-        planner_prompt(user_prompt)
-    )
+    match = plan_cache.lookup(user_prompt, state.get("user_id"))
+    if match is not None:
+        # A similar prompt was planned before; the architect is skipped too
+        return {"plan": match.plan, "task_plan": match.task_plan, "plan_similarity": match.similarity}
+
+    resp = invoke_structured(Plan, planner_prompt(user_prompt), "planner")
     if resp is None:
         raise ValueError("Planner did not return a valid response.")
-    return {"plan": resp}
+    return {"plan": drop_files_outside_workspace(resp)}
 
 
+@timed_node("architect")
 def architect_agent(state: dict) -> dict:
     """Creates TaskPlan from Plan."""
     plan: Plan = state["plan"]
-    resp = llm.with_structured_output(TaskPlan).invoke(
-        architect_prompt(plan=plan.model_dump_json())
-    )
+    if state.get("task_plan") is not None:
+        # Served together with the plan by the semantic plan cache
+        return {"task_plan": state["task_plan"]}
+
+    resp = invoke_structured(TaskPlan, architect_prompt(plan=plan.model_dump_json()), "architect")
     if resp is None:
         raise ValueError("Planner did not return a valid response.")
 
     resp.plan = plan
+    drop_steps_outside_workspace(resp)
     print(resp.model_dump_json())
+    plan_cache.put(state["user_prompt"], state.get("user_id"), plan, resp)
     return {"task_plan": resp}
 
 
-def coder_agent(state: dict) -> dict:
-    """LangGraph tool-using coder agent."""
+@timed_node("scaffold")
+def scaffold_agent(state: dict) -> dict:
+    """Writes skeletons of the Plan's well-known files, concurrently with the architect.
+
+    Files that already exist (e.g. when a run is resumed) are left alone;
+    the coder steps later fill the skeletons in.
+    """
+    root = workspace_root({"configurable": {"workspace": state.get("workspace")}})
+    written = []
+    for path, content in skeletons(state["plan"]).items():
+        p = safe_path_for_project(path, root)
+        if p.exists():
+            continue
+        data = content.encode("utf-8")
+        blob_store.write(p, data)
+        TOOL_BYTES_WRITTEN.inc(len(data))
+        emit_progress({"type": "file", "path": path, "bytes": len(data), "skeleton": True})
+        written.append(path)
+    return {"scaffolded": written}
+
+
+@timed_node("editor")
+def editor_agent(state: dict) -> dict:
+    """Creates a TaskPlan limited to the files an edit request affects."""
+    index = context_index_for(pathlib.Path(state["workspace"]))
+    summaries = "\n".join(index.summaries().values()) or "(no files)"
+    resp = invoke_structured(TaskPlan, editor_prompt(state["edit_request"], summaries), "editor")
+    if resp is None:
+        raise ValueError("Editor did not return a valid response.")
+    return {"task_plan": drop_steps_outside_workspace(resp)}
+
+
+def step_dependencies(steps: list[ImplementationTask]) -> list[set[int]]:
+    """Resolves the steps each implementation step has to wait for.
+
+    Only references to earlier steps are honoured, so the graph is always
+    acyclic, and steps on the same file are kept in plan order.
+    """
+    dependencies = []
+    last_step_for_file = {}
+    for idx, step in enumerate(steps):
+        deps = {dep for dep in step.depends_on if 0 <= dep < idx}
+        if step.filepath in last_step_for_file:
+            deps.add(last_step_for_file[step.filepath])
+        last_step_for_file[step.filepath] = idx
+        dependencies.append(deps)
+    return dependencies
+
+
+def run_coder_step(
+    task: ImplementationTask, dependencies: list[str], config: RunnableConfig, skeleton: bool = False
+):
+    """Implements a single step with the tool-using ReAct agent."""
+    index = context_index_for(workspace_root(config))
+    context = index.build_step_context(task.filepath, dependencies, coder_context_tokens)
+
+    system_prompt = coder_system_prompt()
+    user_prompt = (
+        f"Task: {task.task_description}\n"
+        f"File: {task.filepath}\n"
+        f"{context}\n\n"
+    )
+    if skeleton:
+        user_prompt += (
+            "The existing content is a skeleton generated from the project plan. "
+            "Keep its structure and the files it links where they fit, and fill it in.\n"
+        )
+    user_prompt += "Save your changes with edit_file (targeted changes) or write_file (new files)."
+
+    result = coder_react_agent().invoke({"messages": [{"role": "system", "content": system_prompt},
+                                                      {"role": "user", "content": user_prompt}]},
+                                        config)
+    record_llm_usage("coder", result["messages"])
+
+
+@timed_node("coder")
+def coder_agent(state: dict, config: RunnableConfig) -> dict:
+    """LangGraph tool-using coder agent.
+
+    Each pass runs every step whose dependencies are complete, up to
+    CODER_MAX_PARALLEL at a time, then loops back until the plan is done.
+    """
     coder_state: CoderState = state.get("coder_state")
     if coder_state is None:
-        coder_state = CoderState(task_plan=state["task_plan"], current_step_idx=0)
+        coder_state = CoderState(task_plan=state["task_plan"])
 
     steps = coder_state.task_plan.implementation_steps
-    if coder_state.current_step_idx >= len(steps):
+    completed = set(coder_state.completed_steps)
+    dependencies = step_dependencies(steps)
+    ready = [
+        idx for idx in range(len(steps))
+        if idx not in completed and dependencies[idx] <= completed
+    ]
+    if not ready:
         return {"coder_state": coder_state, "status": "DONE"}
 
-    current_task = steps[coder_state.current_step_idx]
-    existing_content = read_file.run(current_task.filepath)
-
-    system_prompt = coder_system_prompt()
-    user_prompt = (
-        f"Task: {current_task.task_description}\n"
-        f"File: {current_task.filepath}\n"
-        f"Existing content:\n{existing_content}\n"
-        "Use write_file(path, content) to save your changes."
+    # Tools resolve paths against the run's workspace, carried in the state
+    tool_config = merge_configs(
+        config, {"configurable": {"workspace": state.get("workspace")}}
     )
 
-    coder_tools = [read_file, write_file, list_files, get_current_directory]
-    react_agent = create_react_agent(llm, coder_tools)
-
-    react_agent.invoke({"messages": [{"role": "system", "content": system_prompt},
-                                     {"role": "user", "content": user_prompt}]})
-
-    coder_state.current_step_idx += 1
+    # Build the shared agent before fanning out so workers don't race to create it
+    coder_react_agent()
+
+    # Skeletons no step has worked on yet
+    skeletons_left = set(state.get("scaffolded") or []) - {
+        normalize_path(steps[idx].filepath) for idx in completed
+    }
+
+    # ContextThreadPoolExecutor copies the run context into each worker so
+    # tool progress events still reach the graph's stream
+    with ContextThreadPoolExecutor(max_workers=min(coder_max_parallel, len(ready))) as pool:
+        list(pool.map(
+            lambda idx: run_coder_step(
+                steps[idx],
+                [steps[dep].filepath for dep in sorted(dependencies[idx])],
+                tool_config,
+                skeleton=normalize_path(steps[idx].filepath) in skeletons_left,
+            ),
+            ready,
+        ))
+
+    coder_state.completed_steps = sorted(completed.union(ready))
+    coder_state.current_batch = ready
     return {"coder_state": coder_state}
 
 
-graph = StateGraph(dict)
+graph = StateGraph(GraphState)
 
 graph.add_node("planner", planner_agent)
 graph.add_node("architect", architect_agent)
+graph.add_node("editor", editor_agent)
 graph.add_node("coder", coder_agent)
+if speculative_scaffold:
+    graph.add_node("scaffold", scaffold_agent)
 
 graph.add_edge("planner", "architect")
-graph.add_edge("architect", "coder")
+if speculative_scaffold:
+    # The scaffold runs in the same step as the architect; the coder waits for both
+    graph.add_edge("planner", "scaffold")
+    graph.add_edge(["architect", "scaffold"], "coder")
+else:
+    graph.add_edge("architect", "coder")
+graph.add_edge("editor", "coder")
 graph.add_conditional_edges(
     "coder",
     lambda s: "END" if s.get("status") == "DONE" else "coder",
     {"END": END, "coder": "coder"}
 )
 
-graph.set_entry_point("planner")
+# Edits of an existing workspace skip planning and go straight to a targeted task plan
+graph.set_conditional_entry_point(
+    lambda s: "editor" if s.get("edit_request") else "planner",
+    {"editor": "editor", "planner": "planner"}
+)
 agent = graph.compile()
+
+
+@functools.lru_cache(maxsize=None)
+def checkpointer() -> SqliteSaver:
+    """Returns the shared SQLite checkpoint store."""
+    checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+    return SqliteSaver(sqlite3.connect(str(checkpoint_path), check_same_thread=False))
+
+
+@functools.lru_cache(maxsize=None)
+def checkpointed_agent():
+    """Returns the graph compiled with the checkpointer.
+
+    State is saved after every node under the run's ``thread_id``, so a run
+    that failed part-way can be resumed by streaming ``None`` on the same thread.
+    """
+    return graph.compile(checkpointer=checkpointer())
+
+
+def delete_checkpoints(thread_id: str):
+    """Drops the saved checkpoints of a run."""
+    checkpointer().delete_thread(thread_id)
+
 if __name__ == "__main__":
     result = agent.invoke({"user_prompt": "Build a colourful modern todo app in html css and js"},
                           {"recursion_limit": 100})
@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import pathlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Type, TypeVar
+
+from pydantic import BaseModel
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class StructuredOutputCache:
+    """Content-addressed cache for parsed structured LLM responses.
+
+    Entries are keyed on (model, temperature, schema, prompt) and stored as
+    JSON in a SQLite file, fronted by an in-memory LRU. Both layers expire
+    entries after ``ttl`` seconds; the SQLite layer keeps at most
+    ``max_entries`` rows, dropping the least recently used first.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+        self.path = pathlib.Path(
+            os.getenv("LLM_CACHE_PATH", pathlib.Path.cwd() / ".cache" / "llm_cache.sqlite3")
+        )
+        self.ttl = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+        self.max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+        self.memory_entries = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "128"))
+
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+
+        self._memory: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    @staticmethod
+    def key(model: str, temperature: float, schema: Type[BaseModel], prompt: str) -> str:
+        payload = json.dumps(
+            [model, temperature, schema.__name__, schema.model_json_schema(), prompt],
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, schema: Type[T]) -> Optional[T]:
+        """Return a fresh copy of the cached response, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return schema.model_validate_json(entry[1])
+
+            db = self._connection()
+            row = db.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] >= self.ttl:
+                self.misses += 1
+                return None
+
+            db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            db.commit()
+            self._remember(key, row[1], row[0])
+            self.hits += 1
+
+        return schema.model_validate_json(row[0])
+
+    def put(self, key: str, value: BaseModel):
+        if not self.enabled:
+            return
+
+        now = time.time()
+        data = value.model_dump_json()
+        with self._lock:
+            self._remember(key, now, data)
+            db = self._connection()
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, data, now, now),
+            )
+            db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+            db.execute(
+                "DELETE FROM responses WHERE key NOT IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            db.commit()
+
+    def _remember(self, key: str, created_at: float, data: str):
+        self._memory[key] = (created_at, data)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._connection().execute("DELETE FROM responses")
+            self._connection().commit()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+        }
+
+
+llm_cache = StructuredOutputCache()
@@ -0,0 +1,317 @@
+import os
+import time
+import random
+import logging
+import functools
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+from agent.metrics import LLM_ABANDONED, LLM_FALLBACKS, LLM_HEDGES, LLM_RETRIES
+
+logger = logging.getLogger(__name__)
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """An LLM call ran out of its node's deadline across all attempts"""
+
+
+def _parse_node_values(value: str) -> Dict[str, float]:
+    """Parse "planner:20,coder:90" into {"planner": 20.0, "coder": 90.0}"""
+    return {
+        node.strip(): float(number)
+        for node, number in (
+            entry.rsplit(":", 1) for entry in value.split(",") if ":" in entry
+        )
+    }
+
+
+class LLMRouter(BaseChatModel):
+    """Chat model that sends each completion to a primary or a fallback model.
+
+    Every call gets a deadline from ``node_deadlines`` (keyed by graph node,
+    e.g. ``planner`` or ``coder``) or ``default_deadline``, covering all of
+    its attempts. A failed or timed-out attempt is retried with full-jitter
+    exponential backoff, up to ``retries`` times. When an attempt is still
+    running after the node's observed ``hedge_quantile`` latency, a hedged
+    duplicate is sent and whichever answers first wins. Nodes listed in
+    ``fallback_nodes`` send their hedges and retries to the ``fallback``
+    model, which should be smaller or faster than the primary.
+
+    Attempts that are still queued when their call gives up (deadline,
+    cancellation, or a faster hedge) are cancelled; attempts already running
+    can't be interrupted and are counted as abandoned. Each node has at most
+    ``node_concurrency`` (or ``default_node_concurrency``) attempts in flight,
+    abandoned ones included, so calls that gave up can't pile up on the pool;
+    hedges are skipped while a node is at its cap. When the call belongs to a
+    generation run, its cancel token is checked every ``cancel_poll`` seconds
+    while the call waits for a slot or an answer, and wakes the retry
+    backoff, so a cancelled run stops waiting at once.
+
+    Tool binding and structured output are delegated to the primary model,
+    so the router can replace it anywhere.
+    """
+
+    primary: BaseChatModel
+    fallback: Optional[BaseChatModel] = None
+    fallback_nodes: FrozenSet[str] = frozenset()
+    node_deadlines: Dict[str, float] = {}
+    default_deadline: float = 60.0
+    retries: int = 2
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    hedge_quantile: float = 0.95  # 0 disables hedging
+    hedge_min_samples: int = 20
+    hedge_window: int = 200
+    node_concurrency: Dict[str, float] = {}
+    default_node_concurrency: int = 16
+    max_workers: int = 32
+    cancel_poll: float = 0.1
+
+    _latencies: Dict[Tuple[str, str], Deque[float]] = PrivateAttr(default_factory=dict)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _pool: Optional[ThreadPoolExecutor] = PrivateAttr(default=None)
+    _slots: Dict[str, threading.BoundedSemaphore] = PrivateAttr(default_factory=dict)
+
+    @classmethod
+    def from_env(cls, primary: BaseChatModel, fallback: Optional[BaseChatModel] = None) -> "LLMRouter":
+        return cls(
+            primary=primary,
+            fallback=fallback,
+            fallback_nodes=frozenset(
+                node.strip()
+                for node in os.getenv("LLM_FALLBACK_NODES", "planner").split(",")
+                if node.strip()
+            ),
+            node_deadlines=_parse_node_values(
+                os.getenv("LLM_NODE_DEADLINES", "planner:30,architect:60,editor:60,coder:90")
+            ),
+            default_deadline=float(os.getenv("LLM_DEADLINE_SECONDS", "60")),
+            retries=int(os.getenv("LLM_RETRIES", "2")),
+            backoff_base=float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5")),
+            backoff_max=float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8")),
+            hedge_quantile=float(os.getenv("LLM_HEDGE_QUANTILE", "0.95")),
+            hedge_min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")),
+            node_concurrency=_parse_node_values(os.getenv("LLM_NODE_CONCURRENCY", "")),
+            default_node_concurrency=int(os.getenv("LLM_NODE_CONCURRENCY_DEFAULT", "16")),
+            max_workers=int(os.getenv("LLM_ROUTER_MAX_WORKERS", "32")),
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "llm-router"
+
+    # Model name and temperature of the primary, so cache keys don't change
+    @property
+    def model_name(self) -> str:
+        return getattr(self.primary, "model_name", type(self.primary).__name__)
+
+    @property
+    def temperature(self) -> Optional[float]:
+        return getattr(self.primary, "temperature", None)
+
+    def bind_tools(self, tools, **kwargs):
+        try:
+            bound = self.primary.bind_tools(tools, **kwargs)
+        except NotImplementedError:
+            return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+        # Keep the primary's provider-specific tool formatting, but call through the router
+        return self.bind(**bound.kwargs)
+
+    @staticmethod
+    def node_of(run_manager: Any) -> str:
+        """The top-level graph node making the call (e.g. "coder" for its ReAct agent)"""
+        metadata = getattr(run_manager, "metadata", None) or {}
+        namespace = metadata.get("langgraph_checkpoint_ns") or ""
+        return namespace.split(":", 1)[0] or metadata.get("langgraph_node") or "default"
+
+    @staticmethod
+    def cancel_of(run_manager: Any) -> Optional[Any]:
+        """The cancel token of the generation run making the call, if any
+
+        Runs pass a handler holding their token (see ``CancellationHandler``)
+        in their callbacks, and every nested call inherits it.
+        """
+        for handler in getattr(run_manager, "handlers", None) or ():
+            cancel = getattr(handler, "cancel", None)
+            if cancel is not None and hasattr(cancel, "wait"):
+                return cancel
+        return None
+
+    def _slot(self, node: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            slot = self._slots.get(node)
+            if slot is None:
+                limit = int(self.node_concurrency.get(node, self.default_node_concurrency))
+                slot = self._slots[node] = threading.BoundedSemaphore(max(1, limit))
+            return slot
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm")
+            return self._pool
+
+    def _model_for(self, node: str, retry: bool) -> BaseChatModel:
+        if retry and self.fallback is not None and node in self.fallback_nodes:
+            return self.fallback
+        return self.primary
+
+    def _window(self, model: BaseChatModel, node: str) -> Deque[float]:
+        key = (getattr(model, "model_name", type(model).__name__), node)
+        with self._lock:
+            window = self._latencies.get(key)
+            if window is None:
+                window = self._latencies[key] = deque(maxlen=self.hedge_window)
+            return window
+
+    def hedge_delay(self, model: BaseChatModel, node: str) -> Optional[float]:
+        """Seconds after which an attempt is hedged, or None while too few latencies are known"""
+        if self.hedge_quantile <= 0:
+            return None
+        latencies = sorted(self._window(model, node))
+        if len(latencies) < self.hedge_min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(self.hedge_quantile * len(latencies)))]
+
+    def observe(self, model: BaseChatModel, node: str, seconds: float):
+        self._window(model, node).append(seconds)
+
+    def _wait(self, cancel: Optional[Any], timeout: float) -> float:
+        """Shorten a wait so the run's cancel token is checked every ``cancel_poll`` seconds"""
+        return timeout if cancel is None else min(timeout, self.cancel_poll)
+
+    def _submit(
+        self,
+        model: BaseChatModel,
+        node: str,
+        call_args: Tuple[Any, ...],
+        deadline: Optional[float] = None,
+        cancel: Optional[Any] = None,
+    ) -> Optional[Future]:
+        """Start an attempt once the node has a free slot
+
+        Waits for a slot until ``deadline``, or returns None straight away
+        without a deadline (hedges are only sent when there is room).
+        """
+        slot = self._slot(node)
+        if deadline is None:
+            if not slot.acquire(blocking=False):
+                return None
+        else:
+            while not slot.acquire(timeout=self._wait(cancel, max(0.0, deadline - time.monotonic()))):
+                if cancel is not None:
+                    cancel.check()
+                if time.monotonic() >= deadline:
+                    raise LLMDeadlineExceeded(f"LLM call for {node} exceeded its deadline waiting for a slot")
+
+        messages, stop, kwargs = call_args
+        started = time.monotonic()
+        future = self._executor().submit(
+            functools.partial(model._generate, messages, stop=stop, **kwargs)
+        )
+
+        # Every successful attempt counts, including losers of a hedge, so
+        # hedging doesn't bias the observed latencies downwards
+        def record(done: Future):
+            slot.release()
+            if not done.cancelled() and done.exception() is None:
+                self.observe(model, node, time.monotonic() - started)
+
+        future.add_done_callback(record)
+        return future
+
+    @staticmethod
+    def _abandon(pending: Set[Future], node: str):
+        """Cancel attempts nobody waits for; running ones finish on their own"""
+        for future in pending:
+            if not future.cancel():
+                LLM_ABANDONED.inc(node=node)
+
+    def _attempt(
+        self, model: BaseChatModel, node: str, deadline: float, call_args, cancel: Optional[Any] = None
+    ) -> ChatResult:
+        """One attempt, hedged once if it outlives the node's usual latency"""
+        started = time.monotonic()
+        hedge_after = self.hedge_delay(model, node)
+        pending = {self._submit(model, node, call_args, deadline, cancel)}
+        error: Optional[BaseException] = None
+
+        try:
+            while pending:
+                now = time.monotonic()
+                if now >= deadline:
+                    raise LLMDeadlineExceeded(f"LLM call for {node} exceeded its deadline")
+                timeout = deadline - now
+                if hedge_after is not None:
+                    timeout = min(timeout, max(0.0, started + hedge_after - now))
+
+                done, pending = wait(pending, timeout=self._wait(cancel, timeout), return_when=FIRST_COMPLETED)
+                if cancel is not None and not done:
+                    cancel.check()
+                for future in done:
+                    try:
+                        return future.result()
+                    except Exception as e:
+                        error = e
+
+                if hedge_after is not None and time.monotonic() - started >= hedge_after:
+                    hedge_after = None  # one hedge per attempt
+                    hedge = self._submit(self._model_for(node, retry=True), node, call_args)
+                    if hedge is not None:
+                        LLM_HEDGES.inc(node=node)
+                        pending.add(hedge)
+            raise error
+        finally:
+            self._abandon(pending, node)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        node = self.node_of(run_manager)
+        budget = self.node_deadlines.get(node, self.default_deadline)
+        deadline = time.monotonic() + budget
+        call_args = (messages, stop, kwargs)
+        cancel = self.cancel_of(run_manager)
+
+        error: Optional[BaseException] = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                # Full jitter keeps retries from many runs from arriving in lockstep
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+                if time.monotonic() + delay >= deadline:
+                    break
+                if cancel is None:
+                    time.sleep(delay)
+                elif cancel.wait(delay):
+                    cancel.check()
+                LLM_RETRIES.inc(node=node)
+
+            model = self._model_for(node, retry=attempt > 0)
+            if model is not self.primary:
+                LLM_FALLBACKS.inc(node=node)
+            try:
+                return self._attempt(model, node, deadline, call_args, cancel)
+            except LLMDeadlineExceeded as e:
+                error = e
+                break
+            except Exception as e:
+                if cancel is not None and cancel.cancelled:
+                    raise
+                logger.warning(f"LLM attempt {attempt + 1} for {node} failed: {str(e)}")
+                error = e
+
+        if isinstance(error, LLMDeadlineExceeded) or error is None:
+            raise LLMDeadlineExceeded(f"LLM call for {node} exceeded its {budget:g}s deadline")
+        raise error
@@ -0,0 +1,219 @@
+import time
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds, from fast auth checks to multi-minute generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels.get(name, "")) for name in self.labelnames), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[idx] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(tuple(str(labels.get(name, "")) for name in self.labelnames))
+        return entry[2] if entry else 0
+
+    @contextmanager
+    def time(self, **labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+                labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Gauge:
+    """A gauge whose value is read from a callback at scrape time."""
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {self.read()}",
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+NODE_DURATION = registry.register(Histogram(
+    "arc_graph_node_duration_seconds", "Time spent in each LangGraph node", ("node",)
+))
+NODE_ERRORS = registry.register(Counter(
+    "arc_graph_node_errors_total", "LangGraph node runs that raised", ("node",)
+))
+TOOL_DURATION = registry.register(Histogram(
+    "arc_tool_duration_seconds", "Time spent in each coder tool call", ("tool",)
+))
+TOOL_ERRORS = registry.register(Counter(
+    "arc_tool_errors_total", "Coder tool calls that raised", ("tool",)
+))
+TOOL_BYTES_WRITTEN = registry.register(Counter(
+    "arc_tool_bytes_written_total", "Bytes of file content written to workspaces (write_file, edit_file, scaffolding)"
+))
+LLM_CALLS = registry.register(Counter(
+    "arc_llm_calls_total", "LLM completions by graph node", ("node",)
+))
+LLM_TOKENS = registry.register(Counter(
+    "arc_llm_tokens_total", "LLM tokens by graph node and kind (prompt/completion)", ("node", "kind")
+))
+LLM_RETRIES = registry.register(Counter(
+    "arc_llm_retries_total", "LLM requests retried after a failure or timeout", ("node",)
+))
+LLM_HEDGES = registry.register(Counter(
+    "arc_llm_hedged_requests_total", "Duplicate LLM requests sent after the p95 latency passed", ("node",)
+))
+LLM_ABANDONED = registry.register(Counter(
+    "arc_llm_abandoned_requests_total",
+    "LLM requests still running when their call gave up (deadline, cancellation or a faster hedge)",
+    ("node",),
+))
+LLM_FALLBACKS = registry.register(Counter(
+    "arc_llm_fallbacks_total", "LLM attempts sent to the fallback model", ("node",)
+))
+HTTP_DURATION = registry.register(Histogram(
+    "arc_http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+))
+AUTH_DURATION = registry.register(Histogram(
+    "arc_auth_duration_seconds", "Time to authenticate a request, by how it was verified", ("source",)
+))
+
+
+def timed_node(name: str):
+    """Decorates a graph node to record its duration and failures."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with NODE_DURATION.time(node=name):
+                try:
+                    return fn(*args, **kwargs)
+                except Exception:
+                    NODE_ERRORS.inc(node=name)
+                    raise
+
+        return wrapper
+
+    return decorator
+
+
+def timed_tool(name: str):
+    """Decorates a tool function (below @tool) to record its duration and failures."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with TOOL_DURATION.time(tool=name):
+                try:
+                    return fn(*args, **kwargs)
+                except Exception:
+                    TOOL_ERRORS.inc(tool=name)
+                    raise
+
+        return wrapper
+
+    return decorator
+
+
+def record_llm_usage(node: str, messages: Iterable[object]):
+    """Counts calls and prompt/completion tokens from AIMessage usage metadata."""
+    for message in messages:
+        usage: Optional[dict] = getattr(message, "usage_metadata", None)
+        if getattr(message, "type", None) != "ai":
+            continue
+        LLM_CALLS.inc(node=node)
+        if usage:
+            LLM_TOKENS.inc(usage.get("input_tokens", 0), node=node, kind="prompt")
+            LLM_TOKENS.inc(usage.get("output_tokens", 0), node=node, kind="completion")
@@ -0,0 +1,181 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+from agent.states import Plan, TaskPlan
+
+_WORDS = re.compile(r"[a-z0-9]+")
+
+# Words that say nothing about which project is wanted
+STOP_WORDS = frozenset(
+    "a an the my me our your for with and or of to in on using use that this it is be "
+    "please i we want need would like can could some build create make generate write "
+    "develop design app application website site web page simple basic small".split()
+)
+
+# British spellings, so "colourful" and "colorful" fingerprint the same
+SPELLINGS = {"colour": "color", "favourite": "favorite", "centre": "center", "organis": "organiz"}
+
+
+def normalized_words(prompt: str) -> List[str]:
+    text = prompt.lower().replace("to-do", "todo").replace("to do", "todo")
+    for british, american in SPELLINGS.items():
+        text = text.replace(british, american)
+    words = []
+    for word in _WORDS.findall(text):
+        if word in STOP_WORDS:
+            continue
+        # Plural and singular ("tasks", "task") are the same word here
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+class PlanMatch(NamedTuple):
+    plan: Plan
+    task_plan: TaskPlan
+    similarity: float
+
+
+# (user id, fingerprint); entries are never shared between users
+_Key = Tuple[str, FrozenSet[str]]
+
+
+class _Entry(NamedTuple):
+    prompt: str
+    plan: Plan
+    task_plan: TaskPlan
+
+
+class SemanticPlanCache:
+    """In-process cache of planner/architect results for a user's similar prompts.
+
+    Entries belong to the user whose run produced them and only serve that
+    user's later prompts, so one user's plans (and the names in them) never
+    reach another user; runs without a user are not cached.
+
+    Each prompt is reduced to a fingerprint: the set of word shingles
+    (``shingle_size`` consecutive words) of its normalized text, without
+    filler words. A lookup returns the stored Plan and TaskPlan of the
+    user's most similar earlier prompt (Jaccard similarity of the
+    fingerprints) when it reaches ``threshold``, so the planner and architect
+    are skipped. Unless the fingerprints are identical, the plans are
+    adapted: every step is told the new request, so the coder builds what
+    was actually asked for. An inverted index over (user, shingle) keeps
+    lookups to the user's entries sharing a shingle with the prompt; at most
+    ``max_entries`` are kept, least recently used first out.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("PLAN_CACHE_ENABLED", "false").lower() == "true"
+        # Strict enough that a prompt differing in a feature or a name
+        # ("portfolio for John Smith" / "... Jane Smith", 0.5) misses
+        self.threshold = float(os.getenv("PLAN_CACHE_THRESHOLD", "0.8"))
+        self.max_entries = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "256"))
+        self.shingle_size = int(os.getenv("PLAN_CACHE_SHINGLE_SIZE", "1"))
+
+        self.hits = 0
+        self.adapted = 0
+        self.misses = 0
+
+        self._entries: "OrderedDict[_Key, _Entry]" = OrderedDict()
+        self._index: Dict[Tuple[str, str], Set[_Key]] = {}
+        self._lock = threading.Lock()
+
+    def fingerprint(self, prompt: str) -> FrozenSet[str]:
+        words = normalized_words(prompt)
+        size = max(1, min(self.shingle_size, len(words)))
+        return frozenset(" ".join(words[idx:idx + size]) for idx in range(len(words) - size + 1))
+
+    def lookup(self, prompt: str, user_id: Optional[str]) -> Optional[PlanMatch]:
+        """Return (copies of) the plans cached for the user's most similar prompt, or None"""
+        if not self.enabled or user_id is None:
+            return None
+        fingerprint = self.fingerprint(prompt)
+        if not fingerprint:
+            return None
+
+        with self._lock:
+            candidates = set().union(
+                *(self._index.get((user_id, shingle), ()) for shingle in fingerprint)
+            )
+            best, similarity = None, 0.0
+            for key in candidates:
+                cached = key[1]
+                score = len(cached & fingerprint) / len(cached | fingerprint)
+                if score > similarity:
+                    best, similarity = key, score
+            if best is None or similarity < self.threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best)
+            entry = self._entries[best]
+            self.hits += 1
+            if similarity < 1.0:
+                self.adapted += 1
+
+        plan = entry.plan.model_copy(deep=True)
+        task_plan = entry.task_plan.model_copy(deep=True)
+        if similarity < 1.0:
+            plan, task_plan = self.adapt(plan, task_plan, prompt)
+        task_plan.plan = plan
+        return PlanMatch(plan, task_plan, similarity)
+
+    @staticmethod
+    def adapt(plan: Plan, task_plan: TaskPlan, prompt: str):
+        """Point plans made for a similar prompt at this prompt"""
+        request = " ".join(prompt.split())
+        plan.features.append(f"Everything asked for in: {request}")
+        for step in task_plan.implementation_steps:
+            step.task_description += (
+                f"\nThis plan was made for a similar request; adapt the step to this one: {request}"
+            )
+        return plan, task_plan
+
+    def put(self, prompt: str, user_id: Optional[str], plan: Plan, task_plan: TaskPlan):
+        if not self.enabled or user_id is None:
+            return
+        fingerprint = self.fingerprint(prompt)
+        if not fingerprint:
+            return
+        key = (user_id, fingerprint)
+
+        task_plan = task_plan.model_copy(deep=True)
+        # Stored once, on the entry; set again on every copy handed out
+        if hasattr(task_plan, "plan"):
+            delattr(task_plan, "plan")
+        entry = _Entry(prompt, plan.model_copy(deep=True), task_plan)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            for shingle in fingerprint:
+                self._index.setdefault((user_id, shingle), set()).add(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                evicted_user, evicted_fingerprint = evicted
+                for shingle in evicted_fingerprint:
+                    keys = self._index.get((evicted_user, shingle))
+                    if keys is not None:
+                        keys.discard(evicted)
+                        if not keys:
+                            del self._index[(evicted_user, shingle)]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "adapted": self.adapted,
+            "misses": self.misses,
+            "entries": len(self._entries),
+        }
+
+
+plan_cache = SemanticPlanCache()
@@ -0,0 +1,148 @@
+import html
+import posixpath
+from typing import Dict, List
+
+from agent.states import Plan
+
+# Files of a plain static site; plans with anything else (package.json,
+# .jsx, .vue, ...) use a build setup whose entry files look different
+STATIC_SITE_SUFFIXES = {
+    ".html", ".htm", ".css", ".js", ".md", ".txt", ".svg", ".ico", ".png", ".jpg", ".jpeg", ".webp",
+}
+
+
+def _suffix(path: str) -> str:
+    return posixpath.splitext(path.lower())[1]
+
+
+def normalize_path(path: str) -> str:
+    """Workspace-relative POSIX form of a planned path ("./js\\app.js" -> "js/app.js")"""
+    return posixpath.normpath(path.replace("\\", "/")).lstrip("/")
+
+
+def escapes_workspace(path: str) -> bool:
+    """Whether a planned path points outside the workspace (or at its root)"""
+    normalized = normalize_path(path)
+    return normalized in ("", ".", "..") or normalized.startswith("../")
+
+
+def _comment(text: str) -> str:
+    """Text that is safe inside a single-line HTML, CSS or JavaScript comment"""
+    return " ".join(text.split()).replace("*/", "* /").replace("--", "- -")
+
+
+def _relative(target: str, source: str) -> str:
+    """URL of ``target`` as referenced from the file ``source``"""
+    return posixpath.relpath(target, posixpath.dirname(source) or ".")
+
+
+def _html_skeleton(plan: Plan, path: str, styles: List[str], scripts: List[str]) -> str:
+    title = html.escape(plan.name)
+    lines = [
+        "<!DOCTYPE html>",
+        '<html lang="en">',
+        "<head>",
+        '    <meta charset="UTF-8">',
+        '    <meta name="viewport" content="width=device-width, initial-scale=1.0">',
+        f'    <meta name="description" content="{html.escape(plan.description)}">',
+        f"    <title>{title}</title>",
+        *(f'    <link rel="stylesheet" href="{_relative(style, path)}">' for style in styles),
+        "</head>",
+        "<body>",
+        '    <header class="app-header">',
+        f"        <h1>{title}</h1>",
+        f"        <p>{html.escape(plan.description)}</p>",
+        "    </header>",
+        '    <main class="app-main">',
+    ]
+    for feature in plan.features:
+        lines += [
+            "        <section>",
+            f"            <!-- {_comment(feature)} -->",
+            "        </section>",
+        ]
+    lines += [
+        "    </main>",
+        *(f'    <script src="{_relative(script, path)}"></script>' for script in scripts),
+        "</body>",
+        "</html>",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def _css_skeleton(plan: Plan) -> str:
+    features = "".join(f"\n/* {_comment(feature)} */\n" for feature in plan.features)
+    return f"""/* {_comment(plan.name)}: {_comment(plan.description)} */
+
+:root {{
+    --color-primary: #4f46e5;
+    --color-text: #1f2937;
+    --color-background: #f9fafb;
+    --radius: 8px;
+}}
+
+*, *::before, *::after {{
+    box-sizing: border-box;
+}}
+
+body {{
+    margin: 0;
+    font-family: system-ui, -apple-system, "Segoe UI", Roboto, sans-serif;
+    color: var(--color-text);
+    background: var(--color-background);
+    line-height: 1.5;
+}}
+
+.app-header {{
+    padding: 2rem 1rem;
+    text-align: center;
+}}
+
+.app-main {{
+    max-width: 960px;
+    margin: 0 auto;
+    padding: 1rem;
+}}
+{features}
+@media (max-width: 600px) {{
+    .app-header {{
+        padding: 1.5rem 1rem;
+    }}
+}}
+"""
+
+
+def _js_skeleton(plan: Plan) -> str:
+    features = "".join(f"    // {_comment(feature)}\n" for feature in plan.features)
+    return f"""// {_comment(plan.name)}: {_comment(plan.description)}
+'use strict';
+
+document.addEventListener('DOMContentLoaded', () => {{
+{features}}});
+"""
+
+
+def skeletons(plan: Plan) -> Dict[str, str]:
+    """Skeleton content for the well-known files of a plan, keyed by path
+
+    Only plain static sites are scaffolded: their HTML, CSS and JavaScript
+    files get a standard layout (linked together, one placeholder per
+    feature) that the coder steps then fill in. Other plans get no skeletons.
+    """
+    paths = [normalize_path(file.path) for file in plan.files if not escapes_workspace(file.path)]
+    if not paths or any(_suffix(path) not in STATIC_SITE_SUFFIXES for path in paths):
+        return {}
+
+    styles = [path for path in paths if _suffix(path) == ".css"]
+    scripts = [path for path in paths if _suffix(path) == ".js"]
+    result = {}
+    for path in paths:
+        suffix = _suffix(path)
+        if suffix in (".html", ".htm"):
+            result[path] = _html_skeleton(plan, path, styles, scripts)
+        elif suffix == ".css":
+            result[path] = _css_skeleton(plan)
+        elif suffix == ".js":
+            result[path] = _js_skeleton(plan)
+    return result
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, TypedDict
 
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -17,6 +17,7 @@ class Plan(BaseModel):
 class ImplementationTask(BaseModel):
     filepath: str = Field(description="The path to the file to be modified")
     task_description: str = Field(description="A detailed description of the task to be performed on the file, e.g. 'add user authentication', 'implement data processing logic', etc.")
+    depends_on: list[int] = Field(default_factory=list, description="0-based indices of earlier steps whose output this step needs, e.g. [0, 2]. Leave empty if the step is independent.")
 
 class TaskPlan(BaseModel):
     implementation_steps: list[ImplementationTask] = Field(description="A list of steps to be taken to implement the task")
@@ -24,5 +25,19 @@ class TaskPlan(BaseModel):
     
 class CoderState(BaseModel):
     task_plan: TaskPlan = Field(description="The plan for the task to be implemented")
-    current_step_idx: int = Field(0, description="The index of the current step in the implementation steps")
-    current_file_content: Optional[str] = Field(None, description="The content of the file currently being edited or created")
\ No newline at end of file
+    completed_steps: list[int] = Field(default_factory=list, description="Indices of the implementation steps that have finished")
+    current_batch: list[int] = Field(default_factory=list, description="Indices of the steps run concurrently in the latest coder pass")
+    current_file_content: Optional[str] = Field(None, description="The content of the file currently being edited or created")
+
+
+class GraphState(TypedDict, total=False):
+    user_prompt: str
+    user_id: str  # Requesting user; scopes the semantic plan cache
+    edit_request: str  # Set for edits of an existing workspace; skips the planner
+    workspace: str  # Directory the coder's tools read from and write to
+    plan: Plan
+    plan_similarity: float  # Set when the plans came from the semantic plan cache
+    scaffolded: list[str]  # Skeleton files written from the plan (speculative scaffolding)
+    task_plan: TaskPlan
+    coder_state: CoderState
+    status: str
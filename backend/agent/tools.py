@@ -1,62 +1,112 @@
 import pathlib
 import subprocess
-from typing import Tuple
+from typing import Optional, Tuple
 
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
+from langgraph.config import get_stream_writer
 
-PROJECT_ROOT = pathlib.Path.cwd() / "generated_project"
+from agent.blobs import blob_store
+from agent.metrics import TOOL_BYTES_WRITTEN, timed_tool
+# Workspace helpers live in a langchain-free module so the API can import them cheaply
+from agent.workspaces import (
+    PROJECT_ROOT,
+    WORKSPACES_ROOT,
+    safe_path_for_project,
+    read_workspace_file,
+    init_project_root,
+    workspace_path,
+    create_workspace,
+    copy_workspace,
+    remove_workspace,
+    evict_stale_workspaces,
+)
 
 
-def safe_path_for_project(path: str) -> pathlib.Path:
-    p = (PROJECT_ROOT / path).resolve()
-    if PROJECT_ROOT.resolve() not in p.parents and PROJECT_ROOT.resolve() != p.parent and PROJECT_ROOT.resolve() != p:
-        raise ValueError("Attempt to write outside project root")
-    return p
+def workspace_root(config: Optional[RunnableConfig] = None) -> pathlib.Path:
+    """Returns the workspace bound to the current graph run, or PROJECT_ROOT."""
+    workspace = ((config or {}).get("configurable") or {}).get("workspace")
+    return pathlib.Path(workspace) if workspace else PROJECT_ROOT
+
+
+def emit_progress(event: dict):
+    """Forward a progress event to the graph's custom stream when streaming."""
+    try:
+        writer = get_stream_writer()
+    except (RuntimeError, KeyError):
+        # Called outside of a graph run (e.g. tool.invoke in a script or test)
+        return
+    writer(event)
 
 
 @tool
-def write_file(path: str, content: str) -> str:
+@timed_tool("write_file")
+def write_file(path: str, content: str, config: RunnableConfig) -> str:
     """Writes content to a file at the specified path within the project root."""
-    p = safe_path_for_project(path)
-    p.parent.mkdir(parents=True, exist_ok=True)
-    with open(p, "w", encoding="utf-8") as f:
-        f.write(content)
+    p = safe_path_for_project(path, workspace_root(config))
+    data = content.encode("utf-8")
+    # Files are links into the shared blob store; never write to them in place
+    blob_store.write(p, data)
+    size = len(data)
+    TOOL_BYTES_WRITTEN.inc(size)
+    emit_progress({"type": "file", "path": path, "bytes": size})
     return f"WROTE:{p}"
 
 
 @tool
-def read_file(path: str) -> str:
-    """Reads content from a file at the specified path within the project root."""
-    p = safe_path_for_project(path)
+@timed_tool("edit_file")
+def edit_file(path: str, old_text: str, new_text: str, config: RunnableConfig) -> str:
+    """Replaces one exact occurrence of old_text with new_text in an existing file.
+
+    Use this for targeted changes instead of rewriting the whole file; old_text
+    must match the file exactly (including whitespace) and be unique in it.
+    """
+    p = safe_path_for_project(path, workspace_root(config))
     if not p.exists():
-        return ""
+        return f"ERROR: {path} does not exist, use write_file to create it"
     with open(p, "r", encoding="utf-8") as f:
-        return f.read()
+        content = f.read()
+    occurrences = content.count(old_text) if old_text else 0
+    if occurrences != 1:
+        return f"ERROR: old_text matches {occurrences} times in {path}, it must match exactly once"
+    data = content.replace(old_text, new_text, 1).encode("utf-8")
+    # The whole file is rewritten, not just the snippet
+    blob_store.write(p, data)
+    TOOL_BYTES_WRITTEN.inc(len(data))
+    emit_progress({"type": "file", "path": path, "bytes": len(data)})
+    return f"EDITED:{p}"
+
+
+@tool
+@timed_tool("read_file")
+def read_file(path: str, config: RunnableConfig) -> str:
+    """Reads content from a file at the specified path within the project root."""
+    return read_workspace_file(path, workspace_root(config))
 
 
 @tool
-def get_current_directory() -> str:
+@timed_tool("get_current_directory")
+def get_current_directory(config: RunnableConfig) -> str:
     """Returns the current working directory."""
-    return str(PROJECT_ROOT)
+    return str(workspace_root(config))
 
 
 @tool
-def list_files(directory: str = ".") -> str:
+@timed_tool("list_files")
+def list_files(config: RunnableConfig, directory: str = ".") -> str:
     """Lists all files in the specified directory within the project root."""
-    p = safe_path_for_project(directory)
+    root = workspace_root(config)
+    p = safe_path_for_project(directory, root)
     if not p.is_dir():
         return f"ERROR: {p} is not a directory"
-    files = [str(f.relative_to(PROJECT_ROOT)) for f in p.glob("**/*") if f.is_file()]
+    files = [str(f.relative_to(root.resolve())) for f in p.glob("**/*") if f.is_file()]
     return "\n".join(files) if files else "No files found."
 
 @tool
-def run_cmd(cmd: str, cwd: str = None, timeout: int = 30) -> Tuple[int, str, str]:
+@timed_tool("run_cmd")
+def run_cmd(cmd: str, config: RunnableConfig, cwd: str = None, timeout: int = 30) -> Tuple[int, str, str]:
     """Runs a shell command in the specified directory and returns the result."""
-    cwd_dir = safe_path_for_project(cwd) if cwd else PROJECT_ROOT
+    root = workspace_root(config)
+    cwd_dir = safe_path_for_project(cwd, root) if cwd else root
     res = subprocess.run(cmd, shell=True, cwd=str(cwd_dir), capture_output=True, text=True, timeout=timeout)
     return res.returncode, res.stdout, res.stderr
-
-
-def init_project_root():
-    PROJECT_ROOT.mkdir(parents=True, exist_ok=True)
-    return str(PROJECT_ROOT)
\ No newline at end of file
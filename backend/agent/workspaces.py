@@ -0,0 +1,97 @@
+import os
+import time
+import shutil
+import pathlib
+from typing import Collection, Optional
+
+from agent.blobs import blob_store
+
+PROJECT_ROOT = pathlib.Path.cwd() / "generated_project"
+
+# Per-job workspaces live under this directory, one sub-directory per job id
+WORKSPACES_ROOT = pathlib.Path(os.getenv("WORKSPACES_ROOT", pathlib.Path.cwd() / "workspaces"))
+
+
+def safe_path_for_project(path: str, root: Optional[pathlib.Path] = None) -> pathlib.Path:
+    root = (root or PROJECT_ROOT).resolve()
+    p = (root / path).resolve()
+    if root not in p.parents and root != p.parent and root != p:
+        raise ValueError("Attempt to write outside project root")
+    return p
+
+
+def read_workspace_file(path: str, root: Optional[pathlib.Path] = None) -> str:
+    """Reads a file within root, returning "" if it does not exist."""
+    p = safe_path_for_project(path, root)
+    if not p.exists():
+        return ""
+    with open(p, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def init_project_root():
+    PROJECT_ROOT.mkdir(parents=True, exist_ok=True)
+    return str(PROJECT_ROOT)
+
+
+def workspace_path(job_id: str) -> pathlib.Path:
+    return safe_path_for_project(job_id, WORKSPACES_ROOT)
+
+
+def create_workspace(job_id: str) -> pathlib.Path:
+    """Creates an empty, isolated workspace directory for a job."""
+    workspace = workspace_path(job_id)
+    workspace.mkdir(parents=True, exist_ok=True)
+    return workspace
+
+
+def copy_workspace(source_id: str, job_id: str) -> pathlib.Path:
+    """Creates a job's workspace as a snapshot of another job's files (links, not copies)."""
+    workspace = workspace_path(job_id)
+    blob_store.snapshot(workspace_path(source_id), workspace)
+    return workspace
+
+
+def remove_workspace(job_id: str):
+    shutil.rmtree(workspace_path(job_id), ignore_errors=True)
+    # Blobs only this workspace referenced are now garbage
+    blob_store.maybe_collect_garbage()
+
+
+def last_modified(workspace: pathlib.Path) -> float:
+    """Newest mtime of a workspace and everything in it
+
+    A directory's own mtime only changes when entries are added or removed
+    directly in it, not when files in its subdirectories are written.
+    """
+    newest = workspace.stat().st_mtime
+    for directory, _, files in os.walk(workspace):
+        for name in [".", *files]:
+            try:
+                newest = max(newest, os.stat(os.path.join(directory, name)).st_mtime)
+            except FileNotFoundError:
+                # Replaced or removed by a run while we looked
+                continue
+    return newest
+
+
+def evict_stale_workspaces(max_age_seconds: float, keep: Collection[str] = ()) -> int:
+    """Removes workspaces with nothing modified within max_age_seconds; returns the count.
+
+    Workspaces of the jobs in ``keep`` (the ones a job record still refers
+    to) are never removed.
+    """
+    if not WORKSPACES_ROOT.is_dir():
+        return 0
+    cutoff = time.time() - max_age_seconds
+    evicted = 0
+    for workspace in WORKSPACES_ROOT.iterdir():
+        # Dot-directories (such as the blob store) are not job workspaces
+        if workspace.name.startswith(".") or workspace.name in keep or not workspace.is_dir():
+            continue
+        if last_modified(workspace) < cutoff:
+            shutil.rmtree(workspace, ignore_errors=True)
+            evicted += 1
+    if evicted:
+        blob_store.collect_garbage()
+    return evicted
@@ -0,0 +1,108 @@
+import io
+import hashlib
+import pathlib
+import zipfile
+from typing import Iterable, Iterator, List, Optional
+
+from pydantic import BaseModel
+
+from agent.workspaces import safe_path_for_project
+
+# Files are hashed and zipped in chunks of this size so memory use stays flat
+CHUNK_SIZE = 64 * 1024
+
+
+class FileEntry(BaseModel):
+    path: str
+    size: int
+    sha256: str
+
+
+def file_sha256(path: pathlib.Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_manifest(workspace: pathlib.Path, paths: Iterable[str]) -> List[FileEntry]:
+    """Describe files in ``workspace`` by path, size and content hash (missing files are skipped)"""
+    manifest = {}
+    for path in paths:
+        file = safe_path_for_project(path, workspace)
+        if file.is_file():
+            relative = file.relative_to(workspace.resolve()).as_posix()
+            manifest[relative] = FileEntry(
+                path=relative, size=file.stat().st_size, sha256=file_sha256(file)
+            )
+    return [manifest[path] for path in sorted(manifest)]
+
+
+def workspace_files(workspace: pathlib.Path) -> List[str]:
+    """Relative paths of every file in ``workspace``"""
+    root = workspace.resolve()
+    return sorted(
+        file.relative_to(root).as_posix() for file in root.glob("**/*") if file.is_file()
+    )
+
+
+def manifest_etag(manifest: Iterable[FileEntry]) -> str:
+    """Strong ETag that changes whenever a file is added, removed or modified"""
+    digest = hashlib.sha256()
+    for entry in manifest:
+        digest.update(f"{entry.path}\0{entry.sha256}\n".encode("utf-8"))
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches ``etag`` (weak comparison)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable buffer that zipfile writes into and we drain"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(workspace: pathlib.Path, manifest: Iterable[FileEntry]) -> Iterator[bytes]:
+    """Yield a deflate-compressed ZIP of the manifest's files, read from disk chunk by chunk
+
+    Because the output is not seekable, zipfile writes sizes and CRCs in data
+    descriptors after each entry, so nothing larger than one chunk is ever
+    held in memory.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for entry in manifest:
+            file = safe_path_for_project(entry.path, workspace)
+            info = zipfile.ZipInfo.from_file(file, arcname=entry.path)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(file, "rb") as src, archive.open(info, "w") as dst:
+                while chunk := src.read(CHUNK_SIZE):
+                    dst.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    # Central directory, written when the archive is closed
+    yield sink.drain()
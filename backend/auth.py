@@ -1,32 +1,45 @@
 import os
 import jwt
-import requests
+import time
+import httpx
+import asyncio
+import hashlib
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import TYPE_CHECKING, Optional, Dict, Any
 from fastapi import HTTPException, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from supabase import create_client, Client
 from dotenv import load_dotenv
 
+from agent.metrics import AUTH_DURATION
+
+if TYPE_CHECKING:
+    from supabase import Client
+
 load_dotenv()
 
 
-# Initialize Supabase client
-def get_supabase_client() -> Client:
+def supabase_configured() -> bool:
     supabase_url = os.getenv("SUPABASE_URL")
     supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    return bool(
+        supabase_url and supabase_key and supabase_url != "your_supabase_project_url_here"
+    )
 
-    if (
-        not supabase_url
-        or not supabase_key
-        or supabase_url == "your_supabase_project_url_here"
-    ):
+
+# Initialize Supabase client
+def get_supabase_client() -> "Client":
+    if not supabase_configured():
         raise HTTPException(
             status_code=500,
             detail="Supabase configuration missing. Please check SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY.",
         )
 
-    return create_client(supabase_url, supabase_key)
+    # Imported here: the supabase package is slow to import and only needed
+    # once a Supabase token has to be verified
+    from supabase import create_client
+
+    return create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_ROLE_KEY"))
 
 
 # Security scheme
@@ -35,20 +48,24 @@ security = HTTPBearer()
 
 class AuthService:
     def __init__(self):
-        try:
-            self.supabase = get_supabase_client()
-            self.supabase_configured = True
-        except HTTPException:
+        self.supabase_configured = supabase_configured()
+        if not self.supabase_configured:
             print(
                 "⚠️  Supabase not configured. Authentication features will be limited."
             )
-            self.supabase = None
-            self.supabase_configured = False
+        self._supabase: Optional["Client"] = None
 
         self.jwt_secret = os.getenv("JWT_SECRET", "your-secret-key")
         self.jwt_algorithm = "HS256"
         self.jwt_expiration_hours = 24
 
+    @property
+    def supabase(self) -> Optional["Client"]:
+        """Supabase client, created on first use"""
+        if self._supabase is None and self.supabase_configured:
+            self._supabase = get_supabase_client()
+        return self._supabase
+
     async def verify_supabase_token(self, token: str) -> Dict[str, Any]:
         """Verify Supabase JWT token and return user data"""
         if not self.supabase_configured:
@@ -153,12 +170,78 @@ class AuthService:
             return payload
         except jwt.ExpiredSignatureError:
             raise HTTPException(status_code=401, detail="Token has expired")
-        except jwt.JWTError:
+        except jwt.InvalidTokenError:
             raise HTTPException(status_code=401, detail="Invalid token")
 
 
+class TokenCache:
+    """Bounded in-memory cache of verified Supabase tokens and their profiles.
+
+    Entries expire after ``ttl`` seconds or at the token's own ``exp`` claim,
+    whichever comes first. Tokens are stored by hash, never in the clear.
+    """
+
+    def __init__(self):
+        self.ttl = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
+        self.max_entries = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "1024"))
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _token_expiry(token: str) -> Optional[float]:
+        try:
+            claims = jwt.decode(token, options={"verify_signature": False})
+        except jwt.InvalidTokenError:
+            return None
+        exp = claims.get("exp")
+        return float(exp) if exp is not None else None
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.time():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, token: str, user: Dict[str, Any]):
+        expires_at = time.time() + self.ttl
+        token_expiry = self._token_expiry(token)
+        if token_expiry is not None:
+            expires_at = min(expires_at, token_expiry)
+
+        key = self._key(token)
+        self._entries[key] = (expires_at, user)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, token: str):
+        self._entries.pop(self._key(token), None)
+
+    def invalidate_user(self, user_id: str):
+        for key, (_, user) in list(self._entries.items()):
+            if user.get("user_id") == user_id:
+                del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
 # Initialize auth service
 auth_service = AuthService()
+token_cache = TokenCache()
 
 
 # Dependencies
@@ -167,20 +250,48 @@ async def get_current_user(
 ) -> Dict[str, Any]:
     """Dependency to get current authenticated user"""
     token = credentials.credentials
+    started = time.perf_counter()
+
+    # Backend tokens are verified locally, without a network call
+    try:
+        user = auth_service.verify_backend_token(token)
+        AUTH_DURATION.observe(time.perf_counter() - started, source="backend")
+        return user
+    except HTTPException:
+        pass
+
+    # Then Supabase tokens verified recently
+    cached_user = token_cache.get(token)
+    if cached_user is not None:
+        AUTH_DURATION.observe(time.perf_counter() - started, source="cache")
+        return cached_user
 
-    # Try to verify as Supabase token first
+    # Finally verify with Supabase and cache the user with their profile
     try:
         user_data = await auth_service.verify_supabase_token(token)
         # Get or create user profile
         profile = await auth_service.get_or_create_user_profile(user_data)
-        return {**user_data, "profile": profile}
     except HTTPException:
-        # If Supabase token fails, try backend token
+        AUTH_DURATION.observe(time.perf_counter() - started, source="rejected")
+        raise HTTPException(status_code=401, detail="Invalid authentication token")
+
+    user = {**user_data, "profile": profile}
+    token_cache.put(token, user)
+    AUTH_DURATION.observe(time.perf_counter() - started, source="supabase")
+    return user
+
+
+def logout_user(token: str):
+    """Drop every cached token of the user the given token belongs to"""
+    user = token_cache.get(token)
+    if user is None:
         try:
-            user_data = auth_service.verify_backend_token(token)
-            return user_data
+            user = auth_service.verify_backend_token(token)
         except HTTPException:
-            raise HTTPException(status_code=401, detail="Invalid authentication token")
+            user = None
+    token_cache.invalidate(token)
+    if user is not None and user.get("user_id"):
+        token_cache.invalidate_user(user["user_id"])
 
 
 async def get_optional_user(request: Request) -> Optional[Dict[str, Any]]:
@@ -199,35 +310,81 @@ async def get_optional_user(request: Request) -> Optional[Dict[str, Any]]:
 
 # Google OAuth helpers
 class GoogleOAuth:
-    def __init__(self):
+    """Verifies Google access tokens over a pooled async HTTP client.
+
+    The tokeninfo and userinfo lookups run concurrently, and verified users
+    are cached per token until the token's ``expires_in`` runs out.
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
         self.client_id = os.getenv("GOOGLE_CLIENT_ID")
         self.client_secret = os.getenv("GOOGLE_CLIENT_SECRET")
+        self.base_url = os.getenv(
+            "GOOGLE_OAUTH_BASE_URL", "https://www.googleapis.com/oauth2/v1"
+        ).rstrip("/")
+        self.timeout = float(os.getenv("GOOGLE_OAUTH_TIMEOUT", "5"))
+        self.cache_max_entries = int(os.getenv("GOOGLE_OAUTH_CACHE_MAX_ENTRIES", "1024"))
+
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._cache: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
-    def verify_google_token(self, token: str) -> Dict[str, Any]:
+    async def verify_google_token(self, token: str) -> Dict[str, Any]:
         """Verify Google OAuth token"""
         if not self.client_id:
             raise HTTPException(status_code=500, detail="Google OAuth not configured")
 
+        key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        cached = self._cache.get(key)
+        if cached is not None:
+            if cached[0] > time.time():
+                self._cache.move_to_end(key)
+                return cached[1]
+            del self._cache[key]
+
         try:
-            # Verify token with Google
-            response = requests.get(
-                f"https://www.googleapis.com/oauth2/v1/tokeninfo?access_token={token}"
+            # Verify token with Google and fetch the profile at the same time;
+            # the profile is only used once the audience has been checked
+            client = self._http()
+            token_response, user_response = await asyncio.gather(
+                client.get("/tokeninfo", params={"access_token": token}),
+                client.get("/userinfo", params={"access_token": token}),
             )
 
-            if response.status_code == 200:
-                token_info = response.json()
-
-                if token_info.get("audience") == self.client_id:
-                    # Get user info
-                    user_response = requests.get(
-                        f"https://www.googleapis.com/oauth2/v1/userinfo?access_token={token}"
-                    )
-
-                    if user_response.status_code == 200:
-                        return user_response.json()
+            if token_response.status_code == 200:
+                token_info = token_response.json()
+
+                if (
+                    token_info.get("audience") == self.client_id
+                    and user_response.status_code == 200
+                ):
+                    user_info = user_response.json()
+                    expires_in = float(token_info.get("expires_in", 0))
+                    if expires_in > 0:
+                        self._cache[key] = (time.time() + expires_in, user_info)
+                        while len(self._cache) > self.cache_max_entries:
+                            self._cache.popitem(last=False)
+                    return user_info
 
             raise HTTPException(status_code=401, detail="Invalid Google token")
 
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=401, detail=f"Google token verification failed: {str(e)}"
@@ -0,0 +1,107 @@
+import re
+import time
+import random
+import itertools
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# File names cycled through when the fake plan needs more files
+FILE_NAMES = ["index.html", "styles.css", "script.js", "app.js", "utils.js", "README.md"]
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic stand-in for ChatGroq used by the benchmarks.
+
+    Answers the planner with a canned Plan, the architect with a canned
+    TaskPlan of ``files`` independent steps (plus one step depending on all
+    of them when ``fan_in`` is set), and drives each coder step through one
+    ``write_file`` tool call. Every call sleeps ``latency`` seconds to model
+    network and inference time, or ``tail_latency`` seconds for a
+    ``tail_ratio`` share of calls to model slow completions.
+    """
+
+    latency: float = 0.05
+    tail_latency: float = 0.0
+    tail_ratio: float = 0.0
+    files: int = 3
+    fan_in: bool = True
+    file_bytes: int = 2048
+    prompt_tokens: int = 500
+    completion_tokens: int = 200
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    @property
+    def model_name(self) -> str:
+        return "fake-chat-model"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _file_paths(self) -> List[str]:
+        names = itertools.cycle(FILE_NAMES)
+        paths = []
+        for idx in range(self.files):
+            name = next(names)
+            paths.append(name if idx < len(FILE_NAMES) else f"extra_{idx}_{name}")
+        return paths
+
+    def _plan(self) -> dict:
+        return {
+            "name": "Benchmark App",
+            "description": "A generated app used to benchmark the backend",
+            "techstack": "html, css, javascript",
+            "features": ["benchmarking"],
+            "files": [{"path": path, "purpose": f"{path} of the app"} for path in self._file_paths()],
+        }
+
+    def _task_plan(self) -> dict:
+        paths = self._file_paths()
+        steps = [
+            {"filepath": path, "task_description": f"Implement {path}", "depends_on": []}
+            for path in paths
+        ]
+        if self.fan_in and len(paths) > 1:
+            steps.append({
+                "filepath": paths[0],
+                "task_description": f"Wire {paths[0]} to the other files",
+                "depends_on": list(range(len(paths))),
+            })
+        return {"implementation_steps": steps}
+
+    def _respond(self, messages: List[BaseMessage], tool_names: List[str]) -> AIMessage:
+        if "Plan" in tool_names:
+            return AIMessage(content="", tool_calls=[{"name": "Plan", "args": self._plan(), "id": "plan"}])
+        if "TaskPlan" in tool_names:
+            return AIMessage(content="", tool_calls=[{"name": "TaskPlan", "args": self._task_plan(), "id": "task_plan"}])
+        if "write_file" in tool_names and not isinstance(messages[-1], ToolMessage):
+            match = re.search(r"File: (\S+)", "\n".join(str(m.content) for m in messages))
+            path = match.group(1) if match else "index.html"
+            content = f"/* {path} */\n" + "x" * self.file_bytes
+            return AIMessage(content="", tool_calls=[{
+                "name": "write_file", "args": {"path": path, "content": content}, "id": "write",
+            }])
+        return AIMessage(content="Done.")
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.tail_latency if random.random() < self.tail_ratio else self.latency)
+        tool_names = [tool["function"]["name"] for tool in kwargs.get("tools") or []]
+        message = self._respond(messages, tool_names)
+        message.usage_metadata = {
+            "input_tokens": self.prompt_tokens,
+            "output_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark harness for the backend.
+
+Swaps ChatGroq for a scripted FakeChatModel, stubs Supabase and Google, then
+drives the LangGraph agent and the FastAPI endpoints under concurrent load
+and reports p50/p95/p99 latency, throughput and peak RSS. No network access
+or API keys are needed.
+
+Usage (from the backend directory):
+    python -m benchmarks.run --scenario all --requests 50 --concurrency 8
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configure the backend for offline runs before any backend module is imported
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ.setdefault("BACKEND_DEBUG", "false")
+os.environ.setdefault("GOOGLE_CLIENT_ID", "benchmark-client")
+os.environ.setdefault("WORKSPACES_ROOT", tempfile.mkdtemp(prefix="arc-bench-"))
+# Every request comes from one benchmark user; per-user limits are measured by
+# the flood scenario only
+os.environ.setdefault("GENERATION_USER_RATE_PER_MINUTE", "0")
+os.environ.setdefault("GENERATION_USER_MAX_CONCURRENCY", "1000")
+
+import httpx
+
+from benchmarks.fake_llm import FakeChatModel
+
+# Reworded variants of one request, to exercise the semantic plan cache
+SIMILAR_PROMPTS = [
+    "Build a todo list with a dark theme",
+    "Please create a simple to-do list app with a dark theme",
+    "Make a todo list web app, dark theme",
+    "Build a todo list with dark themes and filters",
+]
+
+SCENARIOS = ["agent", "generate", "generate-simple", "auth", "flood", "workers", "first-file"]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def summarize(name: str, latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(latencies)
+    total = len(latencies) + errors
+    return {
+        "scenario": name,
+        "requests": total,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "throughput_rps": total / elapsed if elapsed > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_agent(requests: int, concurrency: int) -> Dict[str, Any]:
+    """Drive agent.invoke directly from a thread pool"""
+    from agent.graph import agent
+    from agent.tools import create_workspace, remove_workspace
+
+    def run_once(idx: int) -> float:
+        job_id = uuid.uuid4().hex
+        workspace = create_workspace(job_id)
+        started = time.perf_counter()
+        try:
+            agent.invoke(
+                {"user_prompt": f"Benchmark app #{idx}", "workspace": str(workspace)},
+                {"recursion_limit": 100},
+            )
+            return time.perf_counter() - started
+        finally:
+            remove_workspace(job_id)
+
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(run_once, idx) for idx in range(requests)]
+        for future in futures:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                errors += 1
+    return summarize("agent", latencies, errors, time.perf_counter() - started)
+
+
+def bench_first_file(requests: int, concurrency: int) -> Dict[str, Any]:
+    """Time from the start of a generation to its first saved file
+
+    Compare runs with and without --speculative-scaffold.
+    """
+    from generation import run_generation
+    from agent.tools import create_workspace, remove_workspace
+
+    def run_once(idx: int) -> float:
+        job_id = uuid.uuid4().hex
+        workspace = create_workspace(job_id)
+        first_file: List[float] = []
+
+        def on_event(event: Dict[str, Any]):
+            if event["type"] == "file" and not first_file:
+                first_file.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        try:
+            run_generation(f"Benchmark app #{idx}", workspace, on_event=on_event)
+            return first_file[0]
+        finally:
+            remove_workspace(job_id)
+
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(run_once, idx) for idx in range(requests)]
+        for future in futures:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                errors += 1
+    return summarize("first-file", latencies, errors, time.perf_counter() - started)
+
+
+async def drive(
+    name: str,
+    requests: int,
+    concurrency: int,
+    call: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]],
+) -> Dict[str, Any]:
+    """Issue ``requests`` calls against the app with at most ``concurrency`` in flight"""
+    from main import app
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=None
+    ) as client:
+
+        async def one(idx: int):
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await call(client, idx)
+                    if response.status_code >= 400:
+                        errors += 1
+                        return
+                except Exception:
+                    errors += 1
+                    return
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(idx) for idx in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    return summarize(name, latencies, errors, elapsed)
+
+
+async def bench_flood(requests: int, concurrency: int, user_cap: int) -> Dict[str, Any]:
+    """One user floods /api/generate while other users send single requests
+
+    Reports the latency of the other users only: with fair-share scheduling it
+    should stay close to a single generation rather than the flood's backlog.
+    """
+    from main import app
+    from auth import auth_service
+    from generation import generation_executor
+
+    generation_executor.user_max_concurrency = user_cap
+
+    def headers(user_id: str) -> Dict[str, str]:
+        token = auth_service.generate_backend_token({"user_id": user_id, "email": f"{user_id}@example.com"})
+        return {"Authorization": f"Bearer {token}"}
+
+    flooder = headers("flood-user")
+    latencies: List[float] = []
+    errors = 0
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=None
+    ) as client:
+
+        async def flood(idx: int):
+            await client.post("/api/generate", json={"user_prompt": f"Flood app #{idx}"}, headers=flooder)
+
+        async def normal(idx: int):
+            nonlocal errors
+            # Arrive once the flood has filled the queue
+            await asyncio.sleep(0.1 + idx * 0.05)
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/generate", json={"user_prompt": f"Normal app #{idx}"}, headers=headers(f"user-{idx}")
+            )
+            if response.status_code >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(flood(idx) for idx in range(requests * 2)),
+            *(normal(idx) for idx in range(requests)),
+        )
+        elapsed = time.perf_counter() - started
+
+    return summarize("flood", latencies, errors, elapsed)
+
+
+def fake_worker(threads: int, poll_interval: float, llm: Dict[str, Any]):
+    """Worker process entry point that answers with the fake LLM"""
+    from agent.graph import use_llm
+    from worker import serve
+
+    use_llm(FakeChatModel(**llm))
+    serve(threads, poll_interval)
+
+
+def bench_workers(requests: int, processes: int, threads: int, llm: Dict[str, Any]) -> Dict[str, Any]:
+    """Queue jobs in a fresh durable queue and drain it with worker processes
+
+    Latency runs from queueing to completion, so it includes the wait for a
+    free worker thread; throughput should grow with --worker-processes.
+    """
+    scratch = tempfile.mkdtemp(prefix="arc-bench-queue-")
+    # Inherited by the worker processes
+    os.environ["JOB_QUEUE_PATH"] = os.path.join(scratch, "jobs.sqlite3")
+    os.environ["CHECKPOINT_PATH"] = os.path.join(scratch, "checkpoints.sqlite3")
+
+    from datetime import datetime
+    from job_queue import Job, JobQueue, JobStatus
+    from worker import start_processes
+
+    queue = JobQueue()
+    job_ids = []
+    started = time.perf_counter()
+    for idx in range(requests):
+        job = Job(
+            id=uuid.uuid4().hex, user_id="bench-user",
+            user_prompt=f"Benchmark app #{idx}", created_at=datetime.utcnow(),
+        )
+        job_ids.append(queue.add(job).id)
+
+    workers = start_processes(processes, threads, 0.05, target=fake_worker, args=(llm,))
+    try:
+        while True:
+            stats = queue.stats()
+            if stats[JobStatus.PENDING] + stats[JobStatus.RUNNING] == 0:
+                break
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - started
+    finally:
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            process.join()
+
+    latencies, errors = [], 0
+    for job_id in job_ids:
+        job = queue.get(job_id)
+        if job.status != JobStatus.SUCCEEDED:
+            errors += 1
+        else:
+            latencies.append((job.finished_at - job.created_at).total_seconds())
+    return summarize(f"workers x{processes}", latencies, errors, elapsed)
+
+
+def install_auth_stubs(latency: float) -> str:
+    """Stub Supabase and Google verification; return a backend token"""
+    import auth
+    from auth import auth_service, google_oauth
+
+    async def verify_supabase_token(token: str) -> Dict[str, Any]:
+        await asyncio.sleep(latency)
+        return {"user_id": "bench-user", "email": "bench@example.com", "user_metadata": {}}
+
+    def google_handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/tokeninfo"):
+            return httpx.Response(200, json={"audience": google_oauth.client_id, "expires_in": 3600})
+        return httpx.Response(200, json={"id": "bench", "email": "bench@example.com"})
+
+    auth_service.verify_supabase_token = verify_supabase_token
+    auth.google_oauth._transport = httpx.MockTransport(google_handler)
+    auth.google_oauth._client = None
+
+    return auth_service.generate_backend_token(
+        {"user_id": "bench-user", "email": "bench@example.com"}
+    )
+
+
+def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    from agent.graph import use_llm
+
+    llm = {
+        "latency": args.llm_latency,
+        "tail_latency": args.llm_tail_latency,
+        "tail_ratio": args.llm_tail_ratio,
+        "files": args.files,
+    }
+    use_llm(FakeChatModel(**llm))
+    token = install_auth_stubs(args.auth_latency)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def prompt(idx: int) -> str:
+        if args.similar_prompts:
+            return SIMILAR_PROMPTS[idx % len(SIMILAR_PROMPTS)]
+        return "Build a todo app" if args.repeat_prompts else f"Build app #{idx}"
+
+    async def generate(client, idx):
+        return await client.post("/api/generate", json={"user_prompt": prompt(idx)}, headers=headers)
+
+    async def generate_simple(client, idx):
+        return await client.post("/api/generate-simple", json={"user_prompt": prompt(idx)})
+
+    auth_calls = [
+        lambda client, idx: client.get("/api/auth/user", headers=headers),
+        lambda client, idx: client.get("/api/auth/protected", headers=headers),
+        lambda client, idx: client.post("/api/auth/verify", json={"token": f"supabase-{idx}"}),
+        lambda client, idx: client.post("/api/auth/google", json={"google_token": f"google-{idx}"}),
+    ]
+
+    async def auth_mix(client, idx):
+        return await auth_calls[idx % len(auth_calls)](client, idx)
+
+    scenarios = SCENARIOS if args.scenario == "all" else [args.scenario]
+    results = []
+    for scenario in scenarios:
+        if scenario == "agent":
+            results.append(bench_agent(args.requests, args.concurrency))
+        elif scenario == "generate":
+            results.append(asyncio.run(drive(scenario, args.requests, args.concurrency, generate)))
+        elif scenario == "generate-simple":
+            results.append(asyncio.run(drive(scenario, args.requests, args.concurrency, generate_simple)))
+        elif scenario == "auth":
+            results.append(asyncio.run(drive(scenario, args.requests, args.concurrency, auth_mix)))
+        elif scenario == "flood":
+            results.append(asyncio.run(bench_flood(args.requests, args.concurrency, args.user_cap)))
+        elif scenario == "first-file":
+            results.append(bench_first_file(args.requests, args.concurrency))
+        elif scenario == "workers":
+            results.append(bench_workers(args.requests, args.worker_processes, args.worker_threads, llm))
+    return results
+
+
+def print_report(results: List[Dict[str, Any]]):
+    header = f"{'scenario':<16}{'requests':>9}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}{'rss MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "n/a"
+        print(
+            f"{r['scenario']:<16}{r['requests']:>9}{r['errors']:>8}"
+            f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+            f"{r['throughput_rps']:>9.1f}{rss:>9}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline ARC-BUILDER backend benchmarks")
+    parser.add_argument("--scenario", choices=SCENARIOS + ["all"], default="all")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at once")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per fake LLM call")
+    parser.add_argument("--llm-tail-latency", type=float, default=0.0, help="Seconds per slow fake LLM call")
+    parser.add_argument("--llm-tail-ratio", type=float, default=0.0, help="Share of fake LLM calls that are slow")
+    parser.add_argument("--auth-latency", type=float, default=0.02, help="Seconds per fake Supabase call")
+    parser.add_argument("--files", type=int, default=3, help="Files in the fake plan")
+    parser.add_argument("--user-cap", type=int, default=2, help="Per-user concurrency cap in the flood scenario")
+    parser.add_argument("--worker-processes", type=int, default=2, help="Worker processes in the workers scenario")
+    parser.add_argument("--worker-threads", type=int, default=2, help="Threads per worker process in the workers scenario")
+    parser.add_argument(
+        "--speculative-scaffold", action="store_true", help="Write skeleton files while the architect runs"
+    )
+    parser.add_argument("--repeat-prompts", action="store_true", help="Send the same prompt every time")
+    parser.add_argument(
+        "--similar-prompts", action="store_true", help="Send reworded variants of one prompt (semantic plan cache)"
+    )
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--fail-p95-ms", type=float, help="Exit non-zero if any scenario's p95 exceeds this")
+    args = parser.parse_args(argv)
+
+    # Exact-match LLM caching would hide orchestration cost unless asked for
+    if not args.repeat_prompts:
+        os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+    if args.similar_prompts:
+        os.environ.setdefault("PLAN_CACHE_ENABLED", "true")
+
+    if args.speculative_scaffold:
+        os.environ["SPECULATIVE_SCAFFOLD"] = "true"
+
+    results = run(args)
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.fail_p95_ms is not None:
+        slow = [r["scenario"] for r in results if r["p95_ms"] > args.fail_p95_ms]
+        if slow:
+            print(f"p95 budget of {args.fail_p95_ms} ms exceeded by: {', '.join(slow)}")
+            return 1
+    failed = [r["scenario"] for r in results if r["errors"]]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,16 @@
+"""
+Shared pytest fixtures
+"""
+
+import pytest
+
+
+@pytest.fixture
+def env(monkeypatch):
+    """Set environment variables for one test; values are converted to strings"""
+
+    def set_env(**values):
+        for key, value in values.items():
+            monkeypatch.setenv(key, str(value))
+
+    return set_env
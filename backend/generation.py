@@ -0,0 +1,548 @@
+import os
+import json
+import math
+import time
+import asyncio
+import hashlib
+import uuid
+import logging
+import pathlib
+import functools
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+from agent.workspaces import create_workspace, remove_workspace, safe_path_for_project
+from archive import workspace_files
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(user_prompt: str, project_type: str, framework: str, user_id: Optional[str]) -> str:
+    """Key one user's identical generation requests (case and whitespace insensitive)
+
+    The user is part of the key: each user's runs are rate limited and use
+    their own plan cache, so results are never shared between users.
+    """
+    normalized = " ".join(user_prompt.lower().split())
+    payload = json.dumps([user_id, normalized, project_type, framework])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCancelled(Exception):
+    """Raised inside a generation run once it has been cancelled or has timed out"""
+
+
+class CancelToken:
+    """Cooperative cancellation for one generation run.
+
+    The run checks the token between graph nodes and at the start of every
+    LLM and tool call, so a cancelled run stops within one call instead of
+    finishing the whole planner/architect/coder loop. With a ``timeout`` the
+    token also cancels itself once that many seconds have passed since
+    ``start`` (the start of the run, not of queueing).
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self.deadline: Optional[float] = None
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+
+    def start(self):
+        if self.timeout and self.deadline is None:
+            self.deadline = time.monotonic() + self.timeout
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def wait(self, timeout: float) -> bool:
+        """Sleep up to ``timeout`` seconds, waking early on cancellation; True once cancelled"""
+        if self.deadline is not None:
+            timeout = min(timeout, max(0.0, self.deadline - time.monotonic()))
+        self._event.wait(timeout)
+        return self.cancelled
+
+    @property
+    def cancelled(self) -> bool:
+        if not self._event.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel(f"deadline of {self.timeout:g}s exceeded")
+        return self._event.is_set()
+
+    def check(self):
+        if self.cancelled:
+            raise GenerationCancelled(self.reason)
+
+
+def node_event(node: str, update: Dict[str, Any]) -> Dict[str, Any]:
+    """Summarize a top-level graph node update as a progress event"""
+    event: Dict[str, Any] = {"type": "node", "node": node}
+    if node == "planner" and update.get("plan") is not None:
+        event["plan"] = update["plan"].model_dump()
+        if update.get("plan_similarity") is not None:
+            event["plan_similarity"] = update["plan_similarity"]
+    elif node == "scaffold":
+        event["filepaths"] = update.get("scaffolded") or []
+    elif node in ("architect", "editor") and update.get("task_plan") is not None:
+        event["task_plan"] = update["task_plan"].model_dump()
+    elif node == "coder" and update.get("coder_state") is not None:
+        coder_state = update["coder_state"]
+        steps = coder_state.task_plan.implementation_steps
+        event["total_steps"] = len(steps)
+        event["completed_steps"] = len(coder_state.completed_steps)
+        if update.get("status") == "DONE":
+            event["status"] = "DONE"
+        else:
+            event["filepaths"] = [steps[idx].filepath for idx in coder_state.current_batch]
+    return event
+
+
+def run_generation(
+    user_prompt: str,
+    workspace: pathlib.Path,
+    on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    thread_id: Optional[str] = None,
+    resume: bool = False,
+    edit_request: Optional[str] = None,
+    cancel: Optional[CancelToken] = None,
+    user_id: Optional[str] = None,
+) -> List[str]:
+    """Run the LangGraph agent in ``workspace`` and return the generated file paths (blocking)
+
+    The graph is streamed rather than invoked so that ``on_event`` receives an
+    event after every planner/architect/coder step and for every file saved by
+    ``write_file``. With a ``thread_id`` the run is checkpointed after every
+    node, and ``resume`` continues it from the last completed node instead of
+    starting over at the planner. With an ``edit_request`` the files already
+    in ``workspace`` are changed through a targeted task plan, and every file
+    of the project is listed. Cancelling ``cancel`` (or reaching its deadline)
+    stops the run with ``GenerationCancelled``. ``user_id`` scopes the
+    semantic plan cache to the requesting user.
+    """
+    # Imported on first use: the graph pulls in langchain/langgraph and the LLM client
+    from agent.graph import CancellationHandler, agent, checkpointed_agent
+    from agent.scaffold import escapes_workspace, normalize_path
+
+    emit = on_event or (lambda event: None)
+    result: Dict[str, Any] = {}
+    cancel = cancel or CancelToken()
+    cancel.start()
+    cancel.check()
+
+    runner = agent
+    config: Dict[str, Any] = {
+        "recursion_limit": 100,
+        # Inherited by every nested LLM and tool call of the run
+        "callbacks": [CancellationHandler(cancel)],
+    }
+    graph_input: Optional[Dict[str, Any]] = {"user_prompt": user_prompt, "workspace": str(workspace)}
+    if edit_request:
+        graph_input["edit_request"] = edit_request
+    if user_id is not None:
+        graph_input["user_id"] = user_id
+    if thread_id is not None:
+        runner = checkpointed_agent()
+        config["configurable"] = {"thread_id": thread_id}
+        saved = runner.get_state(config).values if resume else None
+        if saved:
+            # Streaming None continues from the checkpoint, re-running the failed node
+            result.update(saved)
+            graph_input = None
+
+    # subgraphs=True surfaces the custom events written from inside the coder's
+    # ReAct agent; only top-level node updates make up the final state
+    stream = runner.stream(
+        graph_input,
+        config,
+        stream_mode=["updates", "custom"],
+        subgraphs=True,
+    )
+    try:
+        for namespace, mode, chunk in stream:
+            if mode == "custom":
+                emit(chunk)
+            elif not namespace:
+                for node, update in chunk.items():
+                    result.update(update or {})
+                    emit(node_event(node, update or {}))
+            cancel.check()
+    finally:
+        # Stops the graph before its next node when the run is abandoned
+        stream.close()
+
+    # Paths of the generated files, relative to the workspace
+    if edit_request:
+        # An edit only touches some files, but the result is still the whole project
+        return workspace_files(workspace)
+
+    generated_paths = []
+    planned = set()
+    coder_state = result.get("coder_state")
+    if coder_state is not None and coder_state.task_plan:
+        root = workspace.resolve()
+        for step in coder_state.task_plan.implementation_steps:
+            if escapes_workspace(step.filepath):
+                # Plans are validated; this is a run checkpointed before that
+                logger.warning(f"Skipping generated file outside the workspace: {step.filepath}")
+                continue
+            planned.add(normalize_path(step.filepath))
+            path = safe_path_for_project(step.filepath, workspace)
+            relative = path.relative_to(root).as_posix()
+            if not path.is_file():
+                logger.warning(f"Generated file not found: {step.filepath}")
+            elif relative not in generated_paths:
+                generated_paths.append(relative)
+    # Skeletons that no implementation step went on to fill in are only
+    # placeholders: remove them rather than return them as generated files
+    for path in result.get("scaffolded") or []:
+        if path not in planned:
+            safe_path_for_project(path, workspace).unlink(missing_ok=True)
+    return generated_paths
+
+
+def read_files(workspace: pathlib.Path, paths: List[str]) -> Dict[str, str]:
+    """Read generated files into memory (for responses that inline file contents)"""
+    files = {}
+    for path in paths:
+        try:
+            with open(safe_path_for_project(path, workspace), "r", encoding="utf-8") as f:
+                files[path] = f.read()
+        except (FileNotFoundError, UnicodeDecodeError):
+            logger.warning(f"Could not read generated file: {path}")
+    return files
+
+
+def generate_files(
+    user_prompt: str, cancel: Optional[CancelToken] = None, user_id: Optional[str] = None
+) -> Dict[str, str]:
+    """Run a generation in a throwaway workspace and return the file contents (blocking)
+
+    The workspace is created and removed on the worker thread, so a caller
+    that stops waiting never removes it while the run is still writing to it.
+    """
+    workspace = create_workspace(uuid.uuid4().hex)
+    try:
+        paths = run_generation(user_prompt, workspace, cancel=cancel, user_id=user_id)
+        return read_files(workspace, paths)
+    finally:
+        remove_workspace(workspace.name)
+
+
+class _Ticket:
+    """A queued call and its start-time fair queueing tags"""
+
+    __slots__ = ("user_id", "call", "future", "start_tag", "finish_tag", "seq")
+
+    def __init__(self, user_id: str, call: Callable[[], Any], start_tag: float, finish_tag: float, seq: int):
+        self.user_id = user_id
+        self.call = call
+        self.future: Future = Future()
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.seq = seq  # breaks ties between equal tags in arrival order
+
+    def order(self) -> Tuple[float, int]:
+        return self.finish_tag, self.seq
+
+
+class GenerationExecutor:
+    """Runs blocking agent invocations on a bounded thread pool, fairly across users.
+
+    At most ``max_concurrency`` generations run at once, and at most
+    ``user_max_concurrency`` of them for any one user. Queued generations are
+    dispatched by weighted fair queueing (start-time fair queueing over
+    per-user queues), so a user who floods the service only delays their own
+    requests. Each user also has a token bucket (``user_rate`` generations per
+    minute, bursts of ``user_burst``); admissions beyond it are rejected with a
+    429 carrying ``Retry-After``, as are ``run`` callers that wait longer than
+    ``queue_timeout`` or arrive when ``max_queue`` callers are already waiting.
+    """
+
+    def __init__(self):
+        self.max_concurrency = int(os.getenv("GENERATION_MAX_CONCURRENCY", "4"))
+        self.max_queue = int(os.getenv("GENERATION_MAX_QUEUE", "16"))
+        self.queue_timeout = float(os.getenv("GENERATION_QUEUE_TIMEOUT", "30"))
+        self.retry_after = int(os.getenv("GENERATION_RETRY_AFTER", "30"))
+        # Longest a single generation may run before it is cancelled
+        self.run_timeout = float(os.getenv("GENERATION_TIMEOUT_SECONDS", "600"))
+        self.user_max_concurrency = int(os.getenv("GENERATION_USER_MAX_CONCURRENCY", "2"))
+        self.user_rate = float(os.getenv("GENERATION_USER_RATE_PER_MINUTE", "10"))
+        self.user_burst = float(os.getenv("GENERATION_USER_BURST", "5"))
+        # "user-a:2,user-b:0.5" gives user-a twice and user-b half the default share
+        self.user_weights = {
+            user_id.strip(): float(weight)
+            for user_id, weight in (
+                entry.rsplit(":", 1)
+                for entry in os.getenv("GENERATION_USER_WEIGHTS", "").split(",")
+                if ":" in entry
+            )
+        }
+
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="generation"
+        )
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Deque[_Ticket]] = {}
+        self._running: Dict[str, int] = {}
+        self._last_finish: Dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # user -> (tokens, updated)
+        self._active = 0
+        self.rate_limited = 0
+
+    def _reject(self, reason: str, retry_after: Optional[int] = None) -> HTTPException:
+        return HTTPException(
+            status_code=429,
+            detail=f"Generation capacity exceeded: {reason}",
+            headers={"Retry-After": str(retry_after or self.retry_after)},
+        )
+
+    def admit(self, user_id: Optional[str]):
+        """Take a token from the user's bucket, or raise a 429 when it is empty"""
+        if self.user_rate <= 0:
+            return
+        user_id = user_id or "anonymous"
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(user_id, (self.user_burst, now))
+            tokens = min(self.user_burst, tokens + (now - updated) * self.user_rate / 60)
+            if tokens < 1:
+                self._buckets[user_id] = (tokens, now)
+                self.rate_limited += 1
+                retry_after = math.ceil((1 - tokens) * 60 / self.user_rate)
+                raise self._reject("per-user rate limit reached", retry_after)
+            self._buckets[user_id] = (tokens - 1, now)
+
+            # Users whose buckets have refilled are indistinguishable from new ones
+            if len(self._buckets) > 10000:
+                full_after = self.user_burst * 60 / self.user_rate
+                self._buckets = {
+                    user: bucket for user, bucket in self._buckets.items()
+                    if now - bucket[1] < full_after
+                }
+
+    def submit(self, fn: Callable[..., Any], *args, user_id: Optional[str] = None, **kwargs) -> Future:
+        """Queue ``fn`` in the user's queue and return its future
+
+        Cancelling the future before it starts withdraws it from the queue.
+        """
+        user_id = user_id or "anonymous"
+        weight = self.user_weights.get(user_id, 1.0)
+        with self._lock:
+            start_tag = max(self._virtual_time, self._last_finish.get(user_id, 0.0))
+            ticket = _Ticket(
+                user_id,
+                functools.partial(fn, *args, **kwargs),
+                start_tag,
+                start_tag + 1 / weight,
+                next(self._seq),
+            )
+            self._last_finish[user_id] = ticket.finish_tag
+            self._queues.setdefault(user_id, deque()).append(ticket)
+        ticket.future.add_done_callback(functools.partial(self._withdraw, ticket))
+        self._dispatch()
+        return ticket.future
+
+    def _withdraw(self, ticket: _Ticket, future: Future):
+        """Take a cancelled call out of its queue and give its share back to the user
+
+        The user's later tickets move up by the withdrawn ticket's cost, so a
+        cancelled request doesn't push the rest of the user's requests back.
+        """
+        if not future.cancelled():
+            return
+        with self._lock:
+            queue = self._queues.get(ticket.user_id)
+            if queue is None or ticket not in queue:
+                return
+            idx = queue.index(ticket)
+            del queue[idx]
+            cost = ticket.finish_tag - ticket.start_tag
+            for later in list(queue)[idx:]:
+                later.start_tag -= cost
+                later.finish_tag -= cost
+            self._last_finish[ticket.user_id] -= cost
+            if not queue:
+                del self._queues[ticket.user_id]
+            self._forget_if_idle(ticket.user_id)
+
+    def _forget_if_idle(self, user_id: str):
+        """Drop the finish tag of a user with nothing queued or running (call with the lock held)"""
+        if user_id not in self._queues and not self._running.get(user_id):
+            self._last_finish.pop(user_id, None)
+
+    def _next_ticket(self) -> Optional[_Ticket]:
+        """Pop the queued ticket with the smallest finish tag among users below their cap"""
+        best = None
+        for user_id, queue in list(self._queues.items()):
+            while queue and queue[0].future.cancelled():
+                queue.popleft()
+            if not queue:
+                del self._queues[user_id]
+                self._forget_if_idle(user_id)
+                continue
+            if self._running.get(user_id, 0) >= self.user_max_concurrency:
+                continue
+            if best is None or queue[0].order() < best.order():
+                best = queue[0]
+        if best is not None:
+            self._queues[best.user_id].popleft()
+        return best
+
+    def _dispatch(self):
+        with self._lock:
+            while self._active < self.max_concurrency:
+                ticket = self._next_ticket()
+                if ticket is None:
+                    return
+                if not ticket.future.set_running_or_notify_cancel():
+                    continue
+                self._virtual_time = max(self._virtual_time, ticket.start_tag)
+                self._running[ticket.user_id] = self._running.get(ticket.user_id, 0) + 1
+                self._active += 1
+                self._pool.submit(self._execute, ticket)
+
+    def _execute(self, ticket: _Ticket):
+        try:
+            ticket.future.set_result(ticket.call())
+        except BaseException as e:
+            ticket.future.set_exception(e)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._running[ticket.user_id] -= 1
+                if not self._running[ticket.user_id]:
+                    del self._running[ticket.user_id]
+                self._forget_if_idle(ticket.user_id)
+            self._dispatch()
+
+    def _queued(self) -> int:
+        """Calls waiting for a worker; running calls don't count"""
+        with self._lock:
+            return sum(
+                1 for queue in self._queues.values() for ticket in queue if not ticket.future.cancelled()
+            )
+
+    def position(self, future: Future) -> Optional[int]:
+        """1-based position of a queued call in dispatch order, or None once it has started"""
+        with self._lock:
+            queued = [
+                ticket
+                for queue in self._queues.values()
+                for ticket in queue
+                if not ticket.future.cancelled()
+            ]
+        ticket = next((ticket for ticket in queued if ticket.future is future), None)
+        if ticket is None:
+            return None
+        return 1 + sum(1 for other in queued if other.order() < ticket.order())
+
+    async def run(self, fn: Callable[..., Any], *args, user_id: Optional[str] = None, **kwargs) -> Any:
+        """Run ``fn`` on the generation pool without blocking the event loop"""
+        if self._queued() >= self.max_queue:
+            raise self._reject("too many queued requests")
+        self.admit(user_id)
+
+        future = self.submit(fn, *args, user_id=user_id, **kwargs)
+        waiter = asyncio.wrap_future(future)
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            # Only give up if the call has not started yet
+            if future.cancel():
+                raise self._reject("timed out waiting for a free worker")
+            return await waiter
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pending = [
+                [ticket for ticket in queue if not ticket.future.cancelled()]
+                for queue in self._queues.values()
+            ]
+        queued = sum(len(tickets) for tickets in pending)
+        users = sum(1 for tickets in pending if tickets)
+        return {
+            "active": self._active,
+            "waiting": queued,
+            "queued_users": users,
+            "rate_limited": self.rate_limited,
+            "max_concurrency": self.max_concurrency,
+            "user_max_concurrency": self.user_max_concurrency,
+            "max_queue": self.max_queue,
+        }
+
+
+class _Flight:
+    __slots__ = ("task", "cancel", "callers")
+
+    def __init__(self, task: "asyncio.Task", cancel: CancelToken):
+        self.task = task
+        self.cancel = cancel
+        self.callers = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key starts the work; callers arriving while it is
+    in flight await the same result. The work gets a ``CancelToken`` and is
+    cancelled once every caller waiting for it has gone away (e.g. all
+    clients disconnected), so abandoned generations stop spending tokens.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self.abandoned = 0
+        self._inflight: Dict[str, _Flight] = {}
+
+    async def do(self, key: str, fn: Callable[[CancelToken], Awaitable[Any]]) -> Any:
+        flight = self._inflight.get(key)
+        if flight is not None:
+            self.coalesced += 1
+        else:
+            cancel = CancelToken(generation_executor.run_timeout)
+            flight = _Flight(asyncio.ensure_future(fn(cancel)), cancel)
+            self._inflight[key] = flight
+            flight.task.add_done_callback(functools.partial(self._done, key, flight))
+
+        flight.callers += 1
+        try:
+            # Shield so one caller going away doesn't cancel the others' result
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.callers -= 1
+            if not flight.callers and not flight.task.done():
+                self.abandoned += 1
+                flight.cancel.cancel("all callers went away")
+                flight.task.cancel()
+
+    def _done(self, key: str, flight: _Flight, task: "asyncio.Task"):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        # Retrieve the outcome so failures nobody awaited aren't logged as unhandled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._inflight),
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+        }
+
+
+generation_executor = GenerationExecutor()
+generation_flight = SingleFlight()
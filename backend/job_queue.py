@@ -0,0 +1,419 @@
+import os
+import json
+import time
+import sqlite3
+import pathlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from archive import FileEntry
+
+
+class JobStatus:
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class Job(BaseModel):
+    id: str
+    user_id: Optional[str] = None
+    user_prompt: str
+    status: str = JobStatus.PENDING
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Manifest of the generated files; contents are served by the files and archive endpoints
+    files: List[FileEntry] = []
+    error: Optional[str] = None
+    # Id of an identical in-flight job whose run (and results) this job shares
+    coalesced_with: Optional[str] = None
+    # Id of the job whose project this job edits; user_prompt is then the change request
+    edit_of: Optional[str] = None
+    # 1-based position in the fair-share generation queue while the job is pending
+    queue_position: Optional[int] = None
+
+
+_JOB_COLUMNS = (
+    "id", "user_id", "user_prompt", "status", "created_at", "started_at",
+    "finished_at", "files", "error", "coalesced_with", "edit_of",
+)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    "id TEXT PRIMARY KEY, user_id TEXT, user_prompt TEXT NOT NULL, status TEXT NOT NULL, "
+    "created_at TEXT NOT NULL, started_at TEXT, finished_at TEXT, files TEXT, error TEXT, "
+    "coalesced_with TEXT, edit_of TEXT, key TEXT, "
+    # Set when this job's caller gave up on it (its run may go on for others)
+    "cancelled INTEGER NOT NULL DEFAULT 0, "
+    # Run bookkeeping, only used on rows that own a run
+    "resume INTEGER NOT NULL DEFAULT 0, cancel_requested INTEGER NOT NULL DEFAULT 0, "
+    "worker TEXT, heartbeat_at REAL, attempts INTEGER NOT NULL DEFAULT 0)",
+    "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)",
+    "CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key)",
+    "CREATE INDEX IF NOT EXISTS jobs_coalesced_with ON jobs (coalesced_with)",
+    "CREATE TABLE IF NOT EXISTS events ("
+    "seq INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, data TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS events_job ON events (job_id, seq)",
+)
+
+# Pending runs (alias "job") with the number of runs their user already has
+# running; claim() and position() both order by (running, created_at, id)
+_PENDING_RUNS = (
+    "SELECT job.*, (SELECT COUNT(*) FROM jobs AS running WHERE running.status = ? "
+    "AND running.coalesced_with IS NULL AND running.user_id IS job.user_id) AS running "
+    "FROM jobs AS job WHERE job.status = ? AND job.coalesced_with IS NULL"
+)
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+class JobQueue:
+    """Durable generation job queue in a local SQLite file.
+
+    The API process adds jobs and reads their status and progress events;
+    worker processes (``worker.py``) claim pending runs, publish their events
+    and record the results. A claimed run is leased to its worker, which
+    renews the lease with heartbeats every few seconds. Runs whose worker
+    stopped heartbeating for ``lease`` seconds are handed to another worker,
+    resuming from their last checkpoint, up to ``max_attempts`` times.
+    Pending runs are claimed oldest first among the users with the fewest
+    running jobs, and never beyond ``user_max_concurrency`` per user.
+
+    Every process and thread uses its own connection; the database is in WAL
+    mode so readers never wait for a writer.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = pathlib.Path(
+            path or os.getenv("JOB_QUEUE_PATH", pathlib.Path.cwd() / ".cache" / "jobs.sqlite3")
+        )
+        self.lease = float(os.getenv("JOB_LEASE_SECONDS", "30"))
+        self.max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self.user_max_concurrency = int(os.getenv("GENERATION_USER_MAX_CONCURRENCY", "2"))
+
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Autocommit; writes that must be atomic use _transaction()
+            db = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            for statement in _SCHEMA:
+                db.execute(statement)
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        db = self._connection()
+        # Take the write lock up front so concurrent claims can't pick the same run
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Job:
+        values = {column: row[column] for column in _JOB_COLUMNS}
+        values["files"] = json.loads(values["files"] or "[]")
+        return Job.model_validate(values)
+
+    @staticmethod
+    def _publish(db: sqlite3.Connection, job_id: str, event: Dict[str, Any]):
+        db.execute("INSERT INTO events (job_id, data) VALUES (?, ?)", (job_id, json.dumps(event)))
+
+    @staticmethod
+    def _update_run(db: sqlite3.Connection, run_id: str, **fields: Any):
+        """Update a run's leader and the coalesced jobs that share its results"""
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        db.execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ? OR coalesced_with = ?",
+            (*fields.values(), run_id, run_id),
+        )
+
+    # API side
+
+    def add(self, job: Job, key: Optional[str] = None) -> Job:
+        """Store a new job; with a ``key`` it joins an unfinished run of the same request"""
+        with self._transaction() as db:
+            leader = None
+            if key:
+                leader = db.execute(
+                    "SELECT id, status, started_at FROM jobs WHERE key = ? AND coalesced_with IS NULL "
+                    "AND status IN (?, ?) ORDER BY created_at DESC LIMIT 1",
+                    (key, JobStatus.PENDING, JobStatus.RUNNING),
+                ).fetchone()
+            db.execute(
+                "INSERT INTO jobs (id, user_id, user_prompt, status, created_at, started_at, "
+                "coalesced_with, edit_of, key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job.id, job.user_id, job.user_prompt,
+                    leader["status"] if leader else job.status,
+                    job.created_at.isoformat(),
+                    leader["started_at"] if leader else None,
+                    leader["id"] if leader else None,
+                    job.edit_of,
+                    None if leader else key,
+                ),
+            )
+        return self.get(job.id)
+
+    def leader(self, key: str) -> Optional[str]:
+        """Id of the unfinished run started for ``key``, if any"""
+        row = self._connection().execute(
+            "SELECT id FROM jobs WHERE key = ? AND coalesced_with IS NULL AND status IN (?, ?) "
+            "LIMIT 1",
+            (key, JobStatus.PENDING, JobStatus.RUNNING),
+        ).fetchone()
+        return row["id"] if row else None
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def is_cancelled(self, job_id: str) -> bool:
+        row = self._connection().execute(
+            "SELECT cancelled FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return bool(row and row["cancelled"])
+
+    def pending_runs(self) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = ? AND coalesced_with IS NULL",
+            (JobStatus.PENDING,),
+        ).fetchone()[0]
+
+    def run_ids(self) -> Set[str]:
+        """Ids of every run the queue still has a record of"""
+        return {
+            row["id"]
+            for row in self._connection().execute("SELECT id FROM jobs WHERE coalesced_with IS NULL")
+        }
+
+    def position(self, run_id: str) -> Optional[int]:
+        """1-based place of a pending run in claim order: users with fewer running runs first, then oldest
+
+        The place is a snapshot; runs of users at their concurrency cap are
+        counted where they would be claimed once a slot frees up.
+        """
+        row = self._connection().execute(
+            f"WITH pending AS ({_PENDING_RUNS}) "
+            "SELECT COUNT(*) FROM pending AS ahead, pending AS run WHERE run.id = ? "
+            "AND (ahead.running, ahead.created_at, ahead.id) <= (run.running, run.created_at, run.id)",
+            (JobStatus.RUNNING, JobStatus.PENDING, run_id),
+        ).fetchone()
+        return row[0] or None
+
+    def cancel(self, job_id: str) -> bool:
+        """Mark a job as given up by its caller; True once every job of its run is"""
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET cancelled = 1 WHERE id = ?", (job_id,))
+            row = db.execute(
+                "SELECT COALESCE(coalesced_with, id) AS run_id FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            remaining = db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE (id = ? OR coalesced_with = ?) AND cancelled = 0",
+                (row["run_id"], row["run_id"]),
+            ).fetchone()[0]
+        return remaining == 0
+
+    def stop(self, run_id: str, reason: str = "cancelled by user"):
+        """Withdraw a pending run, or ask the worker running it to stop"""
+        with self._transaction() as db:
+            row = db.execute("SELECT status FROM jobs WHERE id = ?", (run_id,)).fetchone()
+            if row is None or row["status"] in JobStatus.FINISHED:
+                return
+            if row["status"] == JobStatus.RUNNING:
+                # The worker sees this with its next heartbeat
+                db.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (run_id,))
+                return
+            self._update_run(
+                db, run_id, status=JobStatus.CANCELLED, error=reason, finished_at=_now()
+            )
+            self._publish(db, run_id, {"type": "status", "status": JobStatus.CANCELLED, "error": reason})
+
+    def resume(self, run_id: str, job_id: str) -> bool:
+        """Re-queue a failed or cancelled run to continue from its checkpoint"""
+        with self._transaction() as db:
+            row = db.execute("SELECT status FROM jobs WHERE id = ?", (run_id,)).fetchone()
+            if row is None or row["status"] not in (JobStatus.FAILED, JobStatus.CANCELLED):
+                return False
+            self._update_run(db, run_id, status=JobStatus.PENDING, error=None, finished_at=None)
+            db.execute(
+                "UPDATE jobs SET resume = 1, cancel_requested = 0, attempts = 0, worker = NULL "
+                "WHERE id = ?",
+                (run_id,),
+            )
+            db.execute("UPDATE jobs SET cancelled = 0 WHERE id IN (?, ?)", (run_id, job_id))
+            # Start a fresh event log; the old one ends with the failure
+            db.execute("DELETE FROM events WHERE job_id = ?", (run_id,))
+        return True
+
+    def events_since(self, run_id: str, cursor: int) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT data FROM events WHERE job_id = ? ORDER BY seq LIMIT -1 OFFSET ?",
+            (run_id, cursor),
+        ).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def remove_finished(self, before: datetime) -> List[str]:
+        """Delete jobs finished before ``before``; returns their ids"""
+        with self._transaction() as db:
+            ids = [
+                row["id"]
+                for row in db.execute(
+                    "SELECT id FROM jobs WHERE finished_at < ?", (before.isoformat(),)
+                )
+            ]
+            for job_id in ids:
+                db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+                db.execute("DELETE FROM events WHERE job_id = ?", (job_id,))
+        return ids
+
+    def stats(self) -> Dict[str, int]:
+        counts = {status: 0 for status in (JobStatus.PENDING, JobStatus.RUNNING, *JobStatus.FINISHED)}
+        for row in self._connection().execute(
+            "SELECT status, COUNT(*) AS runs FROM jobs WHERE coalesced_with IS NULL GROUP BY status"
+        ):
+            counts[row["status"]] = row["runs"]
+        return counts
+
+    # Worker side
+
+    def claim(self, worker: str) -> Optional[Tuple[Job, bool]]:
+        """Lease the next pending run to ``worker``; returns it and whether to resume it"""
+        with self._transaction() as db:
+            row = db.execute(
+                f"SELECT * FROM ({_PENDING_RUNS}) WHERE running < ? "
+                "ORDER BY running, created_at, id LIMIT 1",
+                (JobStatus.RUNNING, JobStatus.PENDING, self.user_max_concurrency),
+            ).fetchone()
+            if row is None:
+                return None
+            started_at = row["started_at"] or _now()
+            self._update_run(db, row["id"], status=JobStatus.RUNNING, started_at=started_at)
+            db.execute(
+                "UPDATE jobs SET worker = ?, heartbeat_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (worker, time.time(), row["id"]),
+            )
+            self._publish(
+                db, row["id"], {"type": "status", "status": JobStatus.RUNNING, "resumed": bool(row["resume"])}
+            )
+        return self._job(row).model_copy(update={"status": JobStatus.RUNNING}), bool(row["resume"])
+
+    def heartbeat(self, worker: str, run_ids: List[str]) -> Set[str]:
+        """Renew the leases of ``run_ids``; returns the runs that must stop
+
+        A run must stop when it was cancelled or when its lease was lost to
+        another worker.
+        """
+        if not run_ids:
+            return set()
+        placeholders = ", ".join("?" for _ in run_ids)
+        with self._transaction() as db:
+            db.execute(
+                f"UPDATE jobs SET heartbeat_at = ? WHERE worker = ? AND status = ? "
+                f"AND id IN ({placeholders})",
+                (time.time(), worker, JobStatus.RUNNING, *run_ids),
+            )
+            keep = {
+                row["id"]
+                for row in db.execute(
+                    f"SELECT id FROM jobs WHERE worker = ? AND status = ? "
+                    f"AND cancel_requested = 0 AND id IN ({placeholders})",
+                    (worker, JobStatus.RUNNING, *run_ids),
+                )
+            }
+        return set(run_ids) - keep
+
+    def publish(self, run_id: str, event: Dict[str, Any]):
+        self._publish(self._connection(), run_id, event)
+
+    def finish(
+        self,
+        worker: str,
+        run_id: str,
+        status: str,
+        files: Optional[List[FileEntry]] = None,
+        error: Optional[str] = None,
+    ) -> bool:
+        """Record a run's outcome, unless its lease has passed to another worker"""
+        with self._transaction() as db:
+            owned = db.execute(
+                "SELECT 1 FROM jobs WHERE id = ? AND worker = ? AND status = ?",
+                (run_id, worker, JobStatus.RUNNING),
+            ).fetchone()
+            if owned is None:
+                return False
+            self._update_run(
+                db, run_id,
+                status=status,
+                files=json.dumps([entry.model_dump() for entry in files or []]),
+                error=error,
+                finished_at=_now(),
+            )
+            db.execute(
+                "UPDATE jobs SET worker = NULL, resume = 0, cancel_requested = 0 WHERE id = ?",
+                (run_id,),
+            )
+            self._publish(db, run_id, {"type": "status", "status": status, "error": error})
+        return True
+
+    def release(self, worker: str, run_id: str):
+        """Hand an interrupted run back to the queue, to be resumed by any worker"""
+        with self._transaction() as db:
+            owned = db.execute(
+                "SELECT 1 FROM jobs WHERE id = ? AND worker = ? AND status = ?",
+                (run_id, worker, JobStatus.RUNNING),
+            ).fetchone()
+            if owned is None:
+                return
+            self._update_run(db, run_id, status=JobStatus.PENDING)
+            # A clean shutdown doesn't count against the run's attempts
+            db.execute(
+                "UPDATE jobs SET worker = NULL, resume = 1, attempts = attempts - 1 WHERE id = ?",
+                (run_id,),
+            )
+
+    def recover(self) -> int:
+        """Re-queue runs whose worker stopped heartbeating; returns how many"""
+        expired = time.time() - self.lease
+        with self._transaction() as db:
+            rows = db.execute(
+                "SELECT id, attempts FROM jobs WHERE status = ? AND heartbeat_at < ?",
+                (JobStatus.RUNNING, expired),
+            ).fetchall()
+            for row in rows:
+                if row["attempts"] < self.max_attempts:
+                    self._update_run(db, row["id"], status=JobStatus.PENDING)
+                    db.execute(
+                        "UPDATE jobs SET worker = NULL, resume = 1 WHERE id = ?", (row["id"],)
+                    )
+                    continue
+                error = f"worker lost {row['attempts']} times"
+                self._update_run(
+                    db, row["id"], status=JobStatus.FAILED, error=error, finished_at=_now()
+                )
+                db.execute("UPDATE jobs SET worker = NULL WHERE id = ?", (row["id"],))
+                self._publish(db, row["id"], {"type": "status", "status": JobStatus.FAILED, "error": error})
+        return len(rows)
@@ -0,0 +1,485 @@
+import os
+import uuid
+import pathlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+from archive import FileEntry, build_manifest
+from job_queue import Job, JobQueue, JobStatus
+from generation import CancelToken, GenerationCancelled, generation_executor, run_generation
+from agent.workspaces import (
+    workspace_path,
+    create_workspace,
+    copy_workspace,
+    remove_workspace,
+    evict_stale_workspaces,
+)
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def _delete_checkpoints(job_id: str):
+    from agent.graph import delete_checkpoints
+
+    try:
+        delete_checkpoints(job_id)
+    except Exception as e:
+        logger.warning(f"Could not delete checkpoints of job {job_id}: {str(e)}")
+
+
+def run_job(
+    job: Job,
+    on_event: Callable[[Dict[str, Any]], None],
+    cancel: Optional[CancelToken],
+    finish: Callable[[str, List[FileEntry], Optional[str]], bool],
+    resume: bool = False,
+):
+    """Run a job's generation in its workspace and hand the outcome to ``finish``
+
+    ``finish(status, files, error)`` records the outcome and returns whether
+    it did (a worker that lost its lease does not). Checkpoints are only kept
+    for runs that may still be resumed, so they are deleted once a success
+    has been recorded.
+    """
+    files, error = [], None
+    try:
+        workspace = create_workspace(job.id)
+        paths = run_generation(
+            job.user_prompt,
+            workspace,
+            on_event=on_event,
+            thread_id=job.id,
+            resume=resume,
+            edit_request=job.user_prompt if job.edit_of else None,
+            cancel=cancel,
+            user_id=job.user_id,
+        )
+        files = build_manifest(workspace, paths)
+        status = JobStatus.SUCCEEDED
+    except GenerationCancelled as e:
+        logger.info(f"Generation job {job.id} cancelled: {str(e)}")
+        error, status = str(e), JobStatus.CANCELLED
+    except Exception as e:
+        logger.error(f"Generation job {job.id} failed: {str(e)}")
+        error, status = str(e), JobStatus.FAILED
+
+    if finish(status, files, error) and status == JobStatus.SUCCEEDED:
+        _delete_checkpoints(job.id)
+
+
+def _new_job(user_prompt: str, user_id: Optional[str], edit_of: Optional[str] = None) -> Job:
+    return Job(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        user_prompt=user_prompt,
+        created_at=datetime.utcnow(),
+        edit_of=edit_of,
+    )
+
+
+def _check_capacity(pending: int, max_pending: int, user_id: Optional[str]):
+    """Refuse a new run once max_pending runs are waiting or the user is rate limited"""
+    if pending >= max_pending:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many pending generation jobs",
+            headers={"Retry-After": str(generation_executor.retry_after)},
+        )
+    generation_executor.admit(user_id)
+
+
+def _check_editable(source: Job):
+    if source.status != JobStatus.SUCCEEDED:
+        raise HTTPException(
+            status_code=409, detail=f"Only succeeded jobs can be edited (job is {source.status})"
+        )
+
+
+def _check_resumable(run_job: Job):
+    if run_job.status not in (JobStatus.FAILED, JobStatus.CANCELLED):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Only failed or cancelled jobs can be resumed (job is {run_job.status})",
+        )
+
+
+def _cancelled_by_caller(job: Job) -> Job:
+    """How a job looks to its caller once they gave up on a run that goes on for others"""
+    return job.model_copy(
+        update={"status": JobStatus.CANCELLED, "error": "cancelled by user", "queue_position": None}
+    )
+
+
+class JobManager:
+    """Tracks background generation jobs driven by the generation pool.
+
+    Jobs are kept in memory and each runs in its own workspace directory;
+    finished jobs and their workspaces are evicted after ``ttl``. New
+    submissions are refused with a 429 once ``max_pending`` jobs are waiting.
+    A submission whose request key matches an unfinished job becomes a
+    follower of that job instead of starting another graph run. Runs are
+    checkpointed under the job id, so a failed or cancelled job can be
+    resumed from its last completed node. Runs are cancelled on request or
+    after ``generation_executor.run_timeout`` seconds.
+    """
+
+    def __init__(self):
+        self.ttl = timedelta(seconds=int(os.getenv("JOB_TTL_SECONDS", "3600")))
+        self.max_pending = int(os.getenv("JOB_MAX_PENDING", "64"))
+
+        self._jobs: Dict[str, Job] = {}
+        self._events: Dict[str, List[Dict[str, Any]]] = {}
+        self._inflight: Dict[str, str] = {}  # request key -> leader job id
+        self._queued: Dict[str, Future] = {}  # job id -> future of its queued run
+        self._tokens: Dict[str, CancelToken] = {}  # job id -> cancel token of its run
+        self._cancelled: Set[str] = set()  # jobs whose callers cancelled them
+        self._lock = threading.Lock()
+
+    def submit(
+        self, user_prompt: str, user_id: Optional[str] = None, key: Optional[str] = None
+    ) -> Job:
+        """Create a job and queue it on the generation pool"""
+        self.evict_expired()
+
+        with self._lock:
+            job = _new_job(user_prompt, user_id)
+
+            leader = self._jobs.get(self._inflight.get(key)) if key else None
+            if leader is not None and leader.status not in JobStatus.FINISHED:
+                job.coalesced_with = leader.id
+                self._jobs[job.id] = job
+                self._sync(job)
+                return job
+
+            self._check_capacity(user_id)
+            self._jobs[job.id] = job
+            self._events[job.id] = []
+            if key:
+                self._inflight[key] = job.id
+
+        create_workspace(job.id)
+        self._queue(job, key=key)
+        return job
+
+    def edit(self, job_id: str, edit_request: str, user_id: Optional[str] = None) -> Job:
+        """Queue a change to a finished job's project as a new job
+
+        The new job starts from a copy of the source job's workspace and only
+        plans and rewrites the files the change request affects.
+        """
+        source = self.get(job_id, user_id)
+        _check_editable(source)
+        self.evict_expired()
+
+        with self._lock:
+            self._check_capacity(user_id)
+            job = _new_job(edit_request, user_id, edit_of=source.id)
+            self._jobs[job.id] = job
+            self._events[job.id] = []
+
+        copy_workspace(source.coalesced_with or source.id, job.id)
+        self._queue(job)
+        return job
+
+    def _queue(self, job: Job, **kwargs):
+        """Queue a job's run in its user's fair-share queue"""
+        self._tokens[job.id] = CancelToken(generation_executor.run_timeout)
+        future = generation_executor.submit(self._run, job, user_id=job.user_id, **kwargs)
+        with self._lock:
+            if not future.done() and job.status == JobStatus.PENDING:
+                self._queued[job.id] = future
+
+    def _check_capacity(self, user_id: Optional[str]):
+        """Call with the lock held"""
+        pending = sum(
+            1
+            for queued in self._jobs.values()
+            if queued.status == JobStatus.PENDING and not queued.coalesced_with
+        )
+        _check_capacity(pending, self.max_pending, user_id)
+
+    def _sync(self, job: Job):
+        """Copy the leader's progress onto a coalesced follower"""
+        leader = self._jobs.get(job.coalesced_with) if job.coalesced_with else None
+        if leader is not None:
+            job.status = leader.status
+            job.started_at = leader.started_at
+            job.finished_at = leader.finished_at
+            job.queue_position = leader.queue_position
+            job.files = leader.files
+            job.error = leader.error
+
+    def _publish(self, job: Job, event: Dict[str, Any]):
+        with self._lock:
+            self._events.setdefault(job.id, []).append(event)
+
+    def _run(self, job: Job, key: Optional[str] = None, resume: bool = False):
+        with self._lock:
+            self._queued.pop(job.id, None)
+            job.queue_position = None
+            job.status = JobStatus.RUNNING
+        job.started_at = datetime.utcnow()
+        self._publish(job, {"type": "status", "status": job.status, "resumed": resume})
+
+        def finish(status: str, files: List[FileEntry], error: Optional[str]) -> bool:
+            job.files, job.error, job.status = files, error, status
+            job.finished_at = datetime.utcnow()
+            self._publish(job, {"type": "status", "status": job.status, "error": job.error})
+            with self._lock:
+                self._tokens.pop(job.id, None)
+                if key and self._inflight.get(key) == job.id:
+                    del self._inflight[key]
+            return True
+
+        run_job(job, lambda event: self._publish(job, event), self._tokens.get(job.id), finish, resume)
+
+    def cancel(self, job_id: str, user_id: Optional[str] = None) -> Job:
+        """Cancel a job, stopping its run once no other job is waiting for it
+
+        A run shared by coalesced jobs keeps going while any of them has not
+        been cancelled. A run that has not started yet is withdrawn from the
+        queue; a running one stops at its next node, LLM or tool call.
+        """
+        job = self.get(job_id, user_id)
+        if job.status in JobStatus.FINISHED:
+            return job
+
+        run_id = job.coalesced_with or job.id
+        with self._lock:
+            self._cancelled.add(job.id)
+            abandoned = all(
+                other.id in self._cancelled
+                for other in self._jobs.values()
+                if other.id == run_id or other.coalesced_with == run_id
+            )
+        if abandoned:
+            self._stop(run_id)
+        return self.get(job_id, user_id)
+
+    def _stop(self, run_id: str):
+        token = self._tokens.get(run_id)
+        if token is not None:
+            token.cancel("cancelled by user")
+
+        future = self._queued.get(run_id)
+        if future is None or not future.cancel():
+            # Already running: the token stops it
+            return
+        # Never started, so _run will not finish the job; do it here
+        run_job = self._jobs[run_id]
+        with self._lock:
+            self._queued.pop(run_id, None)
+            self._tokens.pop(run_id, None)
+            run_job.status = JobStatus.CANCELLED
+            run_job.error = "cancelled by user"
+            run_job.queue_position = None
+            run_job.finished_at = datetime.utcnow()
+            for key, leader_id in list(self._inflight.items()):
+                if leader_id == run_id:
+                    del self._inflight[key]
+        self._publish(run_job, {"type": "status", "status": run_job.status, "error": run_job.error})
+
+    def resume(self, job_id: str, user_id: Optional[str] = None) -> Job:
+        """Re-queue a failed or cancelled job, continuing from its last checkpoint"""
+        job = self.get(job_id, user_id)
+        # Followers share their leader's run, so resuming one resumes the leader
+        run_job = self._jobs.get(job.coalesced_with or job.id)
+        if run_job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+
+        with self._lock:
+            _check_resumable(run_job)
+            generation_executor.admit(run_job.user_id)
+            self._cancelled.discard(job.id)
+            self._cancelled.discard(run_job.id)
+            run_job.status = JobStatus.PENDING
+            run_job.error = None
+            run_job.finished_at = None
+            # Start a fresh event log; the old one ends with the failure
+            self._events[run_job.id] = []
+
+        create_workspace(run_job.id)
+        self._queue(run_job, resume=True)
+        return self.get(job_id, user_id)
+
+    def get(self, job_id: str, user_id: Optional[str] = None) -> Job:
+        """Return a job, hiding jobs that belong to other users"""
+        job = self._jobs.get(job_id)
+        if job is None or (user_id is not None and job.user_id != user_id):
+            raise HTTPException(status_code=404, detail="Job not found")
+        run_job = self._jobs.get(job.coalesced_with, job) if job.coalesced_with else job
+        future = self._queued.get(run_job.id)
+        if future is not None:
+            run_job.queue_position = generation_executor.position(future)
+        self._sync(job)
+        if job.id in self._cancelled and job.status != JobStatus.CANCELLED:
+            return _cancelled_by_caller(job)
+        return job
+
+    def workspace(self, job_id: str) -> pathlib.Path:
+        """Workspace holding a job's files (the leader's, for followers)"""
+        job = self._jobs.get(job_id)
+        return workspace_path(job.coalesced_with if job and job.coalesced_with else job_id)
+
+    def events_since(self, job_id: str, cursor: int) -> List[Dict[str, Any]]:
+        """Return the progress events published after ``cursor``"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.coalesced_with:
+                job_id = job.coalesced_with
+            return list(self._events.get(job_id, [])[cursor:])
+
+    def evict_expired(self):
+        cutoff = datetime.utcnow() - self.ttl
+        with self._lock:
+            for job in self._jobs.values():
+                self._sync(job)
+            expired = [
+                job_id
+                for job_id, job in self._jobs.items()
+                if job.finished_at is not None and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+                self._events.pop(job_id, None)
+                self._cancelled.discard(job_id)
+
+        for job_id in expired:
+            remove_workspace(job_id)
+            _delete_checkpoints(job_id)
+
+    def sweep_workspaces(self) -> int:
+        """Remove workspaces left behind by earlier processes
+
+        A workspace is kept while this manager has its job or while anything
+        in it changed within ``ttl`` (it may belong to another API process).
+        """
+        with self._lock:
+            keep = set(self._jobs)
+        return evict_stale_workspaces(self.ttl.total_seconds(), keep)
+
+    def stats(self) -> Dict[str, int]:
+        """Number of runs (coalesced jobs excluded) in each status"""
+        with self._lock:
+            runs = [job for job in self._jobs.values() if not job.coalesced_with]
+        return {
+            status: sum(1 for job in runs if job.status == status)
+            for status in (JobStatus.PENDING, JobStatus.RUNNING, *JobStatus.FINISHED)
+        }
+
+
+class QueuedJobManager:
+    """Jobs kept in the durable queue and run by separate worker processes.
+
+    Offers the same operations as ``JobManager``, but jobs, their progress
+    events and results live in the ``JobQueue`` SQLite file, so they survive
+    API restarts, and ``worker.py`` processes run them. Workspaces are shared
+    with the workers through ``WORKSPACES_ROOT``; cancellation reaches a
+    running job through its worker's next heartbeat.
+    """
+
+    def __init__(self):
+        self.ttl = timedelta(seconds=int(os.getenv("JOB_TTL_SECONDS", "3600")))
+        self.max_pending = int(os.getenv("JOB_MAX_PENDING", "64"))
+        self.queue = JobQueue()
+
+    def _check_capacity(self, user_id: Optional[str]):
+        _check_capacity(self.queue.pending_runs(), self.max_pending, user_id)
+
+    def submit(
+        self, user_prompt: str, user_id: Optional[str] = None, key: Optional[str] = None
+    ) -> Job:
+        """Create a job and add it to the queue"""
+        self.evict_expired()
+
+        job = _new_job(user_prompt, user_id)
+        if not (key and self.queue.leader(key)):
+            self._check_capacity(user_id)
+        job = self.queue.add(job, key=key)
+        if not job.coalesced_with:
+            create_workspace(job.id)
+        return self.get(job.id)
+
+    def edit(self, job_id: str, edit_request: str, user_id: Optional[str] = None) -> Job:
+        """Queue a change to a finished job's project as a new job"""
+        source = self.get(job_id, user_id)
+        _check_editable(source)
+        self.evict_expired()
+        self._check_capacity(user_id)
+
+        job = _new_job(edit_request, user_id, edit_of=source.id)
+        copy_workspace(source.coalesced_with or source.id, job.id)
+        self.queue.add(job)
+        return self.get(job.id)
+
+    def cancel(self, job_id: str, user_id: Optional[str] = None) -> Job:
+        """Cancel a job, stopping its run once no other job is waiting for it"""
+        job = self.get(job_id, user_id)
+        if job.status in JobStatus.FINISHED:
+            return job
+        if self.queue.cancel(job.id):
+            self.queue.stop(job.coalesced_with or job.id)
+        return self.get(job_id, user_id)
+
+    def resume(self, job_id: str, user_id: Optional[str] = None) -> Job:
+        """Re-queue a failed or cancelled job, continuing from its last checkpoint"""
+        job = self.get(job_id, user_id)
+        run_id = job.coalesced_with or job.id
+        run_job = self.queue.get(run_id)
+        if run_job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        _check_resumable(run_job)
+        generation_executor.admit(run_job.user_id)
+        create_workspace(run_id)
+        if not self.queue.resume(run_id, job.id):
+            raise HTTPException(status_code=409, detail="Job was resumed concurrently")
+        return self.get(job_id, user_id)
+
+    def get(self, job_id: str, user_id: Optional[str] = None) -> Job:
+        """Return a job, hiding jobs that belong to other users"""
+        job = self.queue.get(job_id)
+        if job is None or (user_id is not None and job.user_id != user_id):
+            raise HTTPException(status_code=404, detail="Job not found")
+        if job.status == JobStatus.PENDING:
+            job.queue_position = self.queue.position(job.coalesced_with or job.id)
+        if job.status != JobStatus.CANCELLED and self.queue.is_cancelled(job.id):
+            return _cancelled_by_caller(job)
+        return job
+
+    def workspace(self, job_id: str) -> pathlib.Path:
+        """Workspace holding a job's files (the leader's, for followers)"""
+        job = self.queue.get(job_id)
+        return workspace_path(job.coalesced_with if job and job.coalesced_with else job_id)
+
+    def events_since(self, job_id: str, cursor: int) -> List[Dict[str, Any]]:
+        """Return the progress events published after ``cursor``"""
+        job = self.queue.get(job_id)
+        run_id = job.coalesced_with if job is not None and job.coalesced_with else job_id
+        return self.queue.events_since(run_id, cursor)
+
+    def evict_expired(self):
+        for job_id in self.queue.remove_finished(datetime.utcnow() - self.ttl):
+            remove_workspace(job_id)
+            _delete_checkpoints(job_id)
+
+    def sweep_workspaces(self) -> int:
+        """Remove workspaces of jobs the queue no longer knows about, once idle for ``ttl``"""
+        return evict_stale_workspaces(self.ttl.total_seconds(), self.queue.run_ids())
+
+    def stats(self) -> Dict[str, int]:
+        return self.queue.stats()
+
+
+# "worker" hands jobs to worker.py processes through the durable queue;
+# "inline" runs them on this process's generation pool
+JOB_EXECUTION = os.getenv("JOB_EXECUTION", "inline").lower()
+
+job_manager = QueuedJobManager() if JOB_EXECUTION == "worker" else JobManager()
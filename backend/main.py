@@ -1,14 +1,52 @@
 import os
+import json
+import time
+import asyncio
+import importlib
 import logging
 from typing import Dict, Any
+from contextlib import asynccontextmanager
 from datetime import datetime
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
-from agent.graph import agent
-from auth import get_current_user, get_optional_user, auth_service, google_oauth
+from auth import (
+    get_current_user,
+    get_optional_user,
+    auth_service,
+    google_oauth,
+    logout_user,
+    security,
+    token_cache,
+)
+from archive import (
+    build_manifest,
+    etag_matches,
+    file_sha256,
+    manifest_etag,
+    stream_zip,
+    workspace_files,
+)
+from generation import (
+    CancelToken,
+    GenerationCancelled,
+    generate_files,
+    generation_executor,
+    generation_flight,
+    request_key,
+)
+from jobs import Job, JobStatus, job_manager
+from templates import RenderedTemplate, accepts_gzip, template_cache
+from agent.blobs import blob_store
+from agent.llm_cache import llm_cache
+from agent.plan_cache import plan_cache
+from agent.metrics import HTTP_DURATION, Gauge, registry
+from agent.workspaces import read_workspace_file, safe_path_for_project
 
 # Load environment variables
 load_dotenv()
@@ -17,11 +55,39 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def sweep_workspaces():
+    try:
+        evicted = job_manager.sweep_workspaces()
+    except Exception as e:
+        logger.warning(f"Could not sweep stale workspaces: {str(e)}")
+        return
+    if evicted:
+        logger.info(f"Evicted {evicted} stale workspaces")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Render the project templates once so the fast path never renders on a request
+    template_cache.warm()
+    # Sweep workspaces of earlier processes in the background, off the startup path
+    asyncio.get_running_loop().run_in_executor(None, sweep_workspaces)
+    # The agent graph is imported on the first generation; optionally warm it
+    # up in the background so startup (and /health) is not held up by it
+    if os.getenv("AGENT_PRELOAD", "false").lower() == "true":
+        asyncio.get_running_loop().run_in_executor(
+            None, importlib.import_module, "agent.graph"
+        )
+    yield
+    # Close pooled HTTP connections on shutdown
+    await google_oauth.aclose()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="ARC-BUILDER Backend",
     description="Backend API for ARC-BUILDER code generation",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -35,6 +101,74 @@ app.add_middleware(
 )
 
 
+# Gauges read at scrape time for capacity planning
+registry.register(Gauge(
+    "arc_generation_active", "Generations running on the generation pool",
+    lambda: generation_executor.stats()["active"],
+))
+registry.register(Gauge(
+    "arc_generation_waiting", "Requests waiting for a generation slot",
+    lambda: generation_executor.stats()["waiting"],
+))
+registry.register(Gauge(
+    "arc_jobs_pending", "Background jobs waiting for a generation slot or worker",
+    lambda: job_manager.stats()["pending"],
+))
+registry.register(Gauge(
+    "arc_llm_cache_hits", "Planner/architect responses served from the LLM cache",
+    lambda: llm_cache.stats()["hits"],
+))
+registry.register(Gauge(
+    "arc_llm_cache_misses", "Planner/architect cache lookups that called the LLM",
+    lambda: llm_cache.stats()["misses"],
+))
+
+
+class RequestLatencyMiddleware:
+    """Records time to the response start per route
+
+    A plain ASGI middleware rather than ``@app.middleware("http")``, which
+    hides client disconnects from handlers (see ``cancel_on_disconnect``).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        recorded = False
+
+        def record(status: int):
+            nonlocal recorded
+            recorded = True
+            # Label by route template so job ids don't explode label cardinality
+            route = scope.get("route")
+            HTTP_DURATION.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status),
+            )
+
+        async def send_and_record(message):
+            if message["type"] == "http.response.start":
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_record)
+        finally:
+            if not recorded:
+                record(500)
+
+
+app.add_middleware(RequestLatencyMiddleware)
+
+
 # Request models
 class GenerateRequest(BaseModel):
     user_prompt: str
@@ -42,6 +176,10 @@ class GenerateRequest(BaseModel):
     framework: str = "html-css-js"
 
 
+class EditRequest(BaseModel):
+    change_request: str
+
+
 class GenerateResponse(BaseModel):
     success: bool
     message: str
@@ -80,12 +218,61 @@ async def health_check():
         "environment": "development"
         if os.getenv("BACKEND_DEBUG") == "true"
         else "production",
+        "generation": generation_executor.stats(),
+        "single_flight": generation_flight.stats(),
+        "jobs": job_manager.stats(),
+        "auth_cache": token_cache.stats(),
+        "llm_cache": llm_cache.stats(),
+        "plan_cache": plan_cache.stats(),
+        "blob_store": blob_store.stats(),
+        "templates": template_cache.stats(),
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics for nodes, tools, LLM tokens and request latency"""
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+# How often a long request checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "1"))
+
+
+async def cancel_on_disconnect(http_request: Request, awaitable):
+    """Await ``awaitable``, cancelling it if the client disconnects first"""
+    task = asyncio.ensure_future(awaitable)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+        if done:
+            return task.result()
+        if await http_request.is_disconnected():
+            task.cancel()
+            raise HTTPException(status_code=499, detail="Client closed request")
+
+
+TEMPLATE_FAST_PATH = os.getenv("TEMPLATE_FAST_PATH", "false").lower() == "true"
+
+
+def template_response(rendered: RenderedTemplate, http_request: Request) -> Response:
+    """Serve a pre-rendered template, gzipped when the client accepts it"""
+    headers = {"Vary": "Accept-Encoding", "X-Template": rendered.template}
+    if accepts_gzip(http_request.headers.get("accept-encoding")):
+        return Response(
+            rendered.gzipped,
+            media_type="application/json",
+            headers={**headers, "Content-Encoding": "gzip"},
+        )
+    return Response(rendered.body, media_type="application/json", headers=headers)
+
+
 @app.post("/api/generate", response_model=GenerateResponse)
 async def generate_code(
-    request: GenerateRequest, current_user: Dict[str, Any] = Depends(get_current_user)
+    request: GenerateRequest,
+    http_request: Request,
+    current_user: Dict[str, Any] = Depends(get_current_user),
 ):
     """Generate code using the LangGraph agent (requires authentication)"""
     try:
@@ -93,29 +280,42 @@ async def generate_code(
             f"Generating code for prompt: {request.user_prompt} (User: {current_user.get('email', 'unknown')})"
         )
 
-        # Use the LangGraph agent to generate code
-        result = agent.invoke(
-            {"user_prompt": request.user_prompt}, {"recursion_limit": 100}
+        # Prompts that only ask for a common kind of app get its template, no LLM call
+        if TEMPLATE_FAST_PATH:
+            rendered = template_cache.for_prompt(
+                request.user_prompt, strict=True, message="Code generated successfully"
+            )
+            if rendered is not None:
+                return template_response(rendered, http_request)
+
+        # Run the LangGraph agent on the bounded generation pool so the event
+        # loop stays free for health and auth traffic
+        async def generate(cancel: CancelToken) -> Dict[str, str]:
+            return await generation_executor.run(
+                generate_files,
+                request.user_prompt,
+                cancel,
+                current_user.get("user_id"),
+                user_id=current_user.get("user_id"),
+            )
+
+        # Identical requests already in flight share one run, which is
+        # cancelled once every client waiting for it has disconnected
+        key = request_key(
+            request.user_prompt, request.project_type, request.framework, current_user.get("user_id")
+        )
+        generated_files = await cancel_on_disconnect(
+            http_request, generation_flight.do(key, generate)
         )
-
-        # Extract generated files from the result
-        generated_files = {}
-        if "coder_state" in result and result["coder_state"]:
-            coder_state = result["coder_state"]
-            if hasattr(coder_state, "task_plan") and coder_state.task_plan:
-                for step in coder_state.task_plan.implementation_steps:
-                    if hasattr(step, "filepath"):
-                        # Read the generated file content
-                        try:
-                            with open(step.filepath, "r", encoding="utf-8") as f:
-                                generated_files[step.filepath] = f.read()
-                        except FileNotFoundError:
-                            logger.warning(f"Generated file not found: {step.filepath}")
 
         return GenerateResponse(
             success=True, message="Code generated successfully", files=generated_files
         )
 
+    except HTTPException:
+        raise
+    except GenerationCancelled as e:
+        raise HTTPException(status_code=504, detail=f"Generation cancelled: {str(e)}")
     except Exception as e:
         logger.error(f"Error generating code: {str(e)}")
         raise HTTPException(
@@ -123,73 +323,176 @@ async def generate_code(
         )
 
 
-@app.post("/api/generate-simple")
+@app.post("/api/jobs", response_model=Job, status_code=202)
+async def create_job(
+    request: GenerateRequest, current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Queue a background generation and return its job id immediately"""
+    job = job_manager.submit(
+        request.user_prompt,
+        current_user.get("user_id"),
+        key=request_key(
+            request.user_prompt, request.project_type, request.framework, current_user.get("user_id")
+        ),
+    )
+    logger.info(
+        f"Queued generation job {job.id} (User: {current_user.get('email', 'unknown')})"
+    )
+    return job
+
+
+@app.get("/api/jobs/{job_id}", response_model=Job)
+async def get_job(
+    job_id: str, current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Get the status and, once finished, the results of a generation job"""
+    return job_manager.get(job_id, current_user.get("user_id"))
+
+
+@app.delete("/api/jobs/{job_id}", response_model=Job)
+async def cancel_job(
+    job_id: str, current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Cancel a pending or running generation job (it can be resumed later)"""
+    job = job_manager.cancel(job_id, current_user.get("user_id"))
+    logger.info(f"Cancelled generation job {job_id} (User: {current_user.get('email', 'unknown')})")
+    return job
+
+
+@app.post("/api/jobs/{job_id}/resume", response_model=Job, status_code=202)
+async def resume_job(
+    job_id: str, current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Re-queue a failed or cancelled generation job from its last completed graph step"""
+    job = job_manager.resume(job_id, current_user.get("user_id"))
+    logger.info(
+        f"Resumed generation job {job.id} (User: {current_user.get('email', 'unknown')})"
+    )
+    return job
+
+
+@app.post("/api/jobs/{job_id}/edits", response_model=Job, status_code=202)
+async def edit_job(
+    job_id: str,
+    request: EditRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+):
+    """Queue a change to a finished job's project as a new, targeted job"""
+    job = job_manager.edit(job_id, request.change_request, current_user.get("user_id"))
+    logger.info(
+        f"Queued edit job {job.id} of {job_id} (User: {current_user.get('email', 'unknown')})"
+    )
+    return job
+
+
+@app.get("/api/jobs/{job_id}/archive")
+async def download_job_archive(
+    job_id: str, request: Request, current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Download a job's project as a ZIP streamed from disk
+
+    The ETag is derived from the file manifest, so clients sending
+    ``If-None-Match`` get a 304 while the project is unchanged.
+    """
+    job = job_manager.get(job_id, current_user.get("user_id"))
+    workspace = job_manager.workspace(job_id)
+    if job.status == JobStatus.SUCCEEDED:
+        manifest = job.files
+    else:
+        manifest = await run_in_threadpool(
+            lambda: build_manifest(workspace, workspace_files(workspace))
+        )
+
+    etag = manifest_etag(manifest)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    headers["Content-Disposition"] = f'attachment; filename="{job_id}.zip"'
+    return StreamingResponse(
+        stream_zip(workspace, manifest), media_type="application/zip", headers=headers
+    )
+
+
+@app.get("/api/jobs/{job_id}/files/{path:path}")
+async def download_job_file(
+    job_id: str,
+    path: str,
+    request: Request,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+):
+    """Download a single generated file, tagged with its content hash"""
+    job_manager.get(job_id, current_user.get("user_id"))
+    try:
+        file = safe_path_for_project(path, job_manager.workspace(job_id))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="File not found")
+    if not file.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+
+    etag = f'"{await run_in_threadpool(file_sha256, file)}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(file, headers=headers)
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(
+    job_id: str, current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Stream job progress as Server-Sent Events
+
+    Emits one event per planner/architect/coder step and one ``file`` event,
+    with the file content read from disk, for every file the coder saves.
+    """
+    job_manager.get(job_id, current_user.get("user_id"))
+    workspace = job_manager.workspace(job_id)
+
+    async def event_stream():
+        cursor = 0
+        while True:
+            events = job_manager.events_since(job_id, cursor)
+            for event in events:
+                cursor += 1
+                if event["type"] == "file":
+                    event = {
+                        **event,
+                        "content": await run_in_threadpool(
+                            read_workspace_file, event["path"], workspace
+                        ),
+                    }
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                if event["type"] == "status" and event["status"] in JobStatus.FINISHED:
+                    return
+            if not events:
+                await asyncio.sleep(0.25)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/generate-simple", response_model=GenerateResponse)
 async def generate_simple_code(
-    request: GenerateRequest, current_user: Dict[str, Any] = Depends(get_optional_user)
+    request: GenerateRequest,
+    http_request: Request,
+    current_user: Dict[str, Any] = Depends(get_optional_user),
 ):
-    """Simple code generation endpoint for testing (optional authentication)"""
+    """Simple code generation endpoint for testing (optional authentication)
+
+    Serves the closest project template (todo app, landing page, portfolio,
+    dashboard, or a generic page) without calling the LLM.
+    """
     try:
         user_info = (
             f" (User: {current_user.get('email')})" if current_user else " (Anonymous)"
         )
         logger.info(f"Simple generation for prompt: {request.user_prompt}{user_info}")
 
-        # Simple response for testing connectivity
-        sample_files = {
-            "index.html": f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Generated App</title>
-    <link rel="stylesheet" href="styles.css">
-</head>
-<body>
-    <div class="container">
-        <h1>Generated App: {request.user_prompt}</h1>
-        <p>This is a sample generated HTML file.</p>
-    </div>
-    <script src="script.js"></script>
-</body>
-</html>""",
-            "styles.css": """body {
-    font-family: Arial, sans-serif;
-    margin: 0;
-    padding: 20px;
-    background-color: #f5f5f5;
-}
-
-.container {
-    max-width: 800px;
-    margin: 0 auto;
-    background: white;
-    padding: 30px;
-    border-radius: 10px;
-    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-}
-
-h1 {
-    color: #333;
-    text-align: center;
-}""",
-            "script.js": """document.addEventListener('DOMContentLoaded', function() {
-    console.log('Generated app loaded successfully!');
-    
-    // Add some interactivity
-    const heading = document.querySelector('h1');
-    if (heading) {
-        heading.addEventListener('click', function() {
-            this.style.color = this.style.color === 'blue' ? '#333' : 'blue';
-        });
-    }
-});""",
-        }
-
-        return GenerateResponse(
-            success=True,
-            message="Simple code generated successfully",
-            files=sample_files,
-        )
+        return template_response(template_cache.for_prompt(request.user_prompt), http_request)
 
     except Exception as e:
         logger.error(f"Error in simple generation: {str(e)}")
@@ -209,6 +512,9 @@ async def verify_auth(request: AuthRequest):
         # Get or create user profile
         profile = await auth_service.get_or_create_user_profile(user_data)
 
+        # Remember the verified token so later requests skip Supabase
+        token_cache.put(request.token, {**user_data, "profile": profile})
+
         # Generate backend token
         backend_token = auth_service.generate_backend_token(user_data)
 
@@ -230,6 +536,13 @@ async def get_user_info(current_user: Dict[str, Any] = Depends(get_current_user)
     return {"success": True, "user": current_user}
 
 
+@app.post("/api/auth/logout")
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Drop the user's Supabase tokens from the verified-token cache"""
+    logout_user(credentials.credentials)
+    return {"success": True, "message": "Logged out"}
+
+
 @app.get("/api/auth/protected")
 async def protected_route(current_user: Dict[str, Any] = Depends(get_current_user)):
     """Test protected route"""
@@ -245,7 +558,7 @@ async def google_auth(request: GoogleAuthRequest):
     """Authenticate with Google OAuth token"""
     try:
         # Verify Google token
-        google_user = google_oauth.verify_google_token(request.google_token)
+        google_user = await google_oauth.verify_google_token(request.google_token)
 
         # Create user data structure
         user_data = {
@@ -0,0 +1,69 @@
+const customers = ['Ada Lovelace', 'Grace Hopper', 'Alan Turing', 'Linus Torvalds', 'Margaret Hamilton'];
+
+function randomSeries(days) {
+    const series = [];
+    let value = 1000;
+    for (let i = 0; i < days; i++) {
+        value = Math.max(200, value + (Math.random() - 0.45) * 300);
+        series.push(Math.round(value));
+    }
+    return series;
+}
+
+function drawChart(series) {
+    const canvas = document.getElementById('chart');
+    const ctx = canvas.getContext('2d');
+    canvas.width = canvas.clientWidth;
+    const { width, height } = canvas;
+    const max = Math.max(...series);
+    const step = width / Math.max(series.length - 1, 1);
+
+    ctx.clearRect(0, 0, width, height);
+    ctx.beginPath();
+    series.forEach((value, i) => {
+        const x = i * step;
+        const y = height - (value / max) * (height - 20);
+        if (i === 0) ctx.moveTo(x, y);
+        else ctx.lineTo(x, y);
+    });
+    ctx.strokeStyle = '#4f46e5';
+    ctx.lineWidth = 2;
+    ctx.stroke();
+}
+
+function renderOrders() {
+    const tbody = document.getElementById('orders');
+    tbody.innerHTML = '';
+    for (let i = 0; i < 5; i++) {
+        const paid = Math.random() > 0.3;
+        const row = document.createElement('tr');
+        row.innerHTML = `
+            <td>#${1000 + Math.floor(Math.random() * 9000)}</td>
+            <td>${customers[i % customers.length]}</td>
+            <td>$${(Math.random() * 500 + 20).toFixed(2)}</td>
+            <td><span class="badge ${paid ? 'paid' : 'pending'}">${paid ? 'Paid' : 'Pending'}</span></td>`;
+        tbody.appendChild(row);
+    }
+}
+
+function refresh(days) {
+    const series = randomSeries(days);
+    const revenue = series.reduce((sum, value) => sum + value, 0);
+    const users = Math.round(revenue / 12);
+    const orders = Math.round(revenue / 48);
+
+    document.getElementById('stat-revenue').textContent = `$${revenue.toLocaleString()}`;
+    document.getElementById('stat-users').textContent = users.toLocaleString();
+    document.getElementById('stat-orders').textContent = orders.toLocaleString();
+    document.getElementById('stat-conversion').textContent = `${((orders / users) * 100).toFixed(1)}%`;
+
+    drawChart(series);
+    renderOrders();
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    const range = document.getElementById('range');
+    range.addEventListener('change', () => refresh(Number(range.value)));
+    window.addEventListener('resize', () => refresh(Number(range.value)));
+    refresh(Number(range.value));
+});
@@ -0,0 +1,11 @@
+document.addEventListener('DOMContentLoaded', function() {
+    console.log('Generated app loaded successfully!');
+
+    // Add some interactivity
+    const heading = document.querySelector('h1');
+    if (heading) {
+        heading.addEventListener('click', function() {
+            this.style.color = this.style.color === 'blue' ? '#333' : 'blue';
+        });
+    }
+});
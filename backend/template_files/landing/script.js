@@ -0,0 +1,19 @@
+document.addEventListener('DOMContentLoaded', () => {
+    const toggle = document.querySelector('.menu-toggle');
+    const links = document.querySelector('.nav-links');
+
+    toggle.addEventListener('click', () => links.classList.toggle('open'));
+    links.querySelectorAll('a').forEach(link => {
+        link.addEventListener('click', () => links.classList.remove('open'));
+    });
+
+    const form = document.getElementById('signup-form');
+    const email = document.getElementById('signup-email');
+    const message = document.getElementById('signup-message');
+
+    form.addEventListener('submit', event => {
+        event.preventDefault();
+        message.textContent = `Thanks! We'll be in touch at ${email.value}.`;
+        form.reset();
+    });
+});
@@ -0,0 +1,31 @@
+document.addEventListener('DOMContentLoaded', () => {
+    const toggle = document.getElementById('theme-toggle');
+    if (localStorage.getItem('theme') === 'dark') {
+        document.body.classList.add('dark');
+    }
+    toggle.addEventListener('click', () => {
+        const dark = document.body.classList.toggle('dark');
+        localStorage.setItem('theme', dark ? 'dark' : 'light');
+    });
+
+    const projects = document.querySelectorAll('.project');
+    document.querySelectorAll('.filter').forEach(button => {
+        button.addEventListener('click', () => {
+            document.querySelector('.filter.active').classList.remove('active');
+            button.classList.add('active');
+            const filter = button.dataset.filter;
+            projects.forEach(project => {
+                project.classList.toggle('hidden', filter !== 'all' && project.dataset.category !== filter);
+            });
+        });
+    });
+
+    const form = document.getElementById('contact-form');
+    const status = document.getElementById('contact-status');
+    form.addEventListener('submit', event => {
+        event.preventDefault();
+        const name = document.getElementById('contact-name').value;
+        status.textContent = `Thanks, ${name}! Your message has been sent.`;
+        form.reset();
+    });
+});
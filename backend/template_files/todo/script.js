@@ -0,0 +1,81 @@
+const STORAGE_KEY = 'todos';
+
+let todos = JSON.parse(localStorage.getItem(STORAGE_KEY) || '[]');
+let filter = 'all';
+
+const form = document.getElementById('todo-form');
+const input = document.getElementById('todo-input');
+const list = document.getElementById('todo-list');
+const count = document.getElementById('todo-count');
+
+function save() {
+    localStorage.setItem(STORAGE_KEY, JSON.stringify(todos));
+}
+
+function visibleTodos() {
+    if (filter === 'active') return todos.filter(todo => !todo.completed);
+    if (filter === 'completed') return todos.filter(todo => todo.completed);
+    return todos;
+}
+
+function render() {
+    list.innerHTML = '';
+    visibleTodos().forEach(todo => {
+        const item = document.createElement('li');
+        item.className = 'todo-item' + (todo.completed ? ' completed' : '');
+
+        const checkbox = document.createElement('input');
+        checkbox.type = 'checkbox';
+        checkbox.checked = todo.completed;
+        checkbox.addEventListener('change', () => {
+            todo.completed = checkbox.checked;
+            save();
+            render();
+        });
+
+        const text = document.createElement('span');
+        text.textContent = todo.text;
+
+        const remove = document.createElement('button');
+        remove.className = 'delete';
+        remove.textContent = '✕';
+        remove.addEventListener('click', () => {
+            todos = todos.filter(other => other.id !== todo.id);
+            save();
+            render();
+        });
+
+        item.append(checkbox, text, remove);
+        list.appendChild(item);
+    });
+
+    const left = todos.filter(todo => !todo.completed).length;
+    count.textContent = `${left} item${left === 1 ? '' : 's'} left`;
+}
+
+form.addEventListener('submit', event => {
+    event.preventDefault();
+    const text = input.value.trim();
+    if (!text) return;
+    todos.push({ id: Date.now(), text, completed: false });
+    input.value = '';
+    save();
+    render();
+});
+
+document.querySelectorAll('.filter').forEach(button => {
+    button.addEventListener('click', () => {
+        document.querySelector('.filter.active').classList.remove('active');
+        button.classList.add('active');
+        filter = button.dataset.filter;
+        render();
+    });
+});
+
+document.getElementById('clear-completed').addEventListener('click', () => {
+    todos = todos.filter(todo => !todo.completed);
+    save();
+    render();
+});
+
+render();
@@ -0,0 +1,207 @@
+import os
+import re
+import gzip
+import html
+import json
+import pathlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+TEMPLATES_ROOT = pathlib.Path(
+    os.getenv("TEMPLATES_ROOT", pathlib.Path(__file__).parent / "template_files")
+)
+
+_WORDS = re.compile(r"[a-z0-9]+")
+_PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+# "a landing page called Acme Cloud" -> "Acme Cloud"
+_NAMED = re.compile(r"\b(?:called|named|titled)\s+[\"'“]?([^\"'”.,!?\n]{1,60})", re.IGNORECASE)
+_GZIP = re.compile(r"(?:^|,)\s*(?:gzip|\*)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*(?=,|$)")
+
+# Words that say nothing about which app is wanted
+FILLER_WORDS = frozenset(
+    "a an the my me for with and of to in simple basic small clean modern nice "
+    "beautiful responsive app application website site web page build create make "
+    "generate write please i want need".split()
+)
+
+
+@dataclass(frozen=True)
+class Archetype:
+    """A project that is common enough to be served from a ready-made template"""
+
+    name: str
+    title: str
+    description: str
+    keywords: FrozenSet[str]
+
+
+ARCHETYPES: List[Archetype] = [
+    Archetype(
+        "todo",
+        "Todo List",
+        "Keep track of everything you need to get done.",
+        frozenset({"todo", "todos", "task", "tasks", "checklist", "reminders", "list", "tracker"}),
+    ),
+    Archetype(
+        "landing",
+        "Launchpad",
+        "The simplest way to launch your next big idea.",
+        frozenset({"landing", "saas", "startup", "product", "marketing", "homepage", "launch"}),
+    ),
+    Archetype(
+        "portfolio",
+        "Portfolio",
+        "I design and build things for the web. Here is some of my recent work.",
+        frozenset({"portfolio", "resume", "cv", "personal", "showcase", "developer", "designer"}),
+    ),
+    Archetype(
+        "dashboard",
+        "Dashboard",
+        "Key metrics for your business at a glance.",
+        frozenset({"dashboard", "analytics", "admin", "metrics", "charts", "stats", "kpi", "reports"}),
+    ),
+]
+
+# Served when no archetype matches; its title is the prompt itself
+DEFAULT_TEMPLATE = "default"
+DEFAULT_MESSAGE = "Simple code generated successfully"
+
+
+def prompt_words(prompt: str) -> List[str]:
+    words = _WORDS.findall(prompt.lower().replace("to-do", "todo").replace("to do", "todo"))
+    return [word for word in words if word not in FILLER_WORDS]
+
+
+def match_archetype(prompt: str, strict: bool = False) -> Optional[Archetype]:
+    """The archetype whose keywords the prompt mentions most, if any
+
+    With ``strict`` every meaningful word of the prompt must be one of the
+    archetype's keywords, so only prompts that ask for nothing beyond the
+    archetype itself ("a simple todo app") match.
+    """
+    # The name given to the project says nothing about what kind it is
+    words = prompt_words(_NAMED.sub("", prompt))
+    best, best_hits = None, 0
+    for archetype in ARCHETYPES:
+        hits = sum(1 for word in words if word in archetype.keywords)
+        if hits > best_hits:
+            best, best_hits = archetype, hits
+    if best is not None and strict and best_hits < len(words):
+        return None
+    return best
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    for match in _GZIP.finditer((accept_encoding or "").lower()):
+        quality = match.group(1)
+        try:
+            if quality is None or float(quality) > 0:
+                return True
+        except ValueError:
+            continue
+    return False
+
+
+class RenderedTemplate(NamedTuple):
+    template: str
+    body: bytes  # the JSON response body
+    gzipped: bytes
+
+
+class TemplateCache:
+    """Pre-rendered, pre-compressed responses for the project archetypes.
+
+    Template files are read once; each (template, title, message) is rendered into
+    a complete JSON response body and gzipped the first time it is needed and
+    then served from a bounded LRU, so repeated prompts cost a dictionary
+    lookup. The default title of every archetype is rendered up front.
+    """
+
+    def __init__(self):
+        self.max_entries = int(os.getenv("TEMPLATE_CACHE_MAX_ENTRIES", "256"))
+        self.hits = 0
+        self.misses = 0
+
+        self._templates: Optional[Dict[str, Dict[str, str]]] = None
+        self._rendered: "OrderedDict[Tuple[str, str, str], RenderedTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, str]]:
+        if self._templates is None:
+            templates = {}
+            for directory in sorted(TEMPLATES_ROOT.iterdir()):
+                if directory.is_dir():
+                    templates[directory.name] = {
+                        file.name: file.read_text(encoding="utf-8")
+                        for file in sorted(directory.iterdir())
+                        if file.is_file()
+                    }
+            self._templates = templates
+        return self._templates
+
+    def warm(self):
+        """Render every archetype under its default title"""
+        for archetype in ARCHETYPES:
+            self.get(archetype.name, archetype.title, archetype.description)
+
+    def _render(self, template: str, title: str, description: str, message: str) -> RenderedTemplate:
+        values = {"title": html.escape(title), "description": html.escape(description)}
+        files = {
+            path: _PLACEHOLDER.sub(lambda m: values.get(m.group(1), m.group(0)), content)
+            for path, content in self._load()[template].items()
+        }
+        body = json.dumps(
+            {
+                "success": True,
+                "message": message,
+                "files": files,
+                "error": None,
+            }
+        ).encode("utf-8")
+        # Compressed once per render, so spend the CPU on the best ratio
+        return RenderedTemplate(template, body, gzip.compress(body, compresslevel=9, mtime=0))
+
+    def get(
+        self, template: str, title: str, description: str = "", message: str = DEFAULT_MESSAGE
+    ) -> RenderedTemplate:
+        key = (template, title, message)
+        with self._lock:
+            rendered = self._rendered.get(key)
+            if rendered is not None:
+                self._rendered.move_to_end(key)
+                self.hits += 1
+                return rendered
+            self.misses += 1
+
+        rendered = self._render(template, title, description, message)
+        with self._lock:
+            self._rendered[key] = rendered
+            self._rendered.move_to_end(key)
+            while len(self._rendered) > self.max_entries:
+                self._rendered.popitem(last=False)
+        return rendered
+
+    def for_prompt(
+        self, prompt: str, strict: bool = False, message: str = DEFAULT_MESSAGE
+    ) -> Optional[RenderedTemplate]:
+        """The response for the prompt's archetype, or the default template
+
+        With ``strict`` only prompts that plainly ask for an archetype are
+        served (see ``match_archetype``); anything else returns None.
+        """
+        archetype = match_archetype(prompt, strict=strict)
+        if archetype is None:
+            if strict:
+                return None
+            return self.get(DEFAULT_TEMPLATE, prompt.strip(), message=message)
+        named = _NAMED.search(prompt)
+        title = named.group(1).strip() if named else archetype.title
+        return self.get(archetype.name, title, archetype.description, message)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._rendered)}
+
+
+template_cache = TemplateCache()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Tests for file manifests and the streamed ZIP export
+"""
+
+import sys
+import os
+import io
+import zipfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from archive import build_manifest, etag_matches, manifest_etag, stream_zip, workspace_files
+
+
+def test_manifest_lists_existing_files(tmp_path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "styles.css").write_text("body {}")
+    (tmp_path / "index.html").write_text("<html></html>")
+
+    manifest = build_manifest(tmp_path, ["./index.html", "css/styles.css", "missing.js"])
+
+    assert [entry.path for entry in manifest] == ["css/styles.css", "index.html"]
+    assert manifest[1].size == 13
+    assert workspace_files(tmp_path) == ["css/styles.css", "index.html"]
+
+
+def test_zip_round_trips_and_etag_tracks_content(tmp_path):
+    (tmp_path / "index.html").write_text("<html>" + "x" * 200_000 + "</html>")
+    (tmp_path / "app.js").write_text("console.log('hi')")
+    manifest = build_manifest(tmp_path, workspace_files(tmp_path))
+
+    data = b"".join(stream_zip(tmp_path, manifest))
+    archive = zipfile.ZipFile(io.BytesIO(data))
+
+    assert archive.testzip() is None
+    assert archive.read("app.js") == b"console.log('hi')"
+    assert len(data) < 200_000
+
+    etag = manifest_etag(manifest)
+    assert etag_matches(etag, etag) and etag_matches(f'W/{etag}, "other"', etag)
+    (tmp_path / "app.js").write_text("console.log('changed')")
+    assert manifest_etag(build_manifest(tmp_path, workspace_files(tmp_path))) != etag
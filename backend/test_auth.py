@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Tests for token verification order and the verified-token cache
+"""
+
+import sys
+import os
+import time
+import asyncio
+
+import jwt
+import httpx
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import auth
+from auth import TokenCache, auth_service, get_current_user, logout_user, token_cache
+
+
+def _credentials(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def _supabase_token(exp: float) -> str:
+    return jwt.encode({"sub": "user-1", "exp": int(exp)}, "supabase-secret", algorithm="HS256")
+
+
+def test_backend_token_skips_supabase(monkeypatch):
+    """Backend tokens are verified locally before any Supabase call"""
+
+    async def fail(token):
+        raise AssertionError("Supabase should not be called for backend tokens")
+
+    monkeypatch.setattr(auth_service, "verify_supabase_token", fail)
+    token = auth_service.generate_backend_token({"user_id": "user-1", "email": "a@b.c"})
+
+    user = asyncio.run(get_current_user(_credentials(token)))
+    assert user["user_id"] == "user-1"
+
+
+def test_supabase_token_is_cached(monkeypatch):
+    """A verified Supabase token is served from the cache until invalidated"""
+    calls = []
+
+    async def verify(token):
+        calls.append(token)
+        return {"user_id": "user-1", "email": "a@b.c"}
+
+    async def profile(user_data):
+        return {"id": user_data["user_id"]}
+
+    monkeypatch.setattr(auth_service, "verify_supabase_token", verify)
+    monkeypatch.setattr(auth_service, "get_or_create_user_profile", profile)
+    token_cache.clear()
+    token = _supabase_token(time.time() + 3600)
+
+    first = asyncio.run(get_current_user(_credentials(token)))
+    second = asyncio.run(get_current_user(_credentials(token)))
+    assert first == second
+    assert len(calls) == 1
+
+    token_cache.invalidate(token)
+    asyncio.run(get_current_user(_credentials(token)))
+    assert len(calls) == 2
+
+
+def test_invalid_token_is_rejected(monkeypatch):
+    async def reject(token):
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    monkeypatch.setattr(auth_service, "verify_supabase_token", reject)
+    token_cache.clear()
+
+    try:
+        asyncio.run(get_current_user(_credentials("not-a-token")))
+    except HTTPException as e:
+        assert e.status_code == 401
+    else:
+        raise AssertionError("Invalid token was accepted")
+
+
+def test_logout_drops_every_cached_token_of_the_user():
+    token_cache.clear()
+    first = _supabase_token(time.time() + 3600)
+    second = _supabase_token(time.time() + 1800)
+    other = jwt.encode({"sub": "user-2", "exp": int(time.time() + 3600)}, "x", algorithm="HS256")
+    token_cache.put(first, {"user_id": "user-1"})
+    token_cache.put(second, {"user_id": "user-1"})
+    token_cache.put(other, {"user_id": "user-2"})
+
+    # A backend token identifies the user without a cache entry of its own
+    logout_user(auth_service.generate_backend_token({"user_id": "user-1", "email": "a@b.c"}))
+
+    assert token_cache.get(first) is None
+    assert token_cache.get(second) is None
+    assert token_cache.get(other) == {"user_id": "user-2"}
+    token_cache.clear()
+
+
+def test_cache_expiry_is_capped_by_token_exp():
+    cache = TokenCache()
+    cache.ttl = 3600
+
+    expired = _supabase_token(time.time() - 1)
+    cache.put(expired, {"user_id": "user-1"})
+    assert cache.get(expired) is None
+
+    valid = _supabase_token(time.time() + 60)
+    cache.put(valid, {"user_id": "user-1"})
+    assert cache.get(valid) == {"user_id": "user-1"}
+
+    cache.invalidate_user("user-1")
+    assert cache.get(valid) is None
+
+
+def test_cache_is_bounded():
+    cache = TokenCache()
+    cache.max_entries = 2
+    for i in range(3):
+        cache.put(f"token-{i}", {"user_id": str(i)})
+
+    assert cache.get("token-0") is None
+    assert cache.get("token-2") == {"user_id": "2"}
+
+
+def _google_stub(calls):
+    """Stub Google endpoints: tokeninfo and userinfo for a single valid token"""
+
+    def handler(request):
+        calls.append(request.url.path)
+        if request.url.params.get("access_token") != "good-token":
+            return httpx.Response(400, json={"error": "invalid_token"})
+        if request.url.path.endswith("/tokeninfo"):
+            return httpx.Response(200, json={"audience": "client-id", "expires_in": 3600})
+        return httpx.Response(200, json={"id": "42", "email": "a@b.c"})
+
+    return httpx.MockTransport(handler)
+
+
+def test_google_token_verified_and_cached(monkeypatch):
+    monkeypatch.setenv("GOOGLE_CLIENT_ID", "client-id")
+    calls = []
+    google = auth.GoogleOAuth(transport=_google_stub(calls))
+
+    async def verify_twice():
+        first = await google.verify_google_token("good-token")
+        second = await google.verify_google_token("good-token")
+        await google.aclose()
+        return first, second
+
+    first, second = asyncio.run(verify_twice())
+    assert first == second == {"id": "42", "email": "a@b.c"}
+    assert sorted(calls) == ["/oauth2/v1/tokeninfo", "/oauth2/v1/userinfo"]
+
+
+def test_google_token_rejected(monkeypatch):
+    monkeypatch.setenv("GOOGLE_CLIENT_ID", "client-id")
+    google = auth.GoogleOAuth(transport=_google_stub([]))
+
+    async def verify():
+        try:
+            await google.verify_google_token("bad-token")
+        finally:
+            await google.aclose()
+
+    try:
+        asyncio.run(verify())
+    except HTTPException as e:
+        assert e.status_code == 401
+    else:
+        raise AssertionError("Invalid Google token was accepted")
+
+
+def test_google_cache_is_lru_and_drops_expired_entries(monkeypatch):
+    monkeypatch.setenv("GOOGLE_CLIENT_ID", "client-id")
+    calls = []
+    google = auth.GoogleOAuth(transport=_google_stub(calls))
+    google.cache_max_entries = 2
+    key = auth.hashlib.sha256(b"good-token").hexdigest()
+
+    async def verify():
+        return await google.verify_google_token("good-token")
+
+    async def scenario():
+        await verify()
+        google._cache["other"] = (time.time() + 60, {"id": "other"})
+        await verify()  # a hit moves the entry to the most recent end
+        assert list(google._cache) == ["other", key]
+
+        google._cache[key] = (time.time() - 1, {"id": "stale"})
+        google._cache.move_to_end("other")
+        assert await verify() == {"id": "42", "email": "a@b.c"}
+        await google.aclose()
+
+    asyncio.run(scenario())
+    assert len(calls) == 4
+    assert list(google._cache) == ["other", key]
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded coder step context
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agent.context import ContextIndex, extract_symbols
+
+
+def test_symbols_are_extracted():
+    assert extract_symbols("app.js", "export function addTodo(text) {}\nconst render = (list) => {}\n") == [
+        "addTodo(text)", "render",
+    ]
+    assert extract_symbols("index.html", '<main id="app"><script src="app.js"></script>') == ["app", "app.js"]
+
+
+def test_context_includes_dependencies_and_summarizes_the_rest(tmp_path):
+    (tmp_path / "index.html").write_text('<div id="app"></div>')
+    (tmp_path / "styles.css").write_text("body { margin: 0 }\n")
+    (tmp_path / "app.js").write_text("function start() {}\n")
+
+    context = ContextIndex(tmp_path).build_step_context("styles.css", ["./index.html"], 1000)
+
+    assert "body { margin: 0 }" in context
+    assert '--- index.html ---\n<div id="app"></div>' in context
+    assert "function start() {}" not in context
+    assert "- app.js (20 bytes, 2 lines): start()" in context
+
+
+def test_context_respects_the_token_budget(tmp_path):
+    (tmp_path / "big.js").write_text("function big() {}\n" + "// filler\n" * 1000)
+
+    context = ContextIndex(tmp_path).build_step_context("main.js", ["big.js"], 100)
+
+    assert "(new file)" in context
+    assert "filler" not in context
+    assert "- big.js" in context
+
+
+def test_context_counts_the_files_left_out(tmp_path):
+    for idx in range(5):
+        (tmp_path / f"module{idx}.js").write_text(f"function run{idx}() {{}}\n")
+
+    # A new target file has no summary, so it must not reduce the count
+    context = ContextIndex(tmp_path).build_step_context("main.js", [], 20)
+
+    assert context.count("- module") == 2
+    assert "- ... 3 more files" in context
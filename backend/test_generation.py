@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Tests for the fair-share generation scheduler and cancellation
+"""
+
+import sys
+import os
+import time
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from generation import CancelToken, GenerationCancelled, GenerationExecutor, SingleFlight, request_key
+
+
+def test_flooding_user_does_not_starve_others(env):
+    env(GENERATION_MAX_CONCURRENCY=1, GENERATION_USER_MAX_CONCURRENCY=1)
+    executor = GenerationExecutor()
+    release = threading.Event()
+    order = []
+
+    def work(name):
+        release.wait(5)
+        order.append(name)
+
+    floods = [executor.submit(work, f"flood-{i}", user_id="flood") for i in range(5)]
+    normal = executor.submit(work, "normal", user_id="normal")
+
+    # flood-0 is running; the late user's request is next in line, not sixth
+    assert executor.position(floods[0]) is None
+    assert executor.position(normal) == 1
+    assert executor.position(floods[4]) == 5
+
+    floods[3].cancel()
+    release.set()
+    normal.result(5)
+    for future in floods[:3] + floods[4:]:
+        future.result(5)
+    assert order == ["flood-0", "normal", "flood-1", "flood-2", "flood-4"]
+    assert executor.stats()["active"] == 0
+
+
+def test_cancelled_requests_give_their_share_back(env):
+    env(GENERATION_MAX_CONCURRENCY=1, GENERATION_USER_MAX_CONCURRENCY=1)
+    executor = GenerationExecutor()
+    release = threading.Event()
+
+    running = executor.submit(release.wait, 5, user_id="a")
+    withdrawn = [executor.submit(release.wait, 5, user_id="a") for _ in range(3)]
+    for future in withdrawn:
+        future.cancel()
+    kept = executor.submit(release.wait, 5, user_id="a")
+    later = [executor.submit(release.wait, 5, user_id="b") for _ in range(2)]
+
+    # a's cancelled requests don't push its next one behind all of b's
+    assert [executor.position(future) for future in (later[0], kept, later[1])] == [1, 2, 3]
+    release.set()
+    for future in (running, kept, *later):
+        future.result(5)
+    # Users with nothing queued or running leave no scheduling state behind
+    assert executor._last_finish == {}
+
+
+def test_running_generations_do_not_fill_the_queue(env):
+    env(GENERATION_MAX_CONCURRENCY=2, GENERATION_MAX_QUEUE=1, GENERATION_USER_RATE_PER_MINUTE=0)
+    executor = GenerationExecutor()
+    release = threading.Event()
+
+    async def scenario():
+        running = [
+            asyncio.ensure_future(executor.run(release.wait, 5, user_id=f"user-{i}"))
+            for i in range(2)
+        ]
+        await asyncio.sleep(0.1)
+        # Both calls are running, so the queue is still empty
+        queued = asyncio.ensure_future(executor.run(release.wait, 5, user_id="user-2"))
+        await asyncio.sleep(0.1)
+        with pytest.raises(HTTPException) as rejected:
+            await executor.run(release.wait, 5, user_id="user-3")
+        release.set()
+        return await asyncio.gather(*running, queued), rejected.value
+
+    results, rejected = asyncio.run(scenario())
+    assert results == [True, True, True]
+    assert rejected.status_code == 429 and "queued" in rejected.detail
+
+
+def test_rate_limit_rejects_with_retry_after(env):
+    env(GENERATION_USER_RATE_PER_MINUTE=6, GENERATION_USER_BURST=2)
+    executor = GenerationExecutor()
+
+    executor.admit("user-a")
+    executor.admit("user-a")
+    with pytest.raises(HTTPException) as rejected:
+        executor.admit("user-a")
+    executor.admit("user-b")
+
+    assert rejected.value.status_code == 429
+    assert 0 < int(rejected.value.headers["Retry-After"]) <= 10
+    assert executor.rate_limited == 1
+
+
+def test_cancel_token_deadline_starts_with_the_run():
+    cancel = CancelToken(timeout=0.05)
+    time.sleep(0.1)
+    cancel.check()  # not started yet
+
+    cancel.start()
+    time.sleep(0.1)
+    with pytest.raises(GenerationCancelled, match="deadline"):
+        cancel.check()
+
+
+def test_only_the_same_users_identical_requests_share_a_run():
+    key = request_key("Build a  Todo app", "web", "react", "alice")
+
+    assert key == request_key("build a todo app", "web", "react", "alice")
+    assert key != request_key("build a todo app", "web", "react", "bob")
+
+
+def test_single_flight_cancels_work_once_every_caller_left():
+    async def scenario():
+        flight = SingleFlight()
+        tokens = []
+
+        async def work(cancel):
+            tokens.append(cancel)
+            await asyncio.sleep(10)
+
+        first = asyncio.ensure_future(flight.do("key", work))
+        second = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.sleep(0)
+        assert not tokens[0].cancelled  # the second caller still wants the result
+
+        second.cancel()
+        await asyncio.gather(first, second, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert tokens[0].cancelled and len(tokens) == 1
+        assert flight.stats() == {"in_flight": 0, "coalesced": 1, "abandoned": 1}
+
+    asyncio.run(scenario())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for the durable job queue shared by the API and worker processes
+"""
+
+import sys
+import os
+import time
+import uuid
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from job_queue import Job, JobQueue, JobStatus
+
+
+def _queue(tmp_path) -> JobQueue:
+    return JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+def _add(queue: JobQueue, user_id: str, key: str = None) -> Job:
+    job = Job(id=uuid.uuid4().hex, user_id=user_id, user_prompt="app", created_at=datetime.utcnow())
+    return queue.add(job, key=key)
+
+
+def test_claims_are_fair_across_users_and_capped(tmp_path, env):
+    env(GENERATION_USER_MAX_CONCURRENCY=2)
+    queue = _queue(tmp_path)
+    flood = [_add(queue, "flood") for _ in range(3)]
+    other = _add(queue, "other")
+
+    claimed = [queue.claim("worker")[0].id for _ in range(3)]
+
+    # The other user goes before the flood's second job; the flood's third waits for a slot
+    assert claimed == [flood[0].id, other.id, flood[1].id]
+    assert queue.claim("worker") is None
+    assert queue.position(flood[2].id) == 1
+
+    assert queue.finish("worker", flood[0].id, JobStatus.SUCCEEDED)
+    assert queue.claim("worker")[0].id == flood[2].id
+
+
+def test_position_follows_claim_order(tmp_path, env):
+    env(GENERATION_USER_MAX_CONCURRENCY=3)
+    queue = _queue(tmp_path)
+    flood = [_add(queue, "flood") for _ in range(3)]
+    assert queue.claim("worker")[0].id == flood[0].id
+    other = _add(queue, "other")
+
+    # The later run of a user with nothing running is claimed first
+    assert [queue.position(job.id) for job in (other, flood[1], flood[2])] == [1, 2, 3]
+    assert queue.position(flood[0].id) is None
+    assert [queue.claim("worker")[0].id for _ in range(3)] == [other.id, flood[1].id, flood[2].id]
+
+
+def test_runs_of_lost_workers_are_resumed_elsewhere(tmp_path, env):
+    env(JOB_LEASE_SECONDS=0.1, JOB_MAX_ATTEMPTS=2)
+    queue = _queue(tmp_path)
+    job = _add(queue, "user")
+
+    assert queue.claim("lost")[1] is False
+    time.sleep(0.2)
+    assert queue.recover() == 1
+
+    claimed, resume = queue.claim("healthy")
+    assert claimed.id == job.id and resume is True
+    # The lost worker can no longer renew or finish the run
+    assert queue.heartbeat("lost", [job.id]) == {job.id}
+    assert not queue.finish("lost", job.id, JobStatus.SUCCEEDED)
+
+    time.sleep(0.2)
+    queue.recover()
+    assert queue.get(job.id).status == JobStatus.FAILED
+    assert queue.events_since(job.id, 2)[-1]["status"] == JobStatus.FAILED
+
+
+def test_shared_run_stops_once_every_caller_cancelled(tmp_path):
+    queue = _queue(tmp_path)
+    leader = _add(queue, "user", key="same prompt")
+    follower = _add(queue, "user", key="same prompt")
+    assert follower.coalesced_with == leader.id
+
+    assert not queue.cancel(leader.id)
+    assert queue.cancel(follower.id)
+    queue.stop(leader.id)
+
+    assert queue.get(leader.id).status == JobStatus.CANCELLED
+    assert queue.get(follower.id).status == JobStatus.CANCELLED
+    assert queue.claim("worker") is None
+
+    assert queue.resume(leader.id, follower.id)
+    claimed, resume = queue.claim("worker")
+    assert claimed.id == leader.id and resume is True
+    assert queue.heartbeat("worker", [leader.id]) == set()
+
+    # A running run is stopped by its worker, which sees the request on its next heartbeat
+    queue.stop(leader.id)
+    assert queue.heartbeat("worker", [leader.id]) == {leader.id}
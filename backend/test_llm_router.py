@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Tests for deadlines, retries, hedging and fallbacks in the LLM router
+"""
+
+import sys
+import os
+import time
+import random
+import threading
+from typing import Any, List
+
+import pytest
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agent.llm_router import LLMDeadlineExceeded, LLMRouter
+from agent.metrics import LLM_ABANDONED
+from generation import CancelToken, GenerationCancelled
+
+
+class ScriptedModel(BaseChatModel):
+    """Answers with its label after the next scripted delay; a negative delay fails"""
+
+    label: str
+    delays: List[float]
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    @property
+    def model_name(self) -> str:
+        return self.label
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        delay = self.delays[min(self.calls, len(self.delays) - 1)]
+        self.calls += 1
+        time.sleep(abs(delay))
+        if delay < 0:
+            raise ConnectionError(f"{self.label} failed")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.label))])
+
+
+class CancelHandler(BaseCallbackHandler):
+    """Carries a run's cancel token, like the graph's CancellationHandler"""
+
+    def __init__(self):
+        self.cancel = CancelToken()
+
+
+def _invoke(router: LLMRouter, node: str) -> str:
+    # LangGraph passes the node in the checkpoint namespace of nested calls
+    config = {"metadata": {"langgraph_checkpoint_ns": f"{node}:0000"}}
+    return router.invoke("hello", config).content
+
+
+def test_cheap_nodes_fall_back_after_failures():
+    primary = ScriptedModel(label="primary", delays=[-0.01])
+    fallback = ScriptedModel(label="fallback", delays=[0.01])
+    router = LLMRouter(
+        primary=primary, fallback=fallback, fallback_nodes=frozenset({"planner"}),
+        retries=2, backoff_base=0.01,
+    )
+
+    assert _invoke(router, "planner") == "fallback"
+    assert (primary.calls, fallback.calls) == (1, 1)
+
+    # Other nodes retry the primary only
+    with pytest.raises(ConnectionError):
+        _invoke(router, "coder")
+    assert (primary.calls, fallback.calls) == (4, 1)
+
+
+def test_slow_attempt_is_hedged_at_p95():
+    primary = ScriptedModel(label="primary", delays=[2.0, 0.01])
+    router = LLMRouter(primary=primary, hedge_min_samples=5)
+    for _ in range(10):
+        router.observe(primary, "coder", 0.05)
+
+    started = time.monotonic()
+    assert _invoke(router, "coder") == "primary"
+    assert time.monotonic() - started < 1.0
+    assert primary.calls == 2
+
+
+def test_node_deadline_bounds_all_attempts():
+    primary = ScriptedModel(label="primary", delays=[1.0])
+    router = LLMRouter(primary=primary, node_deadlines={"architect": 0.2}, retries=3)
+
+    started = time.monotonic()
+    with pytest.raises(LLMDeadlineExceeded):
+        _invoke(router, "architect")
+    assert time.monotonic() - started < 0.5
+    assert primary.calls == 1
+
+
+def test_abandoned_attempts_hold_their_nodes_slot():
+    primary = ScriptedModel(label="primary", delays=[0.5, 0.01])
+    router = LLMRouter(
+        primary=primary, node_deadlines={"coder": 0.2}, node_concurrency={"coder": 1}, retries=0,
+    )
+    abandoned = LLM_ABANDONED.value(node="coder")
+
+    with pytest.raises(LLMDeadlineExceeded):
+        _invoke(router, "coder")
+    assert LLM_ABANDONED.value(node="coder") == abandoned + 1
+    # The abandoned request still runs, so the node has no free slot
+    with pytest.raises(LLMDeadlineExceeded):
+        _invoke(router, "coder")
+    assert primary.calls == 1
+
+    time.sleep(0.4)
+    assert _invoke(router, "coder") == "primary"
+
+
+def test_cancellation_wakes_the_retry_backoff(monkeypatch):
+    monkeypatch.setattr(random, "uniform", lambda low, high: high)
+    primary = ScriptedModel(label="primary", delays=[-0.01])
+    router = LLMRouter(primary=primary, retries=1, backoff_base=10, backoff_max=10)
+    handler = CancelHandler()
+    config = {"metadata": {"langgraph_checkpoint_ns": "coder:0000"}, "callbacks": [handler]}
+    threading.Timer(0.2, handler.cancel.cancel, args=("cancelled by user",)).start()
+
+    started = time.monotonic()
+    with pytest.raises(GenerationCancelled):
+        router.invoke("hello", config)
+    assert time.monotonic() - started < 1.0
+    assert primary.calls == 1
+
+
+def test_cancellation_stops_waiting_for_a_pending_answer():
+    primary = ScriptedModel(label="primary", delays=[1.0])
+    router = LLMRouter(primary=primary, node_deadlines={"coder": 30})
+    handler = CancelHandler()
+    config = {"metadata": {"langgraph_checkpoint_ns": "coder:0000"}, "callbacks": [handler]}
+    threading.Timer(0.2, handler.cancel.cancel, args=("cancelled by user",)).start()
+
+    started = time.monotonic()
+    with pytest.raises(GenerationCancelled):
+        router.invoke("hello", config)
+    assert time.monotonic() - started < 0.6
+    assert primary.calls == 1
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for the semantic plan cache
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agent.plan_cache import SemanticPlanCache
+from agent.states import File, ImplementationTask, Plan, TaskPlan
+
+
+def _plans(name: str):
+    plan = Plan(
+        name=name, description=f"A {name}", techstack="html, css, javascript",
+        features=["add items"], files=[File(path="index.html", purpose="page")],
+    )
+    task_plan = TaskPlan(implementation_steps=[
+        ImplementationTask(filepath="index.html", task_description=f"Build the {name}"),
+    ])
+    return plan, task_plan
+
+
+def _cache(env, **values) -> SemanticPlanCache:
+    env(PLAN_CACHE_ENABLED="true", **values)
+    return SemanticPlanCache()
+
+
+def test_cache_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("PLAN_CACHE_ENABLED", raising=False)
+    cache = SemanticPlanCache()
+    cache.put("build a todo app", "alice", *_plans("Todo App"))
+    assert cache.lookup("build a todo app", "alice") is None
+
+
+def test_reworded_prompts_reuse_and_adapt_plans(env):
+    cache = _cache(env)
+    cache.put("build a todo list with dark theme", "alice", *_plans("Todo App"))
+    cache.put("weather dashboard", "alice", *_plans("Weather"))
+
+    same = cache.lookup("Please create a simple To-Do list application with a dark theme", "alice")
+    assert same.similarity == 1.0
+    assert same.task_plan.implementation_steps[0].task_description == "Build the Todo App"
+    assert same.task_plan.plan == same.plan
+
+    adapted = cache.lookup("Build a todo list with dark themes and filters", "alice")
+    assert adapted.similarity == 0.8 and adapted.plan.name == "Todo App"
+    assert "dark themes and filters" in adapted.task_plan.implementation_steps[0].task_description
+    # Adapting a hit never changes the cached plans
+    assert cache.lookup("todo list, dark theme", "alice").plan.features == ["add items"]
+
+    assert cache.lookup("recipe finder with search", "alice") is None
+    assert cache.stats() == {"enabled": True, "hits": 3, "adapted": 1, "misses": 1, "entries": 2}
+
+
+def test_plans_are_not_shared_between_users_or_names(env):
+    cache = _cache(env)
+    cache.put("portfolio for John Smith", "alice", *_plans("John Smith Portfolio"))
+    cache.put("todo app", "alice", *_plans("Todo App"))
+
+    assert cache.lookup("portfolio for John Smith", "bob") is None
+    assert cache.lookup("portfolio for Jane Smith", "alice") is None
+    assert cache.lookup("todo app with login", "alice") is None
+    # Runs without a user are never cached
+    assert cache.lookup("todo app", None) is None
+    cache.put("weather dashboard", None, *_plans("Weather"))
+    assert cache.stats()["entries"] == 2
+
+
+def test_least_recently_used_plans_are_evicted(env):
+    cache = _cache(env, PLAN_CACHE_MAX_ENTRIES=2, PLAN_CACHE_THRESHOLD=0.9)
+    cache.put("todo list", "alice", *_plans("Todo"))
+    cache.put("portfolio", "alice", *_plans("Portfolio"))
+    assert cache.lookup("todo lists", "alice") is not None
+    cache.put("weather dashboard", "alice", *_plans("Weather"))
+
+    assert cache.lookup("portfolio", "alice") is None
+    assert cache.lookup("todo list", "alice").plan.name == "Todo"
+    assert cache.lookup("weather dashboard", "alice").plan.name == "Weather"
+    assert ("alice", "portfolio") not in cache._index
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Tests for the skeleton files written from the plan while the architect runs
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agent.context import extract_symbols
+from agent.scaffold import escapes_workspace, normalize_path, skeletons
+from agent.states import File, Plan
+
+
+def _plan(*paths: str) -> Plan:
+    return Plan(
+        name="Todo <App>",
+        description="Track tasks */ quickly",
+        techstack="html, css, javascript",
+        features=["add tasks", "filter -- by status"],
+        files=[File(path=path, purpose=f"{path} of the app") for path in paths],
+    )
+
+
+def test_static_site_skeletons_link_each_other():
+    files = skeletons(_plan("pages/index.html", "css/styles.css", "js/app.js", "README.md"))
+
+    assert sorted(files) == ["css/styles.css", "js/app.js", "pages/index.html"]
+    page = files["pages/index.html"]
+    assert extract_symbols("pages/index.html", page) == ["../css/styles.css", "../js/app.js"]
+    assert "<title>Todo &lt;App&gt;</title>" in page
+    assert "<!-- filter - - by status -->" in page
+    # Feature and plan text can't end a comment early
+    assert "/* Todo <App>: Track tasks * / quickly */" in files["css/styles.css"]
+
+
+def test_projects_with_a_build_setup_are_not_scaffolded():
+    assert skeletons(_plan("package.json", "index.html", "src/App.jsx")) == {}
+    assert skeletons(_plan()) == {}
+
+
+def test_planned_paths_normalize_like_step_paths():
+    files = skeletons(_plan("./index.html", "css\\styles.css", "/js/app.js"))
+
+    assert sorted(files) == ["css/styles.css", "index.html", "js/app.js"]
+    assert {normalize_path(path) for path in ("index.html", "./css/styles.css", "js\\app.js")} == set(files)
+
+
+def test_paths_outside_the_workspace_are_not_scaffolded():
+    assert [escapes_workspace(path) for path in ("../x.js", "js/../../x.js", ".", "/js/app.js")] == [
+        True, True, True, False,
+    ]
+    assert sorted(skeletons(_plan("index.html", "../evil.js", "js/app.js"))) == ["index.html", "js/app.js"]
@@ -5,6 +5,8 @@ Quick test script to verify backend startup and route registration
 
 import sys
 import os
+import json
+import subprocess
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
@@ -22,6 +24,49 @@ def test_imports():
         return False
 
 
+# Modules that must only be loaded once a generation or Supabase login needs them
+LAZY_MODULES = ["langchain_groq", "langgraph", "langchain", "supabase", "agent.graph"]
+
+
+def test_import_budget():
+    """Test that importing the app is fast and needs no LLM credentials"""
+    budget = float(os.getenv("IMPORT_TIME_BUDGET_SECONDS", "1.0"))
+    script = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        "import main\n"
+        "elapsed = time.perf_counter() - started\n"
+        f"print(json.dumps([elapsed, [m for m in {LAZY_MODULES!r} if m in sys.modules]]))\n"
+    )
+    env = {key: value for key, value in os.environ.items() if key != "GROQ_API_KEY"}
+    try:
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+        if result.returncode != 0:
+            print(f"❌ Import without GROQ_API_KEY failed: {result.stderr.strip()}")
+            return False
+
+        elapsed, loaded = json.loads(result.stdout.strip().splitlines()[-1])
+        if loaded:
+            print(f"❌ Heavy modules imported eagerly: {loaded}")
+            return False
+        if elapsed > budget:
+            print(f"❌ Importing main took {elapsed:.2f}s (budget {budget:.2f}s)")
+            return False
+
+        print(f"✅ main imported in {elapsed:.2f}s (budget {budget:.2f}s)")
+        return True
+    except Exception as e:
+        print(f"❌ Import budget test failed: {e}")
+        return False
+
+
 def test_routes():
     """Test that routes are registered correctly"""
     try:
@@ -30,8 +75,17 @@ def test_routes():
         routes = [route.path for route in app.routes]
         expected_routes = [
             "/api/generate",
+            "/metrics",
+            "/api/jobs",
+            "/api/jobs/{job_id}",
+            "/api/jobs/{job_id}/events",
+            "/api/jobs/{job_id}/resume",
+            "/api/jobs/{job_id}/edits",
+            "/api/jobs/{job_id}/archive",
+            "/api/jobs/{job_id}/files/{path:path}",
             "/api/auth/verify",
             "/api/auth/user",
+            "/api/auth/logout",
             "/api/auth/google",
         ]
 
@@ -74,6 +128,7 @@ if __name__ == "__main__":
 
     # Run tests
     all_tests_passed &= test_imports()
+    all_tests_passed &= test_import_budget()
     all_tests_passed &= test_routes()
     all_tests_passed &= test_auth_service()
 
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Tests for the project template fast path
+"""
+
+import sys
+import os
+import gzip
+import json
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from templates import TemplateCache, accepts_gzip, match_archetype
+
+
+def test_prompts_match_archetypes():
+    assert match_archetype("Build a simple To-Do app").name == "todo"
+    assert match_archetype("landing page for my SaaS called Acme Cloud").name == "landing"
+    assert match_archetype("an admin dashboard with charts").name == "dashboard"
+    assert match_archetype("a snake game") is None
+
+    # Strict matching only accepts prompts that ask for nothing else
+    assert match_archetype("my developer portfolio", strict=True).name == "portfolio"
+    assert match_archetype("a todo app with user accounts and sync", strict=True) is None
+
+
+def test_rendered_templates_are_cached_and_compressed():
+    cache = TemplateCache()
+
+    rendered = cache.for_prompt("a landing page called <Acme>")
+    body = json.loads(rendered.body)
+
+    assert rendered.template == "landing"
+    assert sorted(body["files"]) == ["index.html", "script.js", "styles.css"]
+    assert "&lt;Acme&gt;" in body["files"]["index.html"]
+    assert "{{" not in body["files"]["index.html"]
+    assert gzip.decompress(rendered.gzipped) == rendered.body
+    assert len(rendered.gzipped) < len(rendered.body)
+
+    assert cache.for_prompt("landing page named <Acme>") is rendered
+    assert cache.for_prompt("a snake game", strict=True) is None
+    assert cache.for_prompt("a snake game").template == "default"
+    assert cache.stats() == {"hits": 1, "misses": 2, "entries": 2}
+
+    assert accepts_gzip("gzip, deflate, br") and not accepts_gzip("br, gzip;q=0")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for the coder's file tools
+"""
+
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agent.blobs import BlobStore
+from agent.metrics import TOOL_BYTES_WRITTEN
+from agent.tools import edit_file, read_file, write_file
+from agent import workspaces
+
+
+def _config(root):
+    return {"configurable": {"workspace": str(root)}}
+
+
+def test_edit_file_replaces_a_unique_snippet(tmp_path):
+    config = _config(tmp_path)
+    write_file.invoke({"path": "styles.css", "content": "header { color: red }\nfooter { color: red }\n"}, config)
+    written = TOOL_BYTES_WRITTEN.value()
+
+    result = edit_file.invoke(
+        {"path": "styles.css", "old_text": "header { color: red }", "new_text": "header { color: blue }"},
+        config,
+    )
+
+    assert result.startswith("EDITED:")
+    # The metric counts the rewritten file, not the snippet
+    assert TOOL_BYTES_WRITTEN.value() - written == len("header { color: blue }\nfooter { color: red }\n")
+    assert read_file.invoke({"path": "styles.css"}, config) == "header { color: blue }\nfooter { color: red }\n"
+
+
+def test_edit_file_rejects_ambiguous_or_missing_snippets(tmp_path):
+    config = _config(tmp_path)
+    write_file.invoke({"path": "styles.css", "content": "a { color: red }\nb { color: red }\n"}, config)
+
+    ambiguous = edit_file.invoke({"path": "styles.css", "old_text": "color: red", "new_text": "color: blue"}, config)
+    missing = edit_file.invoke({"path": "app.js", "old_text": "x", "new_text": "y"}, config)
+
+    assert ambiguous.startswith("ERROR: old_text matches 2 times")
+    assert missing.startswith("ERROR: app.js does not exist")
+    assert read_file.invoke({"path": "styles.css"}, config) == "a { color: red }\nb { color: red }\n"
+
+
+def test_identical_files_share_one_blob_and_are_collected(tmp_path):
+    store = BlobStore()
+    store.root = tmp_path / "blobs"
+    store.gc_grace_seconds = 0
+    first, second = tmp_path / "job-1" / "styles.css", tmp_path / "job-2" / "styles.css"
+
+    store.write(first, b"body {}")
+    store.write(second, b"body {}")
+    assert os.stat(first).st_ino == os.stat(second).st_ino
+    assert store.dedup_hits == 1
+    # Rewriting unchanged content leaves no temporary link behind
+    store.write(first, b"body {}")
+    assert os.listdir(first.parent) == ["styles.css"]
+
+    # Snapshots are links; changing the copy replaces its link, not the shared blob
+    store.snapshot(tmp_path / "job-1", tmp_path / "job-3")
+    store.write(tmp_path / "job-3" / "styles.css", b"body { margin: 0 }")
+    assert first.read_bytes() == b"body {}"
+
+    first.unlink()
+    second.unlink()
+    assert store.collect_garbage() == 1
+    assert (tmp_path / "job-3" / "styles.css").read_bytes() == b"body { margin: 0 }"
+
+
+def test_only_idle_unreferenced_workspaces_are_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(workspaces, "WORKSPACES_ROOT", tmp_path)
+    old = time.time() - 7200
+    for job_id in ("idle", "busy", "kept"):
+        (tmp_path / job_id / "css").mkdir(parents=True)
+        (tmp_path / job_id / "css" / "styles.css").write_text("body {}")
+        for path in (tmp_path / job_id, tmp_path / job_id / "css", tmp_path / job_id / "css" / "styles.css"):
+            os.utime(path, (old, old))
+    # A long run still writing into a subdirectory; the workspace's own mtime stays old
+    os.utime(tmp_path / "busy" / "css" / "styles.css")
+
+    assert workspaces.evict_stale_workspaces(3600, keep={"kept"}) == 1
+    assert sorted(os.listdir(tmp_path)) == ["busy", "kept"]
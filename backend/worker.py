@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Generation worker: runs jobs from the durable job queue.
+
+Start the API with JOB_EXECUTION=worker and any number of workers on the
+same host (they share JOB_QUEUE_PATH, WORKSPACES_ROOT and CHECKPOINT_PATH):
+    python worker.py --processes 4 --threads 2
+
+Each process claims runs from the queue with --threads threads. On SIGINT or
+SIGTERM a worker stops claiming, interrupts its runs and hands them back to
+the queue, where another worker resumes them from their last checkpoint.
+"""
+
+import os
+import sys
+import uuid
+import signal
+import socket
+import logging
+import argparse
+import threading
+import multiprocessing
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from archive import FileEntry
+from generation import CancelToken, generation_executor
+from job_queue import Job, JobQueue, JobStatus
+from jobs import run_job
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Reason given to the runs a stopping worker interrupts
+SHUTDOWN_REASON = "worker shutting down"
+
+
+class Worker:
+    """Claims runs from a ``JobQueue`` and executes them on ``threads`` threads.
+
+    A heartbeat thread renews the leases of the worker's runs every third of
+    the lease, cancels runs that were cancelled through the API, and
+    re-queues runs abandoned by workers that died.
+    """
+
+    def __init__(self, queue: JobQueue, threads: int = 2, poll_interval: float = 0.5):
+        self.queue = queue
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.completed = 0
+
+        self._running: Dict[str, CancelToken] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def stop(self):
+        """Stop claiming runs and interrupt the running ones"""
+        self._stopping.set()
+        with self._lock:
+            for token in self._running.values():
+                token.cancel(SHUTDOWN_REASON)
+
+    def run(self):
+        """Work until ``stop`` is called and every run has ended (blocking)"""
+        stopped = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(stopped,), name="heartbeat", daemon=True)
+        loops = [
+            threading.Thread(target=self._loop, name=f"worker-{idx}")
+            for idx in range(self.threads)
+        ]
+        heartbeat.start()
+        for thread in loops:
+            thread.start()
+        logger.info(f"Worker {self.id} running {self.threads} threads on {self.queue.path}")
+        for thread in loops:
+            thread.join()
+        stopped.set()
+        heartbeat.join()
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            claimed = self.queue.claim(self.id)
+            if claimed is None:
+                self._stopping.wait(self.poll_interval)
+                continue
+            self.execute(*claimed)
+
+    def _heartbeat(self, stopped: threading.Event):
+        while not stopped.wait(self.queue.lease / 3):
+            try:
+                with self._lock:
+                    run_ids = list(self._running)
+                for run_id in self.queue.heartbeat(self.id, run_ids):
+                    with self._lock:
+                        token = self._running.get(run_id)
+                    if token is not None:
+                        token.cancel("cancelled by user")
+                recovered = self.queue.recover()
+                if recovered:
+                    logger.warning(f"Re-queued {recovered} runs of unresponsive workers")
+            except Exception as e:
+                logger.error(f"Worker heartbeat failed: {str(e)}")
+
+    def execute(self, job: Job, resume: bool = False):
+        """Run one claimed job and record its outcome in the queue"""
+        token = CancelToken(generation_executor.run_timeout)
+        with self._lock:
+            self._running[job.id] = token
+        if self._stopping.is_set():
+            token.cancel(SHUTDOWN_REASON)
+
+        def finish(status: str, files: List[FileEntry], error: Optional[str]) -> bool:
+            with self._lock:
+                self._running.pop(job.id, None)
+            if status == JobStatus.CANCELLED and token.reason == SHUTDOWN_REASON:
+                logger.info(f"Generation job {job.id} interrupted, handing it back to the queue")
+                self.queue.release(self.id, job.id)
+                return False
+            if not self.queue.finish(self.id, job.id, status, files, error):
+                logger.warning(f"Generation job {job.id} was taken over by another worker")
+                return False
+            self.completed += 1
+            return True
+
+        run_job(job, lambda event: self.queue.publish(job.id, event), token, finish, resume)
+
+
+def serve(threads: int, poll_interval: float = 0.5):
+    """Run one worker in this process until SIGINT or SIGTERM"""
+    logging.basicConfig(level=logging.INFO)
+    worker = Worker(JobQueue(), threads=threads, poll_interval=poll_interval)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: worker.stop())
+    worker.run()
+
+
+def start_processes(
+    processes: int, threads: int, poll_interval: float = 0.5, target=serve, args: Tuple = ()
+) -> List[multiprocessing.Process]:
+    """Start ``processes`` worker processes running ``target(threads, poll_interval, *args)``"""
+    started = []
+    for idx in range(processes):
+        process = multiprocessing.Process(
+            target=target, args=(threads, poll_interval, *args), name=f"arc-worker-{idx}"
+        )
+        process.start()
+        started.append(process)
+    return started
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="ARC-BUILDER generation worker")
+    parser.add_argument(
+        "--processes", type=int,
+        default=int(os.getenv("JOB_WORKER_PROCESSES", str(os.cpu_count() or 1))),
+        help="Worker processes to run (default: JOB_WORKER_PROCESSES or the CPU count)",
+    )
+    parser.add_argument(
+        "--threads", type=int, default=int(os.getenv("JOB_WORKER_THREADS", "2")),
+        help="Jobs each process runs at once (default: JOB_WORKER_THREADS or 2)",
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, default=float(os.getenv("JOB_WORKER_POLL_SECONDS", "0.5")),
+        help="Seconds an idle thread waits before checking the queue again",
+    )
+    args = parser.parse_args(argv)
+
+    if args.processes <= 1:
+        serve(args.threads, args.poll_interval)
+        return 0
+
+    processes = start_processes(args.processes, args.threads, args.poll_interval)
+
+    def forward(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, forward)
+    # Ctrl+C already reaches every process in the group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for process in processes:
+        process.join()
+    return 0 if all(process.exitcode == 0 for process in processes) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
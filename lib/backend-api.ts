@@ -13,6 +13,27 @@ interface GenerateResponse {
   error?: string
 }
 
+interface FileEntry {
+  path: string
+  size: number
+  sha256: string
+}
+
+interface GenerationJob {
+  id: string
+  user_id?: string
+  user_prompt: string
+  status: 'pending' | 'running' | 'succeeded' | 'failed' | 'cancelled'
+  created_at: string
+  started_at?: string
+  finished_at?: string
+  files: FileEntry[]
+  error?: string
+  coalesced_with?: string
+  edit_of?: string
+  queue_position?: number
+}
+
 interface BackendHealthResponse {
   status: string
   backend_port: string
@@ -109,6 +130,163 @@ class BackendApiService {
     }
   }
 
+  /**
+   * Queue a background generation job on the backend
+   */
+  async createJob(request: GenerateRequest): Promise<GenerationJob> {
+    try {
+      const response = await fetch(`${this.baseUrl}/api/jobs`, {
+        method: 'POST',
+        headers: this.getHeaders(),
+        body: JSON.stringify(request),
+      })
+
+      if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}))
+        throw new Error(errorData.detail || `Job creation failed: ${response.status}`)
+      }
+
+      return await response.json()
+    } catch (error) {
+      console.error('Job creation failed:', error)
+      throw error
+    }
+  }
+
+  /**
+   * Get the status and results of a generation job
+   */
+  async getJob(jobId: string): Promise<GenerationJob> {
+    try {
+      const response = await fetch(`${this.baseUrl}/api/jobs/${jobId}`, {
+        method: 'GET',
+        headers: this.getHeaders(),
+      })
+
+      if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}))
+        throw new Error(errorData.detail || `Job status failed: ${response.status}`)
+      }
+
+      return await response.json()
+    } catch (error) {
+      console.error('Job status request failed:', error)
+      throw error
+    }
+  }
+
+  /**
+   * Get the content of one file generated by a job
+   */
+  async getJobFile(jobId: string, path: string): Promise<string> {
+    try {
+      const encodedPath = path.split('/').map(encodeURIComponent).join('/')
+      const response = await fetch(`${this.baseUrl}/api/jobs/${jobId}/files/${encodedPath}`, {
+        method: 'GET',
+        headers: this.getHeaders(),
+      })
+
+      if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}))
+        throw new Error(errorData.detail || `File request failed: ${response.status}`)
+      }
+
+      return await response.text()
+    } catch (error) {
+      console.error('Job file request failed:', error)
+      throw error
+    }
+  }
+
+  /**
+   * Download a job's project as a ZIP archive
+   */
+  async downloadJobArchive(jobId: string): Promise<Blob> {
+    try {
+      const response = await fetch(`${this.baseUrl}/api/jobs/${jobId}/archive`, {
+        method: 'GET',
+        headers: this.getHeaders(),
+      })
+
+      if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}))
+        throw new Error(errorData.detail || `Archive download failed: ${response.status}`)
+      }
+
+      return await response.blob()
+    } catch (error) {
+      console.error('Job archive download failed:', error)
+      throw error
+    }
+  }
+
+  /**
+   * Cancel a pending or running generation job (it can be resumed later)
+   */
+  async cancelJob(jobId: string): Promise<GenerationJob> {
+    try {
+      const response = await fetch(`${this.baseUrl}/api/jobs/${jobId}`, {
+        method: 'DELETE',
+        headers: this.getHeaders(),
+      })
+
+      if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}))
+        throw new Error(errorData.detail || `Job cancel failed: ${response.status}`)
+      }
+
+      return await response.json()
+    } catch (error) {
+      console.error('Job cancel request failed:', error)
+      throw error
+    }
+  }
+
+  /**
+   * Resume a failed or cancelled generation job from its last completed step
+   */
+  async resumeJob(jobId: string): Promise<GenerationJob> {
+    try {
+      const response = await fetch(`${this.baseUrl}/api/jobs/${jobId}/resume`, {
+        method: 'POST',
+        headers: this.getHeaders(),
+      })
+
+      if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}))
+        throw new Error(errorData.detail || `Job resume failed: ${response.status}`)
+      }
+
+      return await response.json()
+    } catch (error) {
+      console.error('Job resume request failed:', error)
+      throw error
+    }
+  }
+
+  /**
+   * Apply a change request to a finished job's project as a new job
+   */
+  async editJob(jobId: string, changeRequest: string): Promise<GenerationJob> {
+    try {
+      const response = await fetch(`${this.baseUrl}/api/jobs/${jobId}/edits`, {
+        method: 'POST',
+        headers: this.getHeaders(),
+        body: JSON.stringify({ change_request: changeRequest }),
+      })
+
+      if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}))
+        throw new Error(errorData.detail || `Job edit failed: ${response.status}`)
+      }
+
+      return await response.json()
+    } catch (error) {
+      console.error('Job edit request failed:', error)
+      throw error
+    }
+  }
+
   /**
    * Generate simple code for testing (fallback endpoint)
    */
@@ -162,6 +340,29 @@ class BackendApiService {
     }
   }
 
+  /**
+   * Invalidate a Supabase token in the backend's verified-token cache
+   */
+  async logout(supabaseToken: string): Promise<void> {
+    try {
+      const response = await fetch(`${this.baseUrl}/api/auth/logout`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          Authorization: `Bearer ${supabaseToken}`,
+        },
+      })
+
+      if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}))
+        throw new Error(errorData.detail || `Logout failed: ${response.status}`)
+      }
+    } catch (error) {
+      console.error('Backend logout failed:', error)
+      throw error
+    }
+  }
+
   /**
    * Get current user information from backend
    */
@@ -260,4 +461,4 @@ class BackendApiService {
 export const backendApi = new BackendApiService()
 
 // Export types for use in components
-export type { GenerateRequest, GenerateResponse, BackendHealthResponse, AuthRequest, AuthResponse, GoogleAuthRequest }
\ No newline at end of file
+export type { GenerateRequest, GenerateResponse, GenerationJob, FileEntry, BackendHealthResponse, AuthRequest, AuthResponse, GoogleAuthRequest }
\ No newline at end of file
@@ -165,6 +165,12 @@ export function useBackendAuth() {
     try {
       setState(prev => ({ ...prev, isLoading: true }))
       
+      // Drop the Supabase token from the backend's verified-token cache
+      const { data: { session } } = await supabase.auth.getSession()
+      if (session) {
+        await backendApi.logout(session.access_token).catch(() => undefined)
+      }
+
       // Clear backend token
       backendApi.setAuthToken(null)
       